@@ -11,6 +11,7 @@ from couchdbkit import NoResultFound
 from casexml.apps.case.const import CASE_TAG_DATE_OPENED
 from casexml.apps.case.mock import CaseBlock, CaseBlockError
 from couchexport.export import SCALAR_NEVER_WAS
+from dimagi.utils.chunked import chunked
 from dimagi.utils.logging import notify_exception
 from soil.progress import TaskProgressManager
 
@@ -21,10 +22,11 @@ from corehq.apps.groups.models import Group
 from corehq.apps.hqcase.utils import CASEBLOCK_CHUNKSIZE, submit_case_blocks
 from corehq.apps.locations.models import SQLLocation
 from corehq.apps.receiverwrapper.rate_limiter import rate_limit_submission
-from corehq.apps.users.cases import get_wrapped_owner
+from corehq.apps.users.cases import get_wrapped_owner, get_wrapped_owners
+from corehq.apps.users.dbaccessors import get_user_docs_by_username
 from corehq.apps.users.models import CouchUser
 from corehq.apps.users.util import format_username
-from corehq.form_processor.models import STANDARD_CHARFIELD_LENGTH
+from corehq.form_processor.models import STANDARD_CHARFIELD_LENGTH, CommCareCase
 from corehq.toggles import (
     BULK_UPLOAD_DATE_OPENED,
     CASE_IMPORT_DATA_DICTIONARY_VALIDATION,
@@ -58,6 +60,8 @@ from .util import EXTERNAL_ID, RESERVED_FIELDS, lookup_case
 
 RowAndCase = namedtuple('RowAndCase', ['row', 'case'])
 ALL_LOCATIONS = 'ALL_LOCATIONS'
+# Number of rows whose cases and owners are looked up together
+LOOKUP_CHUNKSIZE = 100
 
 
 def do_import(spreadsheet, config, domain, task=None, record_form_callback=None):
@@ -124,6 +128,7 @@ class _TimedAndThrottledImporter:
             throttle=True,
         )
         self.owner_accessor = _OwnerAccessor(domain, self.user)
+        self.case_lookup = _CaseLookup(domain)
         self._unsubmitted_caseblocks = []
         self.multi_domain = multi_domain
         if CASE_IMPORT_DATA_DICTIONARY_VALIDATION.enabled(self.domain):
@@ -146,26 +151,66 @@ class _TimedAndThrottledImporter:
         with TaskProgressManager(self.task, src="case_importer") as progress_manager:
             # context to be used by extensions to keep during import
             import_context = {}
-            for row_num, row in enumerate(spreadsheet.iter_row_dicts(), start=1):
-                progress_manager.set_progress(row_num - 1, spreadsheet.max_row)
-                if row_num == 1:
-                    continue  # skip first row (header row)
-
-                try:
-                    # check if there's a domain column, if true it's value should
-                    # match the current domain, else skip the row.
-                    if self.multi_domain:
-                        if self.domain != row.get('domain'):
-                            continue
-                    self.import_row(row_num, row, import_context)
-                except CaseRowErrorList as errors:
-                    self.results.add_errors(row_num, errors)
-                except CaseRowError as error:
-                    self.results.add_error(row_num, error)
+            rows = enumerate(spreadsheet.iter_row_dicts(), start=1)
+            for block in chunked(rows, LOOKUP_CHUNKSIZE, list):
+                prefetched_at_chunk = None
+                for index, (row_num, row) in enumerate(block):
+                    progress_manager.set_progress(row_num - 1, spreadsheet.max_row)
+                    if row_num == 1:
+                        continue  # skip first row (header row)
+
+                    if prefetched_at_chunk != self.results.num_chunks:
+                        # Look up the cases and owners of the rest of the
+                        # block. Caseblocks submitted since the last lookup
+                        # can have created cases that later rows update.
+                        self._prefetch(block[index:])
+                        prefetched_at_chunk = self.results.num_chunks
+
+                    try:
+                        # check if there's a domain column, if true it's value should
+                        # match the current domain, else skip the row.
+                        if self.multi_domain:
+                            if self.domain != row.get('domain'):
+                                continue
+                        self.import_row(row_num, row, import_context)
+                    except CaseRowErrorList as errors:
+                        self.results.add_errors(row_num, errors)
+                    except CaseRowError as error:
+                        self.results.add_error(row_num, error)
 
             self.submission_handler.commit_caseblocks()
             return self.results.to_json()
 
+    def _prefetch(self, rows):
+        """
+        Looks up the existing cases, parent cases and owners that
+        ``rows`` refer to in bulk, instead of one row at a time.
+
+        Values that custom case import operations change are not
+        prefetched. They are looked up when their rows are imported.
+        """
+        search_ids = {'case_id': set(), EXTERNAL_ID: set()}
+        owner_ids = set()
+        owner_names = set()
+        for row_num, row in rows:
+            if row_num == 1 or self.multi_domain and self.domain != row.get('domain'):
+                continue
+            if self.config.search_field in search_ids:
+                search_ids[self.config.search_field].add(self._parse_search_id(row))
+            search_ids['case_id'].add(self._get_field_value(row, 'parent_id'))
+            search_ids[EXTERNAL_ID].add(self._get_field_value(row, 'parent_external_id'))
+            owner_ids.add(self._get_field_value(row, 'owner_id'))
+            owner_names.add(self._get_field_value(row, 'owner_name'))
+        self.case_lookup.prefetch(case_ids=search_ids['case_id'], external_ids=search_ids[EXTERNAL_ID])
+        self.owner_accessor.prefetch(owner_ids=owner_ids, owner_names=owner_names)
+
+    def _get_field_value(self, row, field_name):
+        column = self._columns_by_field_name.get(field_name)
+        value = row.get(column) if column else None
+        if value is None:
+            return None
+        return _convert_field_value(value)
+
     def import_row(self, row_num, raw_row, import_context):
         search_id = self._parse_search_id(raw_row)
         fields_to_update = self._populate_updated_fields(raw_row)
@@ -187,9 +232,12 @@ class _TimedAndThrottledImporter:
             domain=self.domain,
             user_id=self.user.user_id,
             owner_accessor=self.owner_accessor,
+            case_lookup=self.case_lookup,
         )
         if row.relies_on_uncreated_case(self.submission_handler.uncreated_external_ids):
             self.submission_handler.commit_caseblocks()
+            # The prefetched cases don't include the cases just created
+            self.case_lookup.clear()
         if row.is_new_case and not self.config.create_new_cases:
             return
 
@@ -227,6 +275,14 @@ class _TimedAndThrottledImporter:
     def user(self):
         return CouchUser.get_by_user_id(self.config.couch_user_id)
 
+    @cached_property
+    def _columns_by_field_name(self):
+        return {
+            field['field_name'].strip(): column
+            for column, field in self.field_map.items()
+            if 'field_name' in field
+        }
+
     def _parse_search_id(self, row):
         """ Find and convert the search id in an Excel row """
 
@@ -494,13 +550,15 @@ class SubmitCaseBlockHandler:
 
 
 class _CaseImportRow(object):
-    def __init__(self, search_id, fields_to_update, config, domain, user_id, owner_accessor):
+    def __init__(self, search_id, fields_to_update, config, domain, user_id, owner_accessor,
+                 case_lookup=None):
         self.search_id = search_id
         self.fields_to_update = fields_to_update
         self.config = config
         self.domain = domain
         self.user_id = user_id
         self.owner_accessor = owner_accessor
+        self.case_lookup = case_lookup or _CaseLookup(domain)
 
         self.case_name = fields_to_update.pop('name', None)
         self._check_case_name()
@@ -549,10 +607,9 @@ class _CaseImportRow(object):
 
     @cached_property
     def existing_case(self):
-        case, error = lookup_case(
+        case, error = self.case_lookup.lookup_case(
             self.config.search_field,
             self.search_id,
-            self.domain,
             self.config.case_type
         )
         _log_case_lookup(self.domain)
@@ -580,8 +637,8 @@ class _CaseImportRow(object):
                 ('parent_external_id', 'external_id', self.parent_external_id),
         ]:
             if search_id:
-                parent_case, error = lookup_case(
-                    search_field, search_id, self.domain, self.parent_type)
+                parent_case, error = self.case_lookup.lookup_case(
+                    search_field, search_id, self.parent_type)
                 _log_case_lookup(self.domain)
                 if parent_case:
                     self.validate_parent_column()
@@ -642,6 +699,55 @@ def _log_case_lookup(domain):
     case_load_counter("case_importer", domain)
 
 
+class _CaseLookup(object):
+    """
+    Looks up cases the way ``util.lookup_case()`` does, using the cases
+    that were prefetched for a block of rows where it can
+    """
+
+    def __init__(self, domain):
+        self.domain = domain
+        self.by_case_id = {}
+        self.by_external_id = {}
+
+    def prefetch(self, case_ids, external_ids):
+        """
+        Replaces the prefetched cases with the cases with ``case_ids``
+        and ``external_ids``, looked up in one query for case IDs and
+        one query per partitioned database for external IDs.
+        """
+        case_ids = [case_id for case_id in case_ids if case_id]
+        external_ids = [external_id for external_id in external_ids if external_id]
+        self.by_case_id = dict.fromkeys(case_ids)
+        for case in CommCareCase.objects.get_cases(case_ids, self.domain):
+            if case.domain == self.domain:
+                self.by_case_id[case.case_id] = case
+        self.by_external_id = {external_id: [] for external_id in external_ids}
+        for case in CommCareCase.objects.get_cases_by_external_ids(self.domain, external_ids):
+            self.by_external_id[case.external_id].append(case)
+
+    def clear(self):
+        self.by_case_id = {}
+        self.by_external_id = {}
+
+    def lookup_case(self, search_field, search_id, case_type):
+        if search_field == 'case_id' and search_id in self.by_case_id:
+            case = self.by_case_id[search_id]
+            if case is not None and case.type == case_type:
+                return (case, None)
+            return (None, LookupErrors.NotFound)
+        if search_field == EXTERNAL_ID and search_id in self.by_external_id:
+            # Like get_case_by_external_id(), a blank case type matches any type
+            cases = [case for case in self.by_external_id[search_id]
+                     if not case_type or case.type == case_type]
+            if len(cases) > 1:
+                return (None, LookupErrors.MultipleResults)
+            if cases:
+                return (cases[0], None)
+            return (None, LookupErrors.NotFound)
+        return lookup_case(search_field, search_id, self.domain, case_type)
+
+
 class _ImportResults(object):
     CREATED = 'created'
     UPDATED = 'updated'
@@ -743,6 +849,9 @@ class _OwnerAccessor(object):
         owner = get_user(name) or get_group(name) or get_location(name)
         if not owner:
             raise InvalidOwnerName('owner_name')
+        return self._check_owner_name(owner)
+
+    def _check_owner_name(self, owner):
         self._check_owner(owner, 'owner_name')
         return owner._id
 
@@ -759,6 +868,34 @@ class _OwnerAccessor(object):
         owner = get_wrapped_owner(owner_id)
         self._check_owner(owner, 'owner_id')
 
+    def prefetch(self, owner_ids, owner_names):
+        """
+        Looks up owners by ID, and users by name, in bulk, and caches
+        the results for ``check_owner_id()`` and ``get_id_from_name()``.
+
+        Names that are not usernames are left to be looked up one at a
+        time as group names or locations.
+        """
+        owner_ids = {owner_id for owner_id in owner_ids if owner_id and owner_id not in self.id_cache}
+        for owner_id, owner in get_wrapped_owners(owner_ids).items():
+            _cache_result(self.id_cache, owner_id, self._check_owner, owner, 'owner_id')
+
+        names_by_username = defaultdict(list)
+        for name in owner_names:
+            if name and name not in self.name_cache:
+                username = name if '@' in name else format_username(name, self.domain)
+                names_by_username[username].append(name)
+        docs_by_username = defaultdict(list)
+        for doc in get_user_docs_by_username(list(names_by_username)):
+            if doc:
+                docs_by_username[doc['username']].append(doc)
+        for username, docs in docs_by_username.items():
+            if len(docs) > 1:
+                continue  # get_id_from_name() raises an error
+            owner = CouchUser.wrap_correctly(docs[0])
+            for name in names_by_username.get(username, []):
+                _cache_result(self.name_cache, name, self._check_owner_name, owner)
+
     def _check_owner(self, owner, owner_field):
         is_valid_user = isinstance(owner, CouchUser) and owner.is_member_of(self.domain)
         is_valid_group = isinstance(owner, Group) and owner.case_sharing and owner.is_member_of(self.domain)
@@ -805,3 +942,11 @@ def cached_function_call(fn, param, cache):
     else:
         cache[param] = result
         return result
+
+
+def _cache_result(cache, param, fn, *args):
+    """Stores fn(*args) in cache for param, like ``cached_function_call``"""
+    try:
+        cache[param] = fn(*args)
+    except CaseRowError as err:
+        cache[param] = err
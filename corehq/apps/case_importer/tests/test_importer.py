@@ -13,7 +13,12 @@ from casexml.apps.case.mock import CaseFactory, CaseStructure
 from casexml.apps.case.tests.util import delete_all_cases
 
 from corehq.apps.case_importer import exceptions
-from corehq.apps.case_importer.do_import import _CaseImportRow, do_import
+from corehq.apps.case_importer.const import LookupErrors
+from corehq.apps.case_importer.do_import import (
+    _CaseImportRow,
+    _CaseLookup,
+    do_import,
+)
 from corehq.apps.case_importer.tasks import bulk_import_async
 from corehq.apps.case_importer.tracking.models import CaseUploadRecord
 from corehq.apps.case_importer.util import (
@@ -29,7 +34,7 @@ from corehq.apps.enterprise.tests.utils import create_enterprise_permissions
 from corehq.apps.groups.models import Group
 from corehq.apps.locations.models import LocationType
 from corehq.apps.locations.tests.util import restrict_user_by_location
-from corehq.apps.users.models import CommCareUser, WebUser
+from corehq.apps.users.models import CommCareUser, CouchUser, WebUser
 from corehq.form_processor.models import CommCareCase, CommCareCaseIndex
 from corehq.util.test_utils import flag_disabled, flag_enabled
 from corehq.util.timezones.conversions import PhoneTime
@@ -98,6 +103,47 @@ class TestCaseImportRow(SimpleTestCase):
         })
 
 
+class TestCaseLookup(SimpleTestCase):
+
+    def setUp(self):
+        self.case_lookup = _CaseLookup('importer-test')
+        self.case_lookup.by_case_id = {
+            'abc': Mock(case_id='abc', type='person'),
+            'missing': None,
+        }
+        self.case_lookup.by_external_id = {
+            'ext1': [Mock(case_id='abc', type='person')],
+            'ext2': [Mock(case_id='def', type='person'), Mock(case_id='ghi', type='household')],
+        }
+
+    def lookup_case_id(self, search_field, search_id, case_type):
+        case, error = self.case_lookup.lookup_case(search_field, search_id, case_type)
+        return (case.case_id if case else None, error)
+
+    def test_case_id(self):
+        self.assertEqual(self.lookup_case_id('case_id', 'abc', 'person'), ('abc', None))
+        self.assertEqual(self.lookup_case_id('case_id', 'abc', 'household'), (None, LookupErrors.NotFound))
+        self.assertEqual(self.lookup_case_id('case_id', 'missing', 'person'), (None, LookupErrors.NotFound))
+
+    def test_external_id(self):
+        self.assertEqual(self.lookup_case_id('external_id', 'ext1', 'person'), ('abc', None))
+        self.assertEqual(self.lookup_case_id('external_id', 'ext2', 'household'), ('ghi', None))
+        self.assertEqual(self.lookup_case_id('external_id', 'ext1', 'household'), (None, LookupErrors.NotFound))
+
+    def test_external_id_without_case_type(self):
+        self.assertEqual(self.lookup_case_id('external_id', 'ext1', ''), ('abc', None))
+        self.assertEqual(self.lookup_case_id('external_id', 'ext2', ''), (None, LookupErrors.MultipleResults))
+
+    @patch('corehq.apps.case_importer.do_import.lookup_case', return_value=(None, LookupErrors.NotFound))
+    def test_not_prefetched(self, lookup_case):
+        self.case_lookup.lookup_case('case_id', 'xyz', 'person')
+        lookup_case.assert_called_once_with('case_id', 'xyz', 'importer-test', 'person')
+
+        self.case_lookup.clear()
+        self.case_lookup.lookup_case('case_id', 'abc', 'person')
+        lookup_case.assert_called_with('case_id', 'abc', 'importer-test', 'person')
+
+
 class ImporterTest(TestCase):
 
     def setUp(self):
@@ -691,6 +737,34 @@ class ImporterTest(TestCase):
             self.assertEqual(cases['Caroline'].owner_id, case_owner._id)
             self.assertEqual(cases['Caroline'].get_case_property('favorite_color'), 'yellow')
 
+    def test_cases_and_owners_are_looked_up_in_bulk(self):
+        [parent_case] = self.factory.create_or_update_case(CaseStructure(attrs={'create': True}))
+        [case] = self.factory.create_or_update_case(CaseStructure(attrs={'create': True}))
+        with get_commcare_user(self.domain) as case_owner, \
+                patch('corehq.apps.case_importer.do_import.lookup_case') as lookup_case, \
+                patch('corehq.apps.case_importer.do_import.get_wrapped_owner') as get_wrapped_owner, \
+                patch.object(CouchUser, 'get_by_username') as get_by_username:
+            res = self.import_mock_file([
+                ['case_id', 'parent_id', 'owner_id', 'owner_name', 'favorite_color'],
+                [case.case_id, parent_case.case_id, case_owner._id, '', 'blue'],
+                ['', parent_case.case_id, '', 'username', 'yellow'],
+                ['', 'missing-parent', '', '', 'green'],
+            ])
+        lookup_case.assert_not_called()
+        get_wrapped_owner.assert_not_called()
+        get_by_username.assert_not_called()
+
+        self.assertEqual(1, res['created_count'])
+        self.assertEqual(1, res['match_count'])
+        self.assertEqual(res['errors'][exceptions.InvalidParentId.title]['parent_id']['rows'], [4])
+        case = CommCareCase.objects.get_case(case.case_id, self.domain)
+        self.assertEqual(case.owner_id, case_owner._id)
+        self.assertEqual(case.get_case_property('favorite_color'), 'blue')
+        [new_case] = [c for c in CommCareCase.objects.get_reverse_indexed_cases(
+            self.domain, [parent_case.case_id]) if c.case_id != case.case_id]
+        self.assertEqual(new_case.owner_id, case_owner._id)
+        self.assertEqual(new_case.get_case_property('favorite_color'), 'yellow')
+
     def test_user_can_access_location(self):
         with make_business_units(self.domain) as (inc, dsi, dsa), \
                 restrict_user_to_location(self.domain, self, dsa):
@@ -26,6 +26,7 @@ class KafkaChangeFeed(ChangeFeed):
     Kafka-based implementation of a ChangeFeed
     """
     sequence_format = 'json'
+    supports_partitions = True
 
     def __init__(self, topics, client_id, strict=False, num_processes=1,
                  process_num=0, dedicated_migration_process=False,):
@@ -42,6 +43,7 @@ class KafkaChangeFeed(ChangeFeed):
         self.process_num = process_num
         self.dedicated_migration_process = dedicated_migration_process
         self._consumer = None
+        self._mark_processed_on_read = True
 
     def __str__(self):
         return 'KafkaChangeFeed: topics: {}, client: {}'.format(self._topics, self._client_id)
@@ -84,7 +86,13 @@ class KafkaChangeFeed(ChangeFeed):
             if extra_topics:
                 raise ValueError("'since' contains extra topics: {}".format(list(extra_topics)))
 
-            self._processed_topic_offsets = copy(since)
+            if self._mark_processed_on_read:
+                self._processed_topic_offsets = copy(since)
+            else:
+                # nothing from ``since`` onwards has been processed yet
+                self._processed_topic_offsets = {
+                    topic_partition: offset - 1 for topic_partition, offset in since.items()
+                }
 
             # Tell the consumer to start from offsets that were passed in
             for topic_partition, offset in since.items():
@@ -92,12 +100,19 @@ class KafkaChangeFeed(ChangeFeed):
 
         try:
             for message in self.consumer:
-                self._processed_topic_offsets[(message.topic, message.partition)] = message.offset
+                if self._mark_processed_on_read:
+                    self._processed_topic_offsets[(message.topic, message.partition)] = message.offset
                 yield change_from_kafka_message(message)
         except StopIteration:
             # no need to do anything since this is just telling us we've reached the end of the feed
             pass
 
+    def defer_processed_offsets(self):
+        self._mark_processed_on_read = False
+
+    def mark_processed(self, change):
+        self._processed_topic_offsets[(change.topic, change.partition)] = change.sequence_id
+
     def get_current_checkpoint_offsets(self):
         # the way kafka works, the checkpoint should increment by 1 because
         # querying the feed is inclusive of the value passed in.
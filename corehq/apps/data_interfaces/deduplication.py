@@ -1,5 +1,7 @@
+from collections import defaultdict
 from datetime import datetime
 
+from django.db.models import Q
 from django.utils.text import slugify
 
 from corehq.apps.case_search.const import SPECIAL_CASE_PROPERTIES_MAP
@@ -8,6 +10,7 @@ from corehq.apps.es import queries
 from corehq.apps.es.case_search import CaseSearchES, case_property_missing
 from corehq.messaging.util import MessagingRuleProgressHelper
 from corehq.apps.locations.dbaccessors import user_ids_at_locations
+from corehq.form_processor.models import CommCareCase
 
 DUPLICATE_LIMIT = 1000
 DEDUPE_XMLNS = 'http://commcarehq.org/hq_case_deduplication_rule'
@@ -108,6 +111,141 @@ def find_duplicate_case_ids(
         return [case.case_id]
 
 
+class DuplicateCaseIndex(object):
+    """
+    Index of the cases of a deduplication rule's case type, for finding
+    duplicates of many cases without an Elasticsearch query per case.
+
+    Cases are looked up by the value of each of the action's case
+    properties. Like ``find_duplicate_case_ids``, values must match exactly,
+    blank values are ignored, and duplicates must match all (or any, see
+    ``match_type``) of the non-blank values, and the rule's property and
+    location criteria.
+    """
+
+    def __init__(self, case_properties, match_type, case_filter_criteria=None):
+        from corehq.apps.data_interfaces.models import MatchPropertyDefinition
+        self.case_properties = list(case_properties)
+        self.match_type = match_type
+        self._filters = [
+            _get_case_filter(criterion.definition)
+            for criterion in (case_filter_criteria or [])
+        ]
+        self._filter_properties = [
+            criterion.definition.property_name
+            for criterion in (case_filter_criteria or [])
+            if isinstance(criterion.definition, MatchPropertyDefinition)
+        ]
+        self._values_by_case_id = {}
+        self._case_ids_by_value = defaultdict(set)
+
+    @classmethod
+    def build(cls, domain, rule, action):
+        """Index all the cases of the rule's case type, in one scan of the database"""
+        index = cls(action.case_properties, action.match_type, case_filter_criteria=rule.memoized_criteria)
+        q_expression = Q(deleted=False)
+        if not action.include_closed:
+            q_expression &= Q(closed=False)
+        batches = CommCareCase.objects.iter_case_record_batches(
+            domain, rule.case_type, index._get_record_properties(), q_expression,
+            load_source='deduplication_backfill',
+        )
+        for records in batches:
+            for record in records:
+                index.add(record)
+        return index
+
+    def add(self, record):
+        values = _get_property_values(record, self.case_properties + self._filter_properties)
+        self._values_by_case_id[record.case_id] = {
+            name: values[name] for name in self.case_properties if values[name] is not None
+        }
+        if all(case_filter(record, values) for case_filter in self._filters):
+            for name in self.case_properties:
+                if values[name] is not None:
+                    self._case_ids_by_value[(name, values[name])].add(record.case_id)
+
+    def find_duplicate_case_ids(self, case_id):
+        """
+        :returns: The ids of the duplicates of the case, including the case
+        itself if it matches the criteria, or None if the case is not in the
+        index.
+        """
+        values = self._values_by_case_id.get(case_id)
+        if values is None:
+            return None
+        if not values:
+            return [case_id]
+        case_id_sets = [self._case_ids_by_value.get(item, set()) for item in values.items()]
+        if self.match_type == "ALL":
+            case_ids = set.intersection(*case_id_sets)
+        else:
+            case_ids = set.union(*case_id_sets)
+        return sorted(case_ids)[:DUPLICATE_LIMIT]
+
+    def _get_record_properties(self):
+        properties = set(self.case_properties + self._filter_properties)
+        if properties & set(SPECIAL_CASE_PROPERTIES_MAP):
+            properties.update(_SPECIAL_PROPERTY_FIELDS)
+        return properties
+
+
+# fields of special case properties that are not loaded for all case records
+_SPECIAL_PROPERTY_FIELDS = ('name', 'external_id', 'opened_on', 'closed_on', 'modified_on')
+
+
+def _get_property_values(record, property_names):
+    """
+    :returns: A dict of the normalized values of case properties of a case
+    record. Blank values are None.
+    """
+    special_doc = None
+    values = {}
+    for name in property_names:
+        if name in SPECIAL_CASE_PROPERTIES_MAP:
+            if special_doc is None:
+                special_doc = {field: getattr(record, field, None) for field in _SPECIAL_PROPERTY_FIELDS}
+                special_doc.update(_id=record.case_id, type=record.type, owner_id=record.owner_id,
+                                   closed=record.closed)
+            value = SPECIAL_CASE_PROPERTIES_MAP[name].value_getter(special_doc)
+        else:
+            value = record.get_case_property(name)
+        values[name] = str(value) if value not in (None, '') else None
+    return values
+
+
+def _get_case_filter(definition):
+    """
+    :returns: A function of a case record and its property values that
+    applies the criterion like ``_get_es_filtered_case_query`` does
+    """
+    from corehq.apps.data_interfaces.models import (
+        LocationFilterDefinition,
+        MatchPropertyDefinition,
+    )
+
+    if isinstance(definition, LocationFilterDefinition):
+        owner_ids = set(user_ids_at_locations([definition.location_id]))
+        owner_ids.add(definition.location_id)
+        return lambda record, values: record.owner_id in owner_ids
+
+    if isinstance(definition, MatchPropertyDefinition):
+        name = definition.property_name
+        # an empty property_value is a query for a missing value
+        expected = definition.property_value or None
+        match_type = definition.match_type
+        if match_type == MatchPropertyDefinition.MATCH_HAS_NO_VALUE:
+            return lambda record, values: values[name] is None
+        if match_type == MatchPropertyDefinition.MATCH_HAS_VALUE:
+            return lambda record, values: values[name] is not None
+        if match_type == MatchPropertyDefinition.MATCH_EQUAL:
+            return lambda record, values: values[name] == expected
+        if match_type == MatchPropertyDefinition.MATCH_NOT_EQUAL:
+            return lambda record, values: values[name] != expected
+
+    return lambda record, values: True
+
+
 def reset_and_backfill_deduplicate_rule(rule):
     from corehq.apps.data_interfaces.models import AutomaticUpdateRule
     from corehq.apps.data_interfaces.tasks import (
@@ -160,15 +298,16 @@ def backfill_deduplicate_rule(domain, rule):
         case_iterator = AutomaticUpdateRule.iter_cases(
             domain, rule.case_type, include_closed=action.include_closed
         )
-        iter_cases_and_run_rules(
-            domain,
-            case_iterator,
-            [rule],
-            now,
-            run_record.id,
-            rule.case_type,
-            progress_helper=progress_helper,
-        )
+        with action.using_duplicate_index(DuplicateCaseIndex.build(domain, rule, action)):
+            iter_cases_and_run_rules(
+                domain,
+                case_iterator,
+                [rule],
+                now,
+                run_record.id,
+                rule.case_type,
+                progress_helper=progress_helper,
+            )
     finally:
         progress_helper.set_rule_complete()
         rule.last_run = now
@@ -1,5 +1,6 @@
 import re
 from collections import defaultdict
+from contextlib import contextmanager
 from datetime import date, datetime, time, timedelta
 
 from django.conf import settings
@@ -131,6 +132,9 @@ class AutomaticUpdateRule(models.Model):
     upstream_id = models.CharField(max_length=32, null=True)
     locked_for_editing = models.BooleanField(default=False)
 
+    # See batching_case_updates
+    update_batch = None
+
     class Meta(object):
         app_label = "data_interfaces"
         indexes = [
@@ -237,11 +241,78 @@ class AutomaticUpdateRule(models.Model):
         return date
 
     @classmethod
-    def iter_cases(cls, domain, case_type, boundary_date=None, db=None, include_closed=False):
+    def iter_cases(cls, domain, case_type, boundary_date=None, db=None, include_closed=False, rules=None,
+                   now=None):
+        """
+        :param rules: Rules that will be run on the cases. If given (with
+        ``now``), and no rule needs full cases, only the cases that match a
+        rule are loaded in full. See ``_iter_cases_by_record``.
+        """
+        if rules is not None and cls.get_case_record_properties(rules) is not None:
+            return cls._iter_cases_by_record(
+                domain, case_type, rules, now, boundary_date=boundary_date, db=db, include_closed=include_closed
+            )
         return cls._iter_cases_from_postgres(
             domain, case_type, boundary_date=boundary_date, db=db, include_closed=include_closed
         )
 
+    @contextmanager
+    def batching_case_updates(self, update_batch):
+        """
+        Add the case updates of actions that support it to ``update_batch``
+        instead of submitting them
+        """
+        self.update_batch = update_batch
+        try:
+            yield
+        finally:
+            self.update_batch = None
+
+    @classmethod
+    def get_case_record_properties(cls, rules):
+        """
+        :returns: The names of the case properties needed to find the cases
+        that match any of ``rules``, or None if some rule needs full cases.
+        See ``iter_cases``.
+        """
+        properties = set()
+        for rule in rules:
+            if rule.case_record_properties is None:
+                return None
+            properties |= rule.case_record_properties
+        return properties
+
+    @classmethod
+    def _iter_cases_by_record(cls, domain, case_type, rules, now, boundary_date=None, db=None,
+                              include_closed=False):
+        """
+        Like ``_iter_cases_from_postgres``, but only loads the case properties
+        that the rules' criteria look at. Full cases are loaded in bulk for the
+        cases that match any of the rules, and are yielded in place of
+        their records. Records of the other cases are yielded as they are:
+        running the rules on those cases would do nothing.
+        """
+        properties = cls.get_case_record_properties(rules)
+        q_expression = Q(deleted=False)
+        if not include_closed:
+            q_expression &= Q(closed=False)
+        if boundary_date:
+            q_expression &= Q(server_modified_on__lte=boundary_date)
+
+        batches = CommCareCase.objects.iter_case_record_batches(
+            domain, case_type, properties, q_expression, db=db, load_source='auto_update_rule')
+        for records in batches:
+            matched_ids = [
+                record.case_id for record in records
+                if any(rule.criteria_match(record, now) for rule in rules)
+            ]
+            cases_by_id = {
+                case.case_id: case
+                for case in CommCareCase.objects.get_cases(matched_ids, domain)
+            }
+            for record in records:
+                yield cases_by_id.get(record.case_id, record)
+
     @classmethod
     def _iter_cases_from_postgres(cls, domain, case_type, boundary_date=None, db=None, include_closed=False):
         q_expression = Q(
@@ -262,6 +333,27 @@ class AutomaticUpdateRule(models.Model):
                 CommCareCase, q_expression, load_source='auto_update_rule'
             )
 
+    @property
+    @memoized
+    def case_record_properties(self):
+        """
+        The names of the case properties that the criteria of this rule look
+        at, or None if the rule needs full cases. That is the case if a
+        criterion looks at anything other than the case's own properties, or
+        if an action does something for cases that don't match.
+        """
+        properties = set()
+        for criteria in self.memoized_criteria:
+            definition = criteria.definition
+            if not isinstance(definition, MatchPropertyDefinition) or '/' in definition.property_name:
+                return None
+            properties.add(definition.property_name)
+        for action in self.memoized_actions:
+            method = type(action.definition).when_case_does_not_match
+            if method is not CaseRuleActionDefinition.when_case_does_not_match:
+                return None
+        return properties
+
     def activate(self, active=True):
         previous_active = self.active
         self.active = active
@@ -368,8 +460,12 @@ class AutomaticUpdateRule(models.Model):
         aggregated_result = CaseRuleActionResult()
 
         for action in self.memoized_actions:
-            callable_method = getattr(action.definition, method)
-            result = callable_method(case, self)
+            definition = action.definition
+            if method == 'when_case_matches' and self.update_batch is not None and definition.batches_updates:
+                result = definition.add_case_updates(case, self, self.update_batch)
+            else:
+                callable_method = getattr(definition, method)
+                result = callable_method(case, self)
             if not isinstance(result, CaseRuleActionResult):
                 raise TypeError("Expected CaseRuleActionResult")
 
@@ -874,6 +970,14 @@ class CaseRuleActionResult(object):
         self.num_creates += result.num_creates
         self.num_errors += result.num_errors
 
+    def subtract_result(self, result):
+        self.num_updates -= result.num_updates
+        self.num_closes -= result.num_closes
+        self.num_related_updates -= result.num_related_updates
+        self.num_related_closes -= result.num_related_closes
+        self.num_creates -= result.num_creates
+        self.num_errors -= result.num_errors
+
     @property
     def total_updates(self):
         return (
@@ -885,6 +989,69 @@ class CaseRuleActionResult(object):
         )
 
 
+class CaseUpdateBatch(object):
+    """
+    Case updates of rules, submitted in one form per rule.
+    See AutomaticUpdateRule.batching_case_updates
+    """
+
+    def __init__(self, domain):
+        self.domain = domain
+        self._changes_by_rule_id = {}
+
+    def add(self, rule, case_changes, result):
+        """
+        Add the changes of a case that matched ``rule``
+
+        :param case_changes: A list of ``(case_id, properties, close)``
+        tuples, for the case and any related cases it updates
+        :param result: The CaseRuleActionResult counting the changes
+        """
+        rule_and_changes = self._changes_by_rule_id.setdefault(rule.pk, (rule, []))
+        rule_and_changes[1].append((case_changes, result))
+
+    def submit(self):
+        """
+        Submit the case updates added since the last submit
+
+        If the form of a rule can't be submitted, the changes of each case
+        are submitted in a form of their own, so that one bad case does not
+        fail the others.
+
+        :returns: CaseRuleActionResult that corrects the results given to
+        ``add()`` for the cases whose changes could not be submitted: their
+        updates are subtracted, and each is counted as an error
+        """
+        result = CaseRuleActionResult()
+        changes_by_rule_id, self._changes_by_rule_id = self._changes_by_rule_id, {}
+        for rule, changes in changes_by_rule_id.values():
+            all_case_changes = [change for case_changes, case_result in changes for change in case_changes]
+            if len(changes) > 1 and self._submit(rule, all_case_changes, notify=False):
+                continue
+            for case_changes, case_result in changes:
+                if not self._submit(rule, case_changes):
+                    result.subtract_result(case_result)
+                    result.add_result(CaseRuleActionResult(num_errors=1))
+        return result
+
+    def _submit(self, rule, case_changes, notify=True):
+        try:
+            form, cases = bulk_update_cases(
+                self.domain, case_changes, device_id=rule.id, xmlns=AUTO_UPDATE_XMLNS,
+                user_id=SYSTEM_USER_ID, form_name=rule.name, max_wait=15,
+            )
+        except Exception:
+            if notify:
+                notify_exception(None, "Error submitting case updates of case update rule", {
+                    'domain': self.domain,
+                    'rule_pk': rule.pk,
+                    'case_ids': [case_id for case_id, properties, close in case_changes],
+                })
+            return False
+        rule.log_submission(form.form_id)
+        return True
+
+
 class CaseRuleActionDefinition(models.Model):
 
     class Meta(object):
@@ -905,6 +1072,17 @@ class CaseRuleActionDefinition(models.Model):
         """
         return CaseRuleActionResult()
 
+    # True if the action implements add_case_updates
+    batches_updates = False
+
+    def add_case_updates(self, case, rule, update_batch):
+        """
+        Like when_case_matches, but adds the case updates to
+        update_batch, a CaseUpdateBatch, instead of submitting them.
+        Should return an instance of CaseRuleActionResult
+        """
+        raise NotImplementedError()
+
 
 class BaseUpdateCaseDefinition(CaseRuleActionDefinition):
     class Meta(object):
@@ -1004,8 +1182,31 @@ class UpdateCaseDefinition(BaseUpdateCaseDefinition):
     # True to close the case, otherwise False
     close_case = models.BooleanField()
 
+    batches_updates = True
+
     def when_case_matches(self, case, rule):
+        case_changes, result = self._get_case_changes(case)
+        for case_id, properties, close in case_changes:
+            form, cases = update_case(case.domain, case_id, case_properties=properties, close=close,
+                                      xmlns=AUTO_UPDATE_XMLNS, max_wait=15, device_id=rule.id,
+                                      form_name=rule.name)
+            rule.log_submission(form.form_id)
+        return result
+
+    def add_case_updates(self, case, rule, update_batch):
+        case_changes, result = self._get_case_changes(case)
+        if case_changes:
+            update_batch.add(rule, case_changes, result)
+        return result
+
+    def _get_case_changes(self, case):
+        """
+        :returns: A list of ``(case_id, properties, close)`` tuples, with
+        updates of any referenced parent cases before the update of the
+        case, and a CaseRuleActionResult counting them
+        """
         cases_to_update = self.get_case_and_ancestor_updates(case)
+        case_changes = []
 
         num_updates = 0
         num_closes = 0
@@ -1015,9 +1216,7 @@ class UpdateCaseDefinition(BaseUpdateCaseDefinition):
         for case_id, properties in cases_to_update.items():
             if case_id == case.case_id:
                 continue
-            result = update_case(case.domain, case_id, case_properties=properties, close=False,
-                                 xmlns=AUTO_UPDATE_XMLNS, max_wait=15, device_id=rule.id, form_name=rule.name)
-            rule.log_submission(result[0].form_id)
+            case_changes.append((case_id, properties, False))
             num_related_updates += 1
 
         # Update / close the case
@@ -1028,10 +1227,7 @@ class UpdateCaseDefinition(BaseUpdateCaseDefinition):
             close_case = False
 
         if close_case or properties:
-            result = update_case(case.domain, case.case_id, case_properties=properties, close=close_case,
-                                 xmlns=AUTO_UPDATE_XMLNS, max_wait=15, device_id=rule.id, form_name=rule.name)
-
-            rule.log_submission(result[0].form_id)
+            case_changes.append((case.case_id, properties, close_case))
 
             if properties:
                 num_updates += 1
@@ -1039,7 +1235,7 @@ class UpdateCaseDefinition(BaseUpdateCaseDefinition):
             if close_case:
                 num_closes += 1
 
-        return CaseRuleActionResult(
+        return case_changes, CaseRuleActionResult(
             num_updates=num_updates,
             num_closes=num_closes,
             num_related_updates=num_related_updates,
@@ -1087,6 +1283,9 @@ class CaseDeduplicationActionDefinition(BaseUpdateCaseDefinition):
     case_properties = ArrayField(models.TextField())
     include_closed = models.BooleanField(default=False)
 
+    # See using_duplicate_index
+    duplicate_index = None
+
     @classmethod
     def from_rule(cls, rule):
         """There can only ever be one CaseDeduplicationActionDefinition for any AutomaticUpdateRule
@@ -1129,16 +1328,34 @@ class CaseDeduplicationActionDefinition(BaseUpdateCaseDefinition):
 
         return all_match or any_match
 
-    def when_case_matches(self, case, rule):
-        domain = case.domain
-        new_duplicate_case_ids = set(find_duplicate_case_ids(
-            domain,
+    @contextmanager
+    def using_duplicate_index(self, duplicate_index):
+        """Find duplicates of the cases in ``duplicate_index``, a
+        DuplicateCaseIndex, without querying Elasticsearch
+        """
+        self.duplicate_index = duplicate_index
+        try:
+            yield
+        finally:
+            self.duplicate_index = None
+
+    def _find_duplicate_case_ids(self, case, rule):
+        if self.duplicate_index is not None:
+            duplicate_case_ids = self.duplicate_index.find_duplicate_case_ids(case.case_id)
+            if duplicate_case_ids is not None:
+                return duplicate_case_ids
+        return find_duplicate_case_ids(
+            case.domain,
             case,
             self.case_properties,
             self.include_closed,
             self.match_type,
             case_filter_criteria=rule.memoized_criteria,
-        ))
+        )
+
+    def when_case_matches(self, case, rule):
+        domain = case.domain
+        new_duplicate_case_ids = set(self._find_duplicate_case_ids(case, rule))
         # If the case being searched isn't in the case search index
         # (e.g. if this is a case create, and the pillows are racing each other.)
         # Add it to the list
@@ -171,7 +171,7 @@ def run_case_update_rules_for_domain_and_db(domain, now, run_id, case_type, db=N
     rules = list(all_rules.filter(case_type=case_type))
 
     boundary_date = AutomaticUpdateRule.get_boundary_date(rules, now)
-    iterator = AutomaticUpdateRule.iter_cases(domain, case_type, boundary_date, db=db)
+    iterator = AutomaticUpdateRule.iter_cases(domain, case_type, boundary_date, db=db, rules=rules, now=now)
     run = iter_cases_and_run_rules(domain, iterator, rules, now, run_id, case_type, db)
 
     if run.status == DomainCaseRuleRun.STATUS_FINISHED:
@@ -23,8 +23,10 @@ from corehq.apps.data_interfaces.models import (
     UpdateCaseDefinition,
 )
 from corehq.apps.data_interfaces.tasks import run_case_update_rules_for_domain
+from corehq.apps.data_interfaces.utils import run_rules_for_cases
 from corehq.apps.domain.models import Domain
-from corehq.form_processor.models import CommCareCase, XFormInstance
+from corehq.apps.hqcase.utils import bulk_update_cases
+from corehq.form_processor.models import CaseRecord, CommCareCase, XFormInstance
 from corehq.form_processor.signals import sql_case_post_save
 from corehq.tests.locks import reentrant_redis_locks
 from corehq.toggles import NAMESPACE_DOMAIN, RUN_AUTO_CASE_UPDATES_ON_SAVE
@@ -1232,6 +1234,50 @@ class CaseRuleEndToEndTests(BaseCaseRuleTest):
             rules_by_case_type['person-2'], datetime(2016, 1, 1))
         self.assertIsNone(boundary_date)
 
+    def test_case_record_properties(self):
+        rule1 = _create_empty_rule(self.domain)
+        rule1.add_criteria(
+            MatchPropertyDefinition,
+            property_name='do_update',
+            property_value='Y',
+            match_type=MatchPropertyDefinition.MATCH_EQUAL,
+        )
+        rule1.add_action(UpdateCaseDefinition, close_case=True)
+        self.assertEqual(AutomaticUpdateRule.get_case_record_properties([rule1]), {'do_update'})
+
+        rule2 = _create_empty_rule(self.domain)
+        rule2.add_criteria(
+            MatchPropertyDefinition,
+            property_name='parent/do_update',
+            property_value='Y',
+            match_type=MatchPropertyDefinition.MATCH_EQUAL,
+        )
+        self.assertIsNone(AutomaticUpdateRule.get_case_record_properties([rule1, rule2]))
+
+        rule3 = _create_empty_rule(self.domain)
+        rule3.add_action(CreateScheduleInstanceActionDefinition)
+        self.assertIsNone(AutomaticUpdateRule.get_case_record_properties([rule3]))
+
+    def test_iter_cases_loads_matching_cases(self):
+        rule = _create_empty_rule(self.domain)
+        rule.add_criteria(
+            MatchPropertyDefinition,
+            property_name='do_update',
+            property_value='Y',
+            match_type=MatchPropertyDefinition.MATCH_EQUAL,
+        )
+
+        with _with_case(self.domain, 'person', datetime.utcnow()) as case1, \
+                _with_case(self.domain, 'person', datetime.utcnow()) as case2:
+            hqcase.utils.update_case(self.domain, case1.case_id, case_properties={'do_update': 'Y'})
+            cases = list(AutomaticUpdateRule.iter_cases(
+                self.domain, 'person', rules=[rule], now=datetime.utcnow()))
+
+        cases_by_id = {case.case_id: case for case in cases}
+        self.assertEqual(set(cases_by_id), {case1.case_id, case2.case_id})
+        self.assertIsInstance(cases_by_id[case1.case_id], CommCareCase)
+        self.assertIsInstance(cases_by_id[case2.case_id], CaseRecord)
+
     def assertRuleRunCount(self, count):
         self.assertEqual(DomainCaseRuleRun.objects.count(), count)
 
@@ -1295,6 +1341,74 @@ class CaseRuleEndToEndTests(BaseCaseRuleTest):
                 self.assertRuleRunCount(3)
                 self.assertLastRuleRun(1)
 
+    def test_run_rules_for_cases(self):
+        def add_update_action(rule, name, value):
+            _, definition = rule.add_action(UpdateCaseDefinition, close_case=False)
+            definition.set_properties_to_update([
+                UpdateCaseDefinition.PropertyDefinition(
+                    name=name,
+                    value_type=UpdateCaseDefinition.VALUE_TYPE_EXACT,
+                    value=value,
+                ),
+            ])
+            definition.save()
+
+        rule1 = _create_empty_rule(self.domain)
+        add_update_action(rule1, 'result', 'abc')
+        rule2 = _create_empty_rule(self.domain)
+        rule2.add_criteria(
+            MatchPropertyDefinition,
+            property_name='result',
+            property_value='abc',
+            match_type=MatchPropertyDefinition.MATCH_EQUAL,
+        )
+        add_update_action(rule2, 'result2', 'def')
+
+        with _with_case(self.domain, 'person', datetime.utcnow()) as case1, \
+                _with_case(self.domain, 'person', datetime.utcnow()) as case2:
+            result = run_rules_for_cases(self.domain, [case1, case2], [rule1, rule2], datetime.utcnow())
+            self.assertEqual(result, CaseRuleActionResult(num_updates=4))
+
+            for case in CommCareCase.objects.get_cases([case1.case_id, case2.case_id], self.domain):
+                self.assertEqual(case.get_case_property('result'), 'abc')
+                self.assertEqual(case.get_case_property('result2'), 'def')
+
+        # one form per rule
+        self.assertEqual(CaseRuleSubmission.objects.filter(rule=rule1).count(), 1)
+        self.assertEqual(CaseRuleSubmission.objects.filter(rule=rule2).count(), 1)
+
+    def test_run_rules_for_cases_with_failed_case(self):
+        rule = _create_empty_rule(self.domain)
+        _, definition = rule.add_action(UpdateCaseDefinition, close_case=False)
+        definition.set_properties_to_update([
+            UpdateCaseDefinition.PropertyDefinition(
+                name='result',
+                value_type=UpdateCaseDefinition.VALUE_TYPE_EXACT,
+                value='abc',
+            ),
+        ])
+        definition.save()
+
+        with _with_case(self.domain, 'person', datetime.utcnow()) as case1, \
+                _with_case(self.domain, 'person', datetime.utcnow()) as case2:
+            def fail_with_case2(domain, case_changes, **kwargs):
+                if any(case_id == case2.case_id for case_id, properties, close in case_changes):
+                    raise AssertionError()
+                return bulk_update_cases(domain, case_changes, **kwargs)
+
+            with patch('corehq.apps.data_interfaces.models.bulk_update_cases') as bulk_update_patch, \
+                    patch('corehq.apps.data_interfaces.models.notify_exception'):
+                bulk_update_patch.side_effect = fail_with_case2
+                result = run_rules_for_cases(self.domain, [case1, case2], [rule], datetime.utcnow())
+            # the form of both cases failed, and then each case was submitted on its own
+            self.assertEqual(bulk_update_patch.call_count, 3)
+            self.assertEqual(result, CaseRuleActionResult(num_updates=1, num_errors=1))
+
+            case1 = CommCareCase.objects.get_case(case1.case_id, self.domain)
+            self.assertEqual(case1.get_case_property('result'), 'abc')
+            case2 = CommCareCase.objects.get_case(case2.case_id, self.domain)
+            self.assertIsNone(case2.get_case_property('result'))
+
     def test_single_failure_is_isolated(self):
 
         def fail_on_person2(case, now):
@@ -11,6 +11,7 @@ from casexml.apps.case.mock import CaseFactory
 from corehq.apps.change_feed import topics
 from corehq.apps.change_feed.topics import get_topic_offset
 from corehq.apps.data_interfaces.deduplication import (
+    DuplicateCaseIndex,
     _get_es_filtered_case_query,
     backfill_deduplicate_rule,
     find_duplicate_case_ids,
@@ -367,6 +368,89 @@ class FindingDuplicatesTest(TestCase):
                               find_duplicate_case_ids(self.domain, cases[0], ["name", "dob"], match_type="ANY"))
 
 
+class DuplicateCaseIndexTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.domain = 'naboo'
+        self.factory = CaseFactory(self.domain)
+        self.rule = AutomaticUpdateRule.objects.create(
+            domain=self.domain,
+            name='test',
+            case_type='person',
+            active=True,
+            deleted=False,
+            filter_on_server_modified=False,
+            server_modified_boundary=None,
+            workflow=AutomaticUpdateRule.WORKFLOW_DEDUPLICATE,
+        )
+
+    def _create_cases(self, names_and_dobs):
+        return [
+            self.factory.create_case(case_name=case_name, case_type='person', update={'dob': dob})
+            for (case_name, dob) in names_and_dobs
+        ]
+
+    def _build_index(self, case_properties, match_type=CaseDeduplicationMatchTypeChoices.ALL):
+        _, action = self.rule.add_action(
+            CaseDeduplicationActionDefinition,
+            match_type=match_type,
+            case_properties=case_properties,
+            include_closed=False,
+        )
+        return DuplicateCaseIndex.build(self.domain, self.rule, action)
+
+    def test_find_duplicates(self):
+        cases = self._create_cases([
+            ("Padme Amidala", "1901-05-01"),
+            ("Padme Amidala", "1901-05-01"),
+            ("Anakin Skywalker", "1977-03-25"),
+            ("Darth Vadar", "1977-03-25"),
+        ])
+        index = self._build_index(["name", "dob"])
+
+        self.assertItemsEqual(
+            index.find_duplicate_case_ids(cases[0].case_id),
+            [cases[0].case_id, cases[1].case_id],
+        )
+        self.assertItemsEqual(index.find_duplicate_case_ids(cases[2].case_id), [cases[2].case_id])
+        self.assertIsNone(index.find_duplicate_case_ids('missing'))
+
+    def test_find_duplicates_any(self):
+        cases = self._create_cases([
+            ("Padme Amidala", "1901-05-01"),
+            ("Padme Amidala", "1901-05-02"),
+            ("Padme Naberrie", "1901-05-01"),
+            ("Anakin Skywalker", ""),
+        ])
+        index = self._build_index(["name", "dob"], CaseDeduplicationMatchTypeChoices.ANY)
+
+        self.assertItemsEqual(
+            index.find_duplicate_case_ids(cases[0].case_id),
+            [cases[0].case_id, cases[1].case_id, cases[2].case_id],
+        )
+        self.assertItemsEqual(index.find_duplicate_case_ids(cases[3].case_id), [cases[3].case_id])
+
+    def test_case_properties_filter(self):
+        cases = self._create_cases([
+            ("Anakin Skywalker", "1977-03-25"),
+            ("Darth Vadar", "1977-03-25"),
+            ("Anakin Skywalker", "1977-03-25"),
+        ])
+        self.rule.add_criteria(
+            MatchPropertyDefinition,
+            property_name='name',
+            property_value='Anakin Skywalker',
+            match_type=MatchPropertyDefinition.MATCH_EQUAL,
+        )
+        index = self._build_index(["dob"])
+
+        self.assertItemsEqual(
+            index.find_duplicate_case_ids(cases[1].case_id),
+            [cases[0].case_id, cases[2].case_id],
+        )
+
+
 class CaseDeduplicationActionTest(TestCase):
 
     @classmethod
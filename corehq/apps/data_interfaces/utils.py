@@ -1,3 +1,4 @@
+from contextlib import ExitStack
 from datetime import datetime, timedelta
 from typing import List, Optional
 
@@ -6,14 +7,16 @@ from django.utils.translation import gettext as _
 
 from couchdbkit import ResourceNotFound
 
+from dimagi.utils.chunked import chunked
 from dimagi.utils.logging import notify_error, notify_exception
 from soil import DownloadBase
 
 from corehq.apps.casegroups.models import CommCareCaseGroup
 from corehq.apps.domain.models import Domain
 from corehq.apps.domain_migration_flags.api import any_migrations_in_progress
-from corehq.form_processor.models import CommCareCase, XFormInstance
+from corehq.form_processor.models import CaseRecord, CommCareCase, XFormInstance
 from corehq.motech.repeaters.const import RECORD_CANCELLED_STATE
+from corehq.util.metrics import metrics_counter, metrics_histogram_timer
 
 
 def add_cases_to_case_group(domain, case_group_id, uploaded_data, progress_tracker):
@@ -223,13 +226,14 @@ def iter_cases_and_run_rules(domain, case_iterator, rules, now, run_id, case_typ
 
     domain_obj = Domain.get_by_name(domain)
     max_allowed_updates = domain_obj.auto_case_update_limit or settings.MAX_RULE_UPDATES_IN_ONE_RUN
+    chunk_size = settings.AUTO_UPDATE_RULE_CASE_CHUNK_SIZE
     start_run = datetime.utcnow()
     case_update_result = CaseRuleActionResult()
 
     cases_checked = 0
     last_migration_check_time = None
 
-    for case in case_iterator:
+    for cases in chunked(case_iterator, chunk_size, list):
         migration_in_progress, last_migration_check_time = _check_data_migration_in_progress(
             domain, last_migration_check_time
         )
@@ -245,10 +249,20 @@ def iter_cases_and_run_rules(domain, case_iterator, rules, now, run_id, case_typ
                 run_id, cases_checked, case_update_result, db=db, halted=True
             )
 
-        case_update_result.add_result(run_rules_for_case(case, rules, now))
+        # records are cases that don't match any of the rules
+        cases_to_run = [case for case in cases if not isinstance(case, CaseRecord)]
+        with metrics_histogram_timer(
+            'commcare.case_rules.chunk_processing',
+            timing_buckets=(1, 5, 10, 30, 60, 300),
+            tags={'workflow': rules[0].workflow if rules else ''},
+        ):
+            case_update_result.add_result(run_rules_for_cases(domain, cases_to_run, rules, now))
+        metrics_counter('commcare.case_rules.cases_checked', len(cases))
+
         if progress_helper is not None:
-            progress_helper.increment_current_case_count()
-        cases_checked += 1
+            for case in cases:
+                progress_helper.increment_current_case_count()
+        cases_checked += len(cases)
     return DomainCaseRuleRun.done(run_id, cases_checked, case_update_result, db=db)
 
 
@@ -260,6 +274,49 @@ def _check_data_migration_in_progress(domain, last_migration_check_time):
     return False, last_migration_check_time
 
 
+def run_rules_for_cases(domain, cases, rules, now):
+    """
+    Run rules on a chunk of cases, like run_rules_for_case does for one case
+
+    Case updates of the rules are submitted in one form per rule. Cases
+    updated by a rule are refetched in bulk after those forms are submitted,
+    and then the following rules are run on them.
+    """
+    from corehq.apps.data_interfaces.models import (
+        CaseRuleActionResult,
+        CaseUpdateBatch,
+    )
+    aggregated_result = CaseRuleActionResult()
+    update_batch = CaseUpdateBatch(domain)
+    cases_and_rule_indexes = [(case, 0) for case in cases]
+    while cases_and_rule_indexes:
+        next_rule_index_by_case_id = {}
+        with ExitStack() as stack:
+            for rule in rules:
+                stack.enter_context(rule.batching_case_updates(update_batch))
+            for case, first_rule_index in cases_and_rule_indexes:
+                for rule_index in range(first_rule_index, len(rules)):
+                    last_result = _run_rule(rules[rule_index], case, now)
+                    aggregated_result.add_result(last_result)
+                    if last_result.num_closes > 0:
+                        break
+                    if (
+                        last_result.num_updates > 0 or last_result.num_related_updates > 0
+                        or last_result.num_related_closes > 0
+                    ):
+                        if rule_index + 1 < len(rules):
+                            next_rule_index_by_case_id[case.case_id] = rule_index + 1
+                        break
+
+        aggregated_result.add_result(update_batch.submit())
+        updated_cases = CommCareCase.objects.get_cases(list(next_rule_index_by_case_id), domain)
+        cases_and_rule_indexes = [
+            (case, next_rule_index_by_case_id[case.case_id]) for case in updated_cases
+        ]
+
+    return aggregated_result
+
+
 def run_rules_for_case(case, rules, now):
     from corehq.apps.data_interfaces.models import CaseRuleActionResult
     aggregated_result = CaseRuleActionResult()
@@ -272,18 +329,22 @@ def run_rules_for_case(case, rules, now):
             ):
                 case = CommCareCase.objects.get_case(case.case_id, case.domain)
 
-        try:
-            last_result = rule.run_rule(case, now)
-        except Exception:
-            last_result = CaseRuleActionResult(num_errors=1)
-            notify_exception(None, "Error applying case update rule", {
-                'domain': case.domain,
-                'rule_pk': rule.pk,
-                'case_id': case.case_id,
-            })
-
+        last_result = _run_rule(rule, case, now)
         aggregated_result.add_result(last_result)
         if last_result.num_closes > 0:
             break
 
     return aggregated_result
+
+
+def _run_rule(rule, case, now):
+    from corehq.apps.data_interfaces.models import CaseRuleActionResult
+    try:
+        return rule.run_rule(case, now)
+    except Exception:
+        notify_exception(None, "Error applying case update rule", {
+            'domain': case.domain,
+            'rule_pk': rule.pk,
+            'case_id': case.case_id,
+        })
+        return CaseRuleActionResult(num_errors=1)
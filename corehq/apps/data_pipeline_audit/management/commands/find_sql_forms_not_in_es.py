@@ -55,17 +55,18 @@ class Command(BaseCommand):
 
 
 def iter_form_ids_by_last_modified(start_datetime, end_datetime):
-    from corehq.sql_db.util import paginate_query_across_partitioned_databases
+    from corehq.sql_db.util import paginate_query_across_partitioned_databases_in_parallel
 
     annotate = {
         'last_modified': Greatest('received_on', 'edited_on', 'deleted_on'),
     }
 
-    return paginate_query_across_partitioned_databases(
+    return paginate_query_across_partitioned_databases_in_parallel(
         XFormInstance,
         (Q(last_modified__gt=start_datetime, last_modified__lt=end_datetime)
          & Q(state__in=[XFormInstance.NORMAL, XFormInstance.ARCHIVED])),
         annotate=annotate,
         values=['form_id'],
-        load_source='find_sql_forms_not_in_es'
+        load_source='find_sql_forms_not_in_es',
+        interleave=True,
     )
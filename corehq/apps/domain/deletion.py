@@ -403,6 +403,7 @@ DOMAIN_DELETE_OPERATIONS = [
     ModelDeletion('domain', 'TransferDomainRequest', 'domain'),
     ModelDeletion('export', 'EmailExportWhenDoneRequest', 'domain'),
     ModelDeletion('export', 'LedgerSectionEntry', 'domain'),
+    ModelDeletion('export', 'ExportRebuildCheckpoint', 'domain'),
     CustomDeletion('export', _delete_data_files, []),
     ModelDeletion('geospatial', 'GeoPolygon', 'domain'),
     ModelDeletion('locations', 'LocationFixtureConfiguration', 'domain'),
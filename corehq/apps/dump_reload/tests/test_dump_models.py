@@ -62,6 +62,7 @@ IGNORE_MODELS = {
     "enterprise.EnterprisePermissions",
     "export.DefaultExportSettings",     # tied to an account, not a domain
     "export.EmailExportWhenDoneRequest",  # transient model tied to an export task
+    "export.ExportRebuildCheckpoint",  # rows are rebuilt from the forms and cases of the export
     "form_processor.DeprecatedXFormAttachmentSQL",
     "hqadmin.HistoricalPillowCheckpoint",
     "hqadmin.HqDeploy",
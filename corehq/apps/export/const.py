@@ -101,6 +101,8 @@ SMS_EXPORT = 'sms'
 MAX_NORMAL_EXPORT_SIZE = 100000
 MAX_DAILY_EXPORT_SIZE = 1000000
 CASE_SCROLL_SIZE = 10000
+# Number of export rows to extract before handing them to the writer
+EXPORT_ROW_BATCH_SIZE = 1000
 
 # When a question is missing completely from a form/case this should be the value
 MISSING_VALUE = '---'
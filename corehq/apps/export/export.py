@@ -14,14 +14,14 @@ from couchexport.models import Format
 from dimagi.utils.logging import notify_exception
 from soil import DownloadBase
 
-from corehq.apps.export.const import MAX_NORMAL_EXPORT_SIZE, MAX_DAILY_EXPORT_SIZE
+from corehq.apps.export.const import EXPORT_ROW_BATCH_SIZE, MAX_NORMAL_EXPORT_SIZE, MAX_DAILY_EXPORT_SIZE
 from corehq.apps.export.dbaccessors import get_properly_wrapped_export_instance
 from corehq.apps.export.models.new import (
     CaseExportInstance,
     FormExportInstance,
     SMSExportInstance,
-    ALL_CASE_TYPE_TABLE
 )
+from corehq.apps.export.row_extractor import ExportRowExtractor
 from corehq.toggles import PAGINATED_EXPORTS
 from corehq.util.metrics.load_counters import load_counter
 from corehq.util.files import TransientTempfile, safe_filename
@@ -76,11 +76,16 @@ class _ExportWriter(object):
             # open the ExportWriter
             headers = []
             table_titles = {}
+            column_types = {}
             for instance_index, instance in enumerate(export_instances):
                 headers += [
                     (t, (t.get_headers(split_columns=instance.split_multiselects),))
                     for t in instance.selected_tables
                 ]
+                column_types.update({
+                    t: t.get_column_types(split_columns=instance.split_multiselects)
+                    for t in instance.selected_tables
+                })
                 for table_index, table in enumerate(instance.selected_tables):
                     sheet_name = table.label or "Sheet{}".format(table_index + 1)
                     # If it's a bulk export and the sheet has the same name as another sheet,
@@ -91,7 +96,8 @@ class _ExportWriter(object):
                             sheet_name
                         )
                     table_titles[table] = sheet_name
-            self.writer.open(headers, file, table_titles=table_titles, archive_basepath=name)
+            self.writer.open(headers, file, table_titles=table_titles, archive_basepath=name,
+                             column_types=column_types)
             try:
                 yield
             finally:
@@ -104,13 +110,25 @@ class _ExportWriter(object):
         :param table: A TableConfiguration
         :param row: An ExportRow
         """
+        return self.write_rows(table, [row])
+
+    def write_rows(self, table, rows):
+        """
+        Write the given rows to the given table of the export.
+        _Writer must be opened first.
+        :param table: A TableConfiguration
+        :param rows: A list of ExportRows
+        """
         return self.writer.write([
-            (table, [FormattedRow(
-                data=row.data,
-                hyperlink_column_indices=row.hyperlink_column_indices,
-                skip_excel_formatting=row.skip_excel_formatting
-                if hasattr(row, 'skip_excel_formatting') else ()
-            )])
+            (table, [
+                FormattedRow(
+                    data=row.data,
+                    hyperlink_column_indices=row.hyperlink_column_indices,
+                    skip_excel_formatting=row.skip_excel_formatting
+                    if hasattr(row, 'skip_excel_formatting') else ()
+                )
+                for row in rows
+            ])
         ])
 
     def get_preview(self):
@@ -137,6 +155,7 @@ class _PaginatedExportWriter(object):
 
         self.name = self._get_name(export_instances)
         self.headers = self._get_headers(export_instances)
+        self.column_types = self._get_column_types(export_instances)
         self.table_names = self._get_table_names(export_instances)
 
         with open(self.path, 'wb') as file_handle:
@@ -144,7 +163,11 @@ class _PaginatedExportWriter(object):
                 self._get_paginated_headers().items(),
                 file_handle,
                 table_titles=self._get_paginated_table_titles(),
-                archive_basepath=self.name
+                archive_basepath=self.name,
+                column_types={
+                    self._paged_table_index(table): column_types
+                    for table, column_types in self.column_types.items()
+                },
             )
             try:
                 yield
@@ -178,6 +201,17 @@ class _PaginatedExportWriter(object):
 
         return headers
 
+    def _get_column_types(self, export_instances):
+        '''
+        Returns a dictionary that maps all TableConfigurations in the list of ExportInstances to a
+        list of the data types of their columns
+        '''
+        return {
+            table: table.get_column_types(split_columns=instance.split_multiselects)
+            for instance in export_instances
+            for table in instance.selected_tables
+        }
+
     def _get_table_names(self, export_instances):
         '''
         Returns a dictionary that maps all TableConfigurations in the list of ExportInstances to a
@@ -253,16 +287,31 @@ class _PaginatedExportWriter(object):
         :param table: A TableConfiguration
         :param row: An ExportRow
         """
-        if self.rows_written[table] >= MAX_NORMAL_EXPORT_SIZE * (self.pages[table] + 1):
-            self.pages[table] += 1
-            self.writer.add_table(
-                self._paged_table_index(table),
-                self._get_paginated_headers()[self._paged_table_index(table)][0],
-                table_title=self._get_paginated_table_titles()[self._paged_table_index(table)],
-            )
+        self.write_rows(table, [row])
 
-        self.writer.write([(self._paged_table_index(table), [FormattedRow(data=row.data)])])
-        self.rows_written[table] += 1
+    def write_rows(self, table, rows):
+        """
+        Write the given rows to the given table of the export, starting
+        new pages as needed.
+        :param table: A TableConfiguration
+        :param rows: A list of ExportRows
+        """
+        while rows:
+            if self.rows_written[table] >= MAX_NORMAL_EXPORT_SIZE * (self.pages[table] + 1):
+                self.pages[table] += 1
+                self.writer.add_table(
+                    self._paged_table_index(table),
+                    self._get_paginated_headers()[self._paged_table_index(table)][0],
+                    table_title=self._get_paginated_table_titles()[self._paged_table_index(table)],
+                    column_types=self.column_types[table],
+                )
+
+            page_size = MAX_NORMAL_EXPORT_SIZE * (self.pages[table] + 1) - self.rows_written[table]
+            page_rows, rows = rows[:page_size], rows[page_size:]
+            self.writer.write([
+                (self._paged_table_index(table), [FormattedRow(data=row.data) for row in page_rows])
+            ])
+            self.rows_written[table] += len(page_rows)
 
 
 def get_export_writer(export_instances, temp_path, allow_pagination=True):
@@ -365,50 +414,57 @@ def write_export_instance(writer, export_instance, documents,
         total_rows = 0
         track_load = load_counter(export_instance.type, "export", export_instance.domain)
 
+        extractor = ExportRowExtractor(export_instance, include_hyperlinks=include_hyperlinks)
+        buffered_rows = [[] for compiled_table in extractor.tables]
+        buffered_row_count = 0
+
         for row_number, doc in enumerate(documents):
             total_bytes += sys.getsizeof(doc)
-            for table in export_instance.selected_tables:
+            for compiled_table, table_rows in zip(extractor.tables, buffered_rows):
                 # This is for bulk exports on all case types.
                 # Skip over the tables that this doc shouldn't go into.
-                path_names = [path.name for path in table.path]
-                if ALL_CASE_TYPE_TABLE in table.path and doc['type'] not in path_names:
+                if not compiled_table.includes(doc):
                     continue
 
                 try:
-                    rows = table.get_rows(
-                        doc,
-                        row_number,
-                        split_columns=export_instance.split_multiselects,
-                        transform_dates=export_instance.transform_dates,
-                        include_hyperlinks=include_hyperlinks,
-                    )
+                    rows = compiled_table.get_rows(doc, row_number)
                 except Exception as e:
                     notify_exception(None, "Error exporting doc", details={
                         'domain': export_instance.domain,
                         'export_instance_id': export_instance.get_id,
-                        'export_table': table.label,
+                        'export_table': compiled_table.table.label,
                         'doc_id': doc.get('_id'),
                     })
                     e.sentry_capture = False
                     raise
 
-                for row in rows:
-                    # It might be bad to write one row at a time from a performance perspective.
-                    # Regardless, we should handle the batching of rows in the _Writer class, not here.
-                    writer.write(table, row)
-
+                table_rows.extend(rows)
+                buffered_row_count += len(rows)
                 total_rows += len(rows)
 
+            if buffered_row_count >= EXPORT_ROW_BATCH_SIZE:
+                _write_buffered_rows(writer, extractor, buffered_rows)
+                buffered_row_count = 0
+
             track_load()
             if progress_tracker:
                 progress_manager.set_progress(row_number + 1, documents.count)
 
+        _write_buffered_rows(writer, extractor, buffered_rows)
+
     end = _time_in_milliseconds()
     tags = {'format': writer.format}
     _record_datadog_export_duration(end - start, total_bytes, total_rows, tags)
     _record_export_duration(end - start, export_instance)
 
 
+def _write_buffered_rows(writer, extractor, buffered_rows):
+    for compiled_table, rows in zip(extractor.tables, buffered_rows):
+        if rows:
+            writer.write_rows(compiled_table.table, rows)
+            rows.clear()
+
+
 def _time_in_milliseconds():
     return int(time.time() * 1000)
 
@@ -449,6 +505,11 @@ def rebuild_export(export_instance, progress_tracker):
     """
     Rebuild the given daily saved ExportInstance
     """
+    from corehq.apps.export.incremental import (
+        get_incremental_export_file,
+        supports_incremental_rebuild,
+    )
+
     filters = export_instance.get_filters() or []
     export_size = get_export_size(export_instance, filters)
     include_hyperlinks = export_size < MAX_NORMAL_EXPORT_SIZE
@@ -458,9 +519,16 @@ def rebuild_export(export_instance, progress_tracker):
             f"of {MAX_DAILY_EXPORT_SIZE} rows.")
     es_filters = [f.to_es_filter() for f in filters]
     with TransientTempfile() as temp_path:
-        export_file = get_export_file([export_instance], es_filters, temp_path,
-                                      progress_tracker,
-                                      include_hyperlinks=include_hyperlinks)
+        if supports_incremental_rebuild(export_instance):
+            start = _time_in_milliseconds()
+            export_file = get_incremental_export_file(export_instance, es_filters, temp_path,
+                                                      progress_tracker,
+                                                      include_hyperlinks=include_hyperlinks)
+            _record_export_duration(_time_in_milliseconds() - start, export_instance)
+        else:
+            export_file = get_export_file([export_instance], es_filters, temp_path,
+                                          progress_tracker,
+                                          include_hyperlinks=include_hyperlinks)
         with export_file as payload:
             save_export_payload(export_instance, payload)
 
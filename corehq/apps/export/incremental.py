@@ -0,0 +1,453 @@
+"""
+Incremental rebuilds of daily saved exports.
+
+A full rebuild of a daily saved export fetches every document of the
+export and extracts its rows, every time, although most of the documents
+have not changed since the previous rebuild.
+
+For domains with the INCREMENTAL_SAVED_EXPORTS toggle enabled, the rows
+extracted from each document of a form or case export are kept in the
+blob db, in gzipped pages of PAGE_SIZE documents ordered by row number,
+along with an index of the documents' ids. An ExportRebuildCheckpoint
+records the keys of those blobs and the time up to which they are up to
+date (the watermark, using the ``inserted_at`` time at which Elasticsearch
+indexed each document). The next rebuild only fetches the documents indexed
+since the watermark: documents that are already in the pages are replaced
+in place, new documents are appended, and documents that no longer match
+the export are removed. Only the pages containing those documents are
+rewritten, and the export file is then written from the stored rows
+without any further Elasticsearch queries.
+
+Pages are never modified. Changed pages are saved to new blobs, and the
+blobs that are no longer used are deleted after the checkpoint has been
+updated. New documents are appended in the order in which they were
+indexed, and removed documents leave gaps in the row numbers, until the
+next full rebuild.
+
+Documents indexed after an update starts are left to the next update, so
+that a project that keeps receiving data while its export is updated does
+not fail the check of the number of stored documents.
+
+The export is fully rebuilt when there is no checkpoint, when the export's
+tables or query change (including its filters, so exports with relative
+date filters are fully rebuilt every day), when the last full rebuild is
+older than MAX_CHECKPOINT_AGE, when a large part of the export changed, or
+when the number of stored documents does not match the export's query.
+
+Exports with columns whose values come from other documents, like
+usernames, owner names, case names or ledger values, are always fully
+rebuilt, because the stored rows of unchanged documents would keep stale
+values.
+"""
+import gzip
+import hashlib
+import json
+import tempfile
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from corehq.apps.es import filters
+from corehq.apps.export.const import (
+    CASE_EXPORT,
+    CASE_NAME_TRANSFORM,
+    CASE_OR_USER_ID_TRANSFORM,
+    FORM_EXPORT,
+    OWNER_ID_TRANSFORM,
+    USERNAME_TRANSFORM,
+)
+from corehq.apps.export.export import ExportFile, get_export_query, get_export_writer
+from corehq.apps.export.models.new import (
+    ExportRebuildCheckpoint,
+    ExportRow,
+    StockExportColumn,
+)
+from corehq.apps.export.row_extractor import ExportRowExtractor
+from corehq.blobs import CODES, get_blob_db
+from corehq.blobs.exceptions import NotFound
+from corehq.toggles import INCREMENTAL_SAVED_EXPORTS
+from corehq.util.metrics import metrics_counter
+from corehq.util.metrics.load_counters import load_counter
+from soil.progress import TaskProgressManager
+
+# Change this when the format of the stored rows changes
+STORED_ROWS_VERSION = 1
+# Number of documents in each page of stored rows
+PAGE_SIZE = 10000
+# Documents may not be searchable as soon as they are indexed, so the
+# documents indexed shortly before the watermark are fetched again
+WATERMARK_OVERLAP = timedelta(hours=1)
+# An update only includes documents indexed this long before it started,
+# so that they are all searchable. Later ones are left to the next update.
+UPDATE_CUTOFF_DELAY = timedelta(minutes=1)
+MAX_CHECKPOINT_AGE = timedelta(days=7)
+# Fully rebuild the export if more than this fraction of its documents changed
+MAX_CHANGED_FRACTION = 0.5
+# Blobs of stored rows are only used until the next full rebuild
+BLOB_TIMEOUT = int(2 * MAX_CHECKPOINT_AGE.total_seconds()) // 60
+# Transforms that look up the values of other documents
+LOOKUP_TRANSFORMS = (
+    CASE_NAME_TRANSFORM,
+    CASE_OR_USER_ID_TRANSFORM,
+    OWNER_ID_TRANSFORM,
+    USERNAME_TRANSFORM,
+)
+
+
+def supports_incremental_rebuild(export_instance):
+    return (
+        export_instance.type in (FORM_EXPORT, CASE_EXPORT)
+        and INCREMENTAL_SAVED_EXPORTS.enabled(export_instance.domain)
+        and not _uses_other_documents(export_instance)
+    )
+
+
+def _uses_other_documents(export_instance):
+    """
+    Returns True if the export has columns whose values come from other
+    documents, like usernames or ledger values. The stored rows of a
+    document are only updated when the document itself changes, so these
+    values would go stale.
+    """
+    return any(
+        column.item.transform in LOOKUP_TRANSFORMS or isinstance(column, StockExportColumn)
+        for table in export_instance.selected_tables
+        for column in table.selected_columns
+    )
+
+
+def get_incremental_export_file(export_instance, es_filters, temp_path,
+                                progress_tracker=None, include_hyperlinks=True):
+    """
+    Return an export file for the given daily saved ExportInstance, updating
+    the rows stored by its previous rebuild if possible
+    """
+    builder = _IncrementalExportBuilder(export_instance, es_filters, include_hyperlinks)
+    started_on = datetime.utcnow()
+    checkpoint = ExportRebuildCheckpoint.objects.filter(export_instance_id=export_instance.get_id).first()
+
+    with TaskProgressManager(progress_tracker, src="export") as progress_manager:
+        def set_progress(current, total):
+            if progress_tracker:
+                progress_manager.set_progress(current, total)
+
+        stored_rows = export_file = None
+        if checkpoint is not None and builder.can_update(checkpoint, started_on):
+            try:
+                stored_rows = builder.update(checkpoint, started_on - UPDATE_CUTOFF_DELAY, set_progress)
+                if stored_rows is not None:
+                    export_file = builder.write_export_file(stored_rows, temp_path)
+            except NotFound:
+                # the blobs were replaced by a concurrent rebuild
+                stored_rows = None
+            if stored_rows is None:
+                builder.delete_new_blobs()
+        result = 'updated'
+        if export_file is None:
+            result = 'rebuilt'
+            stored_rows = builder.rebuild(set_progress)
+            export_file = builder.write_export_file(stored_rows, temp_path)
+
+    builder.save_checkpoint(checkpoint, stored_rows, started_on, full_rebuild=result == 'rebuilt')
+    metrics_counter('commcare.export.incremental_rebuild', tags={'result': result})
+    return export_file
+
+
+class _StoredRows(object):
+
+    def __init__(self, index_key, page_keys, doc_count, row_count):
+        self.index_key = index_key
+        self.page_keys = page_keys
+        self.doc_count = doc_count
+        self.row_count = row_count
+
+
+class _IncrementalExportBuilder(object):
+
+    def __init__(self, export_instance, es_filters, include_hyperlinks=True):
+        self.export_instance = export_instance
+        self.query = get_export_query(export_instance, es_filters)
+        self.extractor = ExportRowExtractor(export_instance, include_hyperlinks=include_hyperlinks)
+        self.config_hash = _get_config_hash(export_instance, self.query)
+        self.track_load = load_counter(export_instance.type, "export", export_instance.domain)
+        self.new_blob_keys = []
+
+    def can_update(self, checkpoint, now):
+        return (
+            checkpoint.config_hash == self.config_hash
+            and now - checkpoint.full_rebuild_on < MAX_CHECKPOINT_AGE
+        )
+
+    def rebuild(self, set_progress):
+        """
+        Extract and store the rows of all the documents of the export
+        """
+        index_writer = self._get_lines_writer()
+        page_writer = None
+        page_keys = []
+        documents = self.query.scroll_ids_to_disk_and_iter_docs()
+        row_number = -1
+        for row_number, doc in enumerate(documents):
+            if page_writer is None:
+                page_writer = self._get_lines_writer()
+            index_writer.write(doc['_id'])
+            page_writer.write(_encode_line(doc['_id'], self._get_tables_rows(doc, row_number)))
+            if page_writer.line_count == PAGE_SIZE:
+                page_keys.append(page_writer.save())
+                page_writer = None
+            self.track_load()
+            set_progress(row_number + 1, documents.count)
+        if page_writer is not None:
+            page_keys.append(page_writer.save())
+        return _StoredRows(index_writer.save(), page_keys, doc_count=row_number + 1, row_count=row_number + 1)
+
+    def update(self, checkpoint, cutoff, set_progress):
+        """
+        Update the stored rows of the checkpoint with the documents indexed
+        since its watermark and before ``cutoff``.
+
+        Documents indexed after ``cutoff`` are left as they were, to be
+        updated by the next update, which fetches everything indexed since
+        the watermark that is saved for this one.
+
+        :returns: The updated rows, or None if the export should be fully
+        rebuilt instead
+        """
+        changed_since = filters.date_range(
+            'inserted_at', gte=checkpoint.watermark - WATERMARK_OVERLAP, lt=cutoff)
+        changed_ids = list(self.query.filter(changed_since).scroll_ids())
+        if len(changed_ids) > checkpoint.doc_count * MAX_CHANGED_FRACTION:
+            return None
+        # Documents of the export's type that changed but no longer match its query
+        base_query = self.export_instance.get_query(include_filters=False).remove_default_filters()
+        removed_ids = set(base_query.filter(changed_since).scroll_ids()).difference(changed_ids)
+
+        row_numbers = {}
+        lookup_ids = removed_ids.union(changed_ids)
+        for row_number, doc_id in enumerate(_iter_lines(checkpoint.index_key)):
+            if doc_id in lookup_ids:
+                row_numbers[doc_id] = row_number
+
+        lines_by_row_number = {}
+        new_ids = []
+        row_count = checkpoint.row_count
+        for count, doc in enumerate(self.query.adapter.iter_docs(changed_ids)):
+            doc_id = doc['_id']
+            row_number = row_numbers.get(doc_id)
+            if row_number is None:
+                row_number = row_count
+                row_count += 1
+                new_ids.append(doc_id)
+            lines_by_row_number[row_number] = _encode_line(doc_id, self._get_tables_rows(doc, row_number))
+            self.track_load()
+            set_progress(count + 1, len(changed_ids))
+        for doc_id in removed_ids:
+            if doc_id in row_numbers:
+                lines_by_row_number[row_numbers[doc_id]] = _encode_line(doc_id, None)
+
+        doc_count = checkpoint.doc_count
+        page_keys = list(checkpoint.page_keys)
+        for page_number, page_updates in groupby(
+                sorted(lines_by_row_number.items()), key=lambda item: item[0] // PAGE_SIZE):
+            if page_number < len(page_keys):
+                lines = list(_iter_lines(page_keys[page_number]))
+            else:
+                lines = []
+            for row_number, line in page_updates:
+                offset = row_number - page_number * PAGE_SIZE
+                if offset < len(lines):
+                    doc_count -= _has_rows(lines[offset])
+                    lines[offset] = line
+                else:
+                    # new documents are numbered from the end of the last page
+                    assert offset == len(lines), (row_number, len(lines))
+                    lines.append(line)
+                doc_count += _has_rows(line)
+
+            page_writer = self._get_lines_writer()
+            for line in lines:
+                page_writer.write(line)
+            if page_number < len(page_keys):
+                page_keys[page_number] = page_writer.save()
+            else:
+                page_keys.append(page_writer.save())
+
+        if not self._is_doc_count_valid(doc_count, base_query, cutoff):
+            return None
+
+        if new_ids:
+            index_writer = self._get_lines_writer()
+            for doc_id in _iter_lines(checkpoint.index_key):
+                index_writer.write(doc_id)
+            for doc_id in new_ids:
+                index_writer.write(doc_id)
+            index_key = index_writer.save()
+        else:
+            index_key = checkpoint.index_key
+        return _StoredRows(index_key, page_keys, doc_count, row_count)
+
+    def _is_doc_count_valid(self, doc_count, base_query, cutoff):
+        """
+        Checks that the stored rows have as many documents as the export's
+        query returns, up to ``cutoff``
+
+        The stored rows can also include documents indexed after ``cutoff``
+        that matched the export when they were stored, whether or not they
+        still match it.
+        """
+        min_count = self.query.filter(filters.date_range('inserted_at', lt=cutoff)).count()
+        max_count = min_count + base_query.filter(filters.date_range('inserted_at', gte=cutoff)).count()
+        return min_count <= doc_count <= max_count
+
+    def write_export_file(self, stored_rows, temp_path):
+        writer = get_export_writer([self.export_instance], temp_path)
+        with writer.open([self.export_instance]):
+            for page_key in stored_rows.page_keys:
+                page_rows = [[] for compiled_table in self.extractor.tables]
+                for line in _iter_lines(page_key):
+                    doc_id, tables_rows = _decode_line(line)
+                    if tables_rows is None:
+                        continue
+                    for compiled_table, rows, table_rows in zip(self.extractor.tables, tables_rows, page_rows):
+                        table_rows.extend(
+                            ExportRow(
+                                data=data,
+                                hyperlink_column_indices=compiled_table.hyperlink_column_indices,
+                                skip_excel_formatting=skip_excel_formatting,
+                            )
+                            for data, skip_excel_formatting in rows
+                        )
+                for compiled_table, rows in zip(self.extractor.tables, page_rows):
+                    if rows:
+                        writer.write_rows(compiled_table.table, rows)
+        return ExportFile(writer.path, writer.format)
+
+    def save_checkpoint(self, checkpoint, stored_rows, started_on, full_rebuild):
+        full_rebuild_on = started_on if full_rebuild else checkpoint.full_rebuild_on
+        ExportRebuildCheckpoint.objects.update_or_create(
+            export_instance_id=self.export_instance.get_id,
+            defaults={
+                'domain': self.export_instance.domain,
+                'config_hash': self.config_hash,
+                'watermark': started_on,
+                'full_rebuild_on': full_rebuild_on,
+                'doc_count': stored_rows.doc_count,
+                'row_count': stored_rows.row_count,
+                'index_key': stored_rows.index_key,
+                'page_keys': stored_rows.page_keys,
+            },
+        )
+        self.new_blob_keys = []
+        if checkpoint is not None:
+            used_keys = {stored_rows.index_key, *stored_rows.page_keys}
+            _delete_blobs(key for key in checkpoint.blob_keys() if key not in used_keys)
+
+    def delete_new_blobs(self):
+        _delete_blobs(self.new_blob_keys)
+        self.new_blob_keys = []
+
+    def _get_tables_rows(self, doc, row_number):
+        return [
+            [[row.data, row.skip_excel_formatting] for row in compiled_table.get_rows(doc, row_number)]
+            if compiled_table.includes(doc) else []
+            for compiled_table in self.extractor.tables
+        ]
+
+    def _get_lines_writer(self):
+        return _LinesBlobWriter(self.export_instance, self.new_blob_keys)
+
+
+class _LinesBlobWriter(object):
+    """
+    Writes lines of text to a new gzipped blob of an export instance
+    """
+
+    def __init__(self, export_instance, saved_keys):
+        self.export_instance = export_instance
+        self.saved_keys = saved_keys
+        self.file = tempfile.TemporaryFile()
+        self.gzip_file = gzip.GzipFile(fileobj=self.file, mode='wb')
+        self.line_count = 0
+
+    def write(self, line):
+        self.gzip_file.write(line.encode('utf-8'))
+        self.gzip_file.write(b'\n')
+        self.line_count += 1
+
+    def save(self):
+        """
+        :returns: The key of the new blob
+        """
+        try:
+            self.gzip_file.close()
+            self.file.seek(0)
+            meta = get_blob_db().put(
+                self.file,
+                domain=self.export_instance.domain,
+                parent_id=self.export_instance.get_id,
+                type_code=CODES.data_export,
+                timeout=BLOB_TIMEOUT,
+            )
+        finally:
+            self.file.close()
+        self.saved_keys.append(meta.key)
+        return meta.key
+
+
+def _iter_lines(key):
+    with get_blob_db().get(key=key, type_code=CODES.data_export) as blob:
+        with gzip.open(blob, 'rt', encoding='utf-8') as lines:
+            for line in lines:
+                yield line[:-1]
+
+
+def _delete_blobs(keys):
+    db = get_blob_db()
+    for key in keys:
+        db.delete(key=key)
+
+
+def _get_config_hash(export_instance, query):
+    config = {
+        'version': STORED_ROWS_VERSION,
+        'tables': [table.to_json() for table in export_instance.selected_tables],
+        'split_multiselects': export_instance.split_multiselects,
+        'transform_dates': export_instance.transform_dates,
+        'query': query.raw_query,
+    }
+    return hashlib.sha256(
+        json.dumps(config, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+def _encode_line(doc_id, tables_rows):
+    """
+    :param tables_rows: A list of the ``[data, skip_excel_formatting]`` of
+    the rows of the document for each table of the export, or None if the
+    document was removed from the export
+    """
+    return json.dumps([doc_id, tables_rows], default=_encode_value, separators=(',', ':'))
+
+
+def _decode_line(line):
+    doc_id, tables_rows = json.loads(line, object_hook=_decode_value)
+    return doc_id, tables_rows
+
+
+def _has_rows(line):
+    return _decode_line(line)[1] is not None
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    return str(value)
+
+
+def _decode_value(obj):
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    if '__date__' in obj:
+        return date.fromisoformat(obj['__date__'])
+    return obj
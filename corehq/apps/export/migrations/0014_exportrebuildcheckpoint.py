@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('export', '0013_rm_incrementalexport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportRebuildCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=255)),
+                ('export_instance_id', models.CharField(max_length=126, unique=True)),
+                ('config_hash', models.CharField(max_length=64)),
+                ('watermark', models.DateTimeField()),
+                ('full_rebuild_on', models.DateTimeField()),
+                ('doc_count', models.IntegerField()),
+                ('row_count', models.IntegerField()),
+                ('index_key', models.CharField(max_length=255)),
+                ('page_keys', models.JSONField(default=list)),
+                ('last_modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -428,6 +428,16 @@ class ExportColumn(DocumentSchema):
     def is_deidentifed(self):
         return bool(self.deid_transform)
 
+    @property
+    def datatype(self):
+        """
+        The data type of the column's values if it is known from its item.
+        Values of columns that transform or compute them are of unknown type.
+        """
+        if type(self).get_value is not ExportColumn.get_value or self.item.transform or self.deid_transform:
+            return None
+        return self.item.datatype
+
     def get_headers(self, split_column=False):
         if self.is_deidentifed:
             return [f"{self.label} *sensitive*"]
@@ -506,6 +516,18 @@ class TableConfiguration(DocumentSchema, ReadablePathMixin):
             headers.extend(column.get_headers(split_column=split_columns))
         return headers
 
+    def get_column_types(self, split_columns=False):
+        """
+        Return a list of the data types of the columns, matching get_headers.
+        Types are None where they are not known.
+        """
+        column_types = []
+        for column in self.selected_columns:
+            headers = column.get_headers(split_column=split_columns)
+            datatype = column.datatype if len(headers) == 1 else None
+            column_types.extend([datatype] * len(headers))
+        return column_types
+
     def get_rows(self, document, row_number, split_columns=False,
                  transform_dates=False, as_json=False, include_hyperlinks=True):
         """
@@ -3098,6 +3120,30 @@ class LedgerSectionEntry(models.Model):
         unique_together = ('domain', 'section_id', 'entry_id')
 
 
+class ExportRebuildCheckpoint(models.Model):
+    """
+    Where the rows of the last rebuild of a daily saved export are stored,
+    and up to when they are up to date. See corehq.apps.export.incremental
+    """
+    domain = models.CharField(max_length=255)
+    export_instance_id = models.CharField(max_length=126, unique=True)
+    # Hash of the export's configuration and query when the rows were stored
+    config_hash = models.CharField(max_length=64)
+    # Documents indexed after this time may not be included in the rows
+    watermark = models.DateTimeField()
+    full_rebuild_on = models.DateTimeField()
+    # Number of documents with stored rows, and the next row number.
+    # Documents that no longer match the export keep their row number.
+    doc_count = models.IntegerField()
+    row_count = models.IntegerField()
+    index_key = models.CharField(max_length=255)
+    page_keys = models.JSONField(default=list)
+    last_modified = models.DateTimeField(auto_now=True)
+
+    def blob_keys(self):
+        return [self.index_key] + self.page_keys
+
+
 def get_ledger_section_entry_combinations(domain):
     return list(
         LedgerSectionEntry.objects
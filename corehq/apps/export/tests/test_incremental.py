@@ -0,0 +1,158 @@
+from datetime import date, datetime
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase, TestCase
+
+from corehq.apps.export.const import FORM_EXPORT
+from corehq.apps.export.incremental import (
+    _decode_line,
+    _encode_line,
+    _has_rows,
+    _IncrementalExportBuilder,
+    _iter_lines,
+)
+from corehq.blobs.tests.util import TemporaryFilesystemBlobDB
+
+
+class StoredRowsEncodingTest(SimpleTestCase):
+
+    def test_round_trip(self):
+        tables_rows = [
+            [
+                [['0', 'foo', 12, 1.5, None, True, datetime(2020, 1, 1, 12, 30, 15, 5)], [0]],
+                [['1', date(2020, 1, 2), ''], [0]],
+            ],
+            [],
+        ]
+        line = _encode_line('abc123', tables_rows)
+        self.assertNotIn('\n', line)
+        self.assertEqual(_decode_line(line), ('abc123', tables_rows))
+        self.assertTrue(_has_rows(line))
+
+    def test_removed_document(self):
+        line = _encode_line('abc123', None)
+        self.assertEqual(_decode_line(line), ('abc123', None))
+        self.assertFalse(_has_rows(line))
+
+    def test_other_values_are_stored_as_text(self):
+        line = _encode_line('abc123', [[[[{'not', 'json'}], []]]])
+        [[[[value], skip_excel_formatting]]] = _decode_line(line)[1]
+        self.assertIsInstance(value, str)
+
+
+class FakeCompiledTable:
+
+    def includes(self, doc):
+        return True
+
+    def get_rows(self, doc, row_number):
+        return [Mock(data=[row_number, doc['_id'], doc['value']], skip_excel_formatting=[])]
+
+
+class FakeDocuments(list):
+
+    @property
+    def count(self):
+        return len(self)
+
+
+class IncrementalUpdateTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        page_size_patch = patch('corehq.apps.export.incremental.PAGE_SIZE', 2)
+        page_size_patch.start()
+        self.addCleanup(page_size_patch.stop)
+        self.blob_db = TemporaryFilesystemBlobDB()
+        self.addCleanup(self.blob_db.close)
+
+        self.docs = {doc_id: {'_id': doc_id, 'value': 1} for doc_id in ['a', 'b', 'c', 'd', 'e']}
+        self.query = Mock()
+        self.query.scroll_ids_to_disk_and_iter_docs.return_value = FakeDocuments(self.docs.values())
+        self.query.adapter.iter_docs.side_effect = lambda doc_ids: [self.docs[doc_id] for doc_id in doc_ids]
+        self.base_query = Mock()
+        export_instance = Mock(domain='test-incremental', get_id='abc123', type=FORM_EXPORT)
+        export_instance.get_query.return_value.remove_default_filters.return_value = self.base_query
+
+        with patch('corehq.apps.export.incremental.get_export_query', return_value=self.query), \
+                patch('corehq.apps.export.incremental.ExportRowExtractor') as extractor, \
+                patch('corehq.apps.export.incremental._get_config_hash'):
+            extractor.return_value.tables = [FakeCompiledTable()]
+            self.builder = _IncrementalExportBuilder(export_instance, [])
+        stored_rows = self.builder.rebuild(lambda current, total: None)
+        self.checkpoint = Mock(
+            watermark=datetime(2020, 1, 1),
+            index_key=stored_rows.index_key,
+            page_keys=stored_rows.page_keys,
+            doc_count=stored_rows.doc_count,
+            row_count=stored_rows.row_count,
+        )
+
+    def update(self, changed_ids, changed_in_base_query=(), count=None, count_after_cutoff=0):
+        """
+        :param count: The number of documents of the export's query
+        indexed before the cutoff
+        """
+        self.query.filter.return_value.scroll_ids.return_value = changed_ids
+        self.query.filter.return_value.count.return_value = count
+        self.base_query.filter.return_value.scroll_ids.return_value = list(changed_in_base_query)
+        self.base_query.filter.return_value.count.return_value = count_after_cutoff
+        return self.builder.update(self.checkpoint, datetime(2020, 1, 2), lambda current, total: None)
+
+    def get_lines(self, stored_rows):
+        return [
+            _decode_line(line)
+            for page_key in stored_rows.page_keys
+            for line in _iter_lines(page_key)
+        ]
+
+    def test_changed_doc_is_replaced_in_place(self):
+        self.docs['b']['value'] = 2
+        stored_rows = self.update(['b'], ['b'], count=5)
+
+        self.assertEqual(self.get_lines(stored_rows)[:3], [
+            ('a', [[[[0, 'a', 1], []]]]),
+            ('b', [[[[1, 'b', 2], []]]]),
+            ('c', [[[[2, 'c', 1], []]]]),
+        ])
+        self.assertNotEqual(stored_rows.page_keys[0], self.checkpoint.page_keys[0])
+        self.assertEqual(stored_rows.page_keys[1:], self.checkpoint.page_keys[1:])
+        self.assertEqual(stored_rows.index_key, self.checkpoint.index_key)
+        self.assertEqual((stored_rows.doc_count, stored_rows.row_count), (5, 5))
+
+    def test_new_docs_are_appended_across_pages(self):
+        self.docs['f'] = {'_id': 'f', 'value': 1}
+        self.docs['g'] = {'_id': 'g', 'value': 1}
+        stored_rows = self.update(['f', 'g'], ['f', 'g'], count=7)
+
+        self.assertEqual(len(stored_rows.page_keys), 4)
+        self.assertEqual(stored_rows.page_keys[:2], self.checkpoint.page_keys[:2])
+        self.assertEqual(self.get_lines(stored_rows)[4:], [
+            ('e', [[[[4, 'e', 1], []]]]),
+            ('f', [[[[5, 'f', 1], []]]]),
+            ('g', [[[[6, 'g', 1], []]]]),
+        ])
+        self.assertEqual(list(_iter_lines(stored_rows.index_key)), ['a', 'b', 'c', 'd', 'e', 'f', 'g'])
+        self.assertEqual((stored_rows.doc_count, stored_rows.row_count), (7, 7))
+
+    def test_removed_doc_is_blanked(self):
+        stored_rows = self.update([], ['b'], count=4)
+
+        lines = self.get_lines(stored_rows)
+        self.assertEqual([doc_id for doc_id, tables_rows in lines], ['a', 'b', 'c', 'd', 'e'])
+        self.assertIsNone(lines[1][1])
+        self.assertEqual((stored_rows.doc_count, stored_rows.row_count), (4, 5))
+
+    def test_removed_doc_that_was_not_stored(self):
+        stored_rows = self.update([], ['x'], count=5)
+        self.assertEqual((stored_rows.doc_count, stored_rows.row_count), (5, 5))
+
+    def test_wrong_doc_count(self):
+        self.assertIsNone(self.update(['b'], ['b'], count=6))
+
+    def test_docs_indexed_after_cutoff(self):
+        # "c" changed after the cutoff, so the export's query only counts
+        # four documents before it
+        stored_rows = self.update(['b'], ['b'], count=4, count_after_cutoff=1)
+        self.assertEqual(stored_rows.doc_count, 5)
+        self.assertIsNone(self.update(['b'], ['b'], count=4, count_after_cutoff=0))
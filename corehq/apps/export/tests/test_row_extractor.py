@@ -0,0 +1,118 @@
+from django.test import SimpleTestCase
+
+from corehq.apps.export.models import (
+    ALL_CASE_TYPE_TABLE,
+    ExportColumn,
+    MultipleChoiceItem,
+    Option,
+    PathNode,
+    RowNumberColumn,
+    ScalarItem,
+    SplitExportColumn,
+    TableConfiguration,
+)
+from corehq.apps.export.row_extractor import CompiledTable
+
+
+def _column(*names):
+    return ExportColumn(item=ScalarItem(path=[PathNode(name=name) for name in names]), selected=True)
+
+
+class CompiledTableTest(SimpleTestCase):
+
+    def assertSameRows(self, table, docs, **kwargs):
+        compiled_table = CompiledTable(table, **kwargs)
+        for row_number, doc in enumerate(docs):
+            expected = table.get_rows(doc, row_number, **kwargs)
+            actual = compiled_table.get_rows(doc, row_number)
+            self.assertEqual(
+                [(row.data, row.hyperlink_column_indices, row.skip_excel_formatting) for row in actual],
+                [(row.data, row.hyperlink_column_indices, row.skip_excel_formatting) for row in expected],
+            )
+
+    def test_form_columns(self):
+        table = TableConfiguration(
+            path=[],
+            columns=[
+                RowNumberColumn(label='number', selected=True),
+                _column('form', 'q1'),
+                _column('form', 'group', 'q2'),
+                _column('form', 'group'),
+                _column('form', 'missing', 'q3'),
+                _column('form', 'q1', 'not_a_group'),
+                _column('form', 'text'),
+                _column('form', 'list'),
+                _column('form', 'meta', 'timeEnd'),
+                _column(),
+                SplitExportColumn(
+                    item=MultipleChoiceItem(
+                        path=[PathNode(name='form'), PathNode(name='mc')],
+                        options=[Option(value='one'), Option(value='two')],
+                    ),
+                    selected=True,
+                ),
+            ]
+        )
+        docs = [
+            {
+                'domain': 'my-domain',
+                '_id': '1234',
+                'form': {
+                    'q1': 'foo',
+                    'group': {'q2': 'bar'},
+                    'text': {'#text': 'baz', 'id': '1'},
+                    'list': ['a', {'b': 'c'}],
+                    'meta': {'timeEnd': '2020-01-01T12:00:00.000000Z'},
+                    'mc': 'two extra',
+                },
+            },
+            {
+                'domain': 'my-domain',
+                '_id': '5678',
+                'form': 'not a dict',
+            },
+        ]
+        for split_columns in (False, True):
+            for transform_dates in (False, True):
+                self.assertSameRows(table, docs, split_columns=split_columns, transform_dates=transform_dates)
+
+    def test_repeat(self):
+        repeat_path = [PathNode(name='form'), PathNode(name='repeat', is_repeat=True)]
+        table = TableConfiguration(
+            path=repeat_path,
+            columns=[
+                RowNumberColumn(label='number', selected=True, repeat=1),
+                ExportColumn(item=ScalarItem(path=repeat_path + [PathNode(name='q1')]), selected=True),
+                ExportColumn(item=ScalarItem(path=repeat_path + [PathNode(name='group'), PathNode(name='q2')]),
+                             selected=True),
+            ]
+        )
+        docs = [
+            {
+                'domain': 'my-domain',
+                '_id': '1234',
+                'form': {
+                    'repeat': [
+                        {'q1': 'foo', 'group': {'q2': 'bar'}},
+                        {'q1': 'baz'},
+                    ],
+                },
+            },
+            {
+                'domain': 'my-domain',
+                '_id': '5678',
+                'form': {'repeat': {'q1': 'single'}},
+            },
+        ]
+        self.assertSameRows(table, docs)
+
+    def test_bulk_case_table(self):
+        table = TableConfiguration(
+            path=[PathNode(name='form'), ALL_CASE_TYPE_TABLE, PathNode(name='person')],
+            columns=[_column('name'), _column('type')],
+        )
+        compiled_table = CompiledTable(table)
+        person = {'domain': 'my-domain', '_id': '1234', 'type': 'person', 'name': 'Alice'}
+        self.assertTrue(compiled_table.includes(person))
+        self.assertFalse(compiled_table.includes({'type': 'household'}))
+        self.assertSameRows(table, [person])
@@ -106,6 +106,35 @@ class TableConfigurationTest(SimpleTestCase):
         self.assertIsNotNone(column)
         self.assertEqual(index, 1)
 
+    def test_get_column_types(self):
+        table_configuration = TableConfiguration(
+            path=[],
+            columns=[
+                RowNumberColumn(label='number', selected=True),
+                ExportColumn(
+                    item=ScalarItem(path=[PathNode(name='form'), PathNode(name='age')], datatype='integer'),
+                    selected=True,
+                ),
+                ExportColumn(
+                    item=ScalarItem(
+                        path=[PathNode(name='form'), PathNode(name='user_id')],
+                        datatype='string',
+                        transform=USERNAME_TRANSFORM,
+                    ),
+                    selected=True,
+                ),
+                ExportColumn(
+                    item=ScalarItem(path=[PathNode(name='received_on')], datatype='datetime'),
+                    selected=True,
+                ),
+                ExportColumn(
+                    item=ScalarItem(path=[PathNode(name='form'), PathNode(name='weight')], datatype='decimal'),
+                    selected=False,
+                ),
+            ]
+        )
+        self.assertEqual(table_configuration.get_column_types(), [None, 'integer', None, 'datetime'])
+
 
 class TableConfigurationGetSubDocumentsTest(SimpleTestCase):
 
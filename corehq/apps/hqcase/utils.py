@@ -204,7 +204,7 @@ def update_case(
     )
 
 
-def bulk_update_cases(domain, case_changes, device_id, xmlns=None):
+def bulk_update_cases(domain, case_changes, device_id, xmlns=None, user_id=None, form_name=None, max_wait=...):
     """
     Updates or closes a list of cases (or both) by submitting a form.
     domain - the cases' domain
@@ -214,12 +214,16 @@ def bulk_update_cases(domain, case_changes, device_id, xmlns=None):
                           to ignore case updates, leave this argument out
         close - True to close the case, False otherwise
     device_id - see submit_case_blocks device_id docs
+    user_id - see submit_case_blocks user_id docs
+    form_name - see submit_case_blocks form_name docs
+    max_wait - see update_case max_wait docs
     """
     case_blocks = []
     for case_id, case_properties, close in case_changes:
         case_block = _get_update_or_close_case_block(case_id, case_properties, close)
         case_blocks.append(case_block.as_text())
-    return submit_case_blocks(case_blocks, domain, device_id=device_id, xmlns=xmlns)
+    return submit_case_blocks(case_blocks, domain, user_id=user_id, device_id=device_id, xmlns=xmlns,
+                              form_name=form_name, max_wait=max_wait)
 
 
 def resave_case(domain, case, send_post_save_signal=True):
@@ -0,0 +1,195 @@
+"""
+In-memory snapshots of the location hierarchies of domains.
+
+``AdjListManager`` walks the location tree with a recursive CTE for every
+ancestor or descendant query, and location permission checks and case
+sharing lookups make many of them. A ``LocationHierarchy`` loads the
+parent of every location of a domain in one query and answers those
+questions in memory.
+
+Snapshots are kept in process memory for the most recently used domains.
+Each is tagged with the domain's hierarchy version, which is stored in the
+shared cache and replaced whenever a location of the domain is saved or
+deleted, once the transaction commits. Inside a transaction that changed
+the domain's locations ``get_location_hierarchy`` returns None, and callers
+fall back to querying the database.
+"""
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Number of domains whose hierarchy is kept in memory by each process
+MAX_CACHED_HIERARCHIES = 20
+
+# Largest number of location pks to inline in a query. Querysets of more
+# locations than this use the recursive CTE instead.
+MAX_QUERY_PKS = 1000
+
+_hierarchies = OrderedDict()  # domain: (version, LocationHierarchy)
+_hierarchies_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_location_hierarchy(domain):
+    """
+    Return the LocationHierarchy of the domain, or None if the domain's
+    locations were changed in the current transaction
+    """
+    changed_domains = _get_changed_domains()
+    if transaction.get_connection().in_atomic_block:
+        if domain in changed_domains:
+            return None
+    else:
+        # transactions that were rolled back leave their domains behind
+        changed_domains.clear()
+
+    # get the version before loading, so that a change made while the
+    # hierarchy is being loaded will invalidate it
+    version = _get_version(domain)
+    with _hierarchies_lock:
+        cached = _hierarchies.get(domain)
+        if cached is not None and version is not None and cached[0] == version:
+            _hierarchies.move_to_end(domain)
+            return cached[1]
+
+    hierarchy = LocationHierarchy.load(domain)
+    if version is not None:
+        with _hierarchies_lock:
+            _hierarchies[domain] = (version, hierarchy)
+            _hierarchies.move_to_end(domain)
+            while len(_hierarchies) > MAX_CACHED_HIERARCHIES:
+                _hierarchies.popitem(last=False)
+    return hierarchy
+
+
+def invalidate_location_hierarchy(domain):
+    """
+    Invalidate the cached hierarchies of the domain when the current
+    transaction is committed, or now if there is no transaction
+    """
+    if transaction.get_connection().in_atomic_block:
+        _get_changed_domains().add(domain)
+    transaction.on_commit(partial(_set_new_version, domain))
+
+
+def _set_new_version(domain):
+    cache.set(_get_version_key(domain), uuid.uuid4().hex, timeout=None)
+    _get_changed_domains().discard(domain)
+
+
+def _get_version(domain):
+    key = _get_version_key(domain)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _get_version_key(domain):
+    return 'location-hierarchy-version:{}'.format(domain)
+
+
+def _get_changed_domains():
+    try:
+        return _local.changed_domains
+    except AttributeError:
+        _local.changed_domains = set()
+        return _local.changed_domains
+
+
+class LocationHierarchy(object):
+    """
+    The tree of the locations of a domain. Locations are identified by
+    their primary keys (``SQLLocation.id``).
+    """
+
+    def __init__(self, locations):
+        """
+        :param locations: An iterable of the ``(id, location_id, parent_id,
+        name)`` of all the locations of a domain
+        """
+        self.location_ids_by_pk = {}
+        self.pks_by_location_id = {}
+        self.parent_pks = {}
+        self.names = {}
+        children = defaultdict(list)
+        for pk, location_id, parent_pk, name in locations:
+            self.location_ids_by_pk[pk] = location_id
+            self.pks_by_location_id[location_id] = pk
+            self.parent_pks[pk] = parent_pk
+            self.names[pk] = name or ''
+            children[parent_pk].append(pk)
+        self.children = {
+            parent_pk: sorted(child_pks, key=self._sort_key)
+            for parent_pk, child_pks in children.items()
+        }
+
+    @classmethod
+    def load(cls, domain):
+        from corehq.apps.locations.models import SQLLocation
+        return cls(
+            SQLLocation.objects
+            .filter(domain=domain)
+            .order_by()
+            .values_list('id', 'location_id', 'parent_id', 'name')
+        )
+
+    def __contains__(self, pk):
+        return pk in self.parent_pks
+
+    def get_pks(self, location_ids):
+        return [self.pks_by_location_id[loc_id] for loc_id in location_ids if loc_id in self.pks_by_location_id]
+
+    def get_location_ids(self, pks):
+        return [self.location_ids_by_pk[pk] for pk in pks]
+
+    def get_ancestor_pks(self, pk, include_self=False):
+        """
+        Return the ancestors of the location, root ancestor first
+        """
+        ancestor_pks = []
+        pk = pk if include_self else self.parent_pks.get(pk)
+        while pk is not None and pk in self.parent_pks:
+            ancestor_pks.append(pk)
+            pk = self.parent_pks[pk]
+            if len(ancestor_pks) > len(self.parent_pks):
+                raise ValueError("Location hierarchy has a cycle")
+        ancestor_pks.reverse()
+        return ancestor_pks
+
+    def get_descendant_pks(self, pks, include_self=False):
+        """
+        Return the descendants of the given locations, without duplicates,
+        ordered like ``AdjListManager.get_descendants``: depth first, with
+        the children of each location ordered by name
+        """
+        pks = {pk for pk in pks if pk in self}
+        top_pks = sorted(
+            (pk for pk in pks if not any(ancestor in pks for ancestor in self.get_ancestor_pks(pk))),
+            key=self._sort_key,
+        )
+        descendant_pks = []
+        for top_pk in top_pks:
+            stack = [top_pk]
+            while stack:
+                pk = stack.pop()
+                if pk != top_pk or include_self:
+                    descendant_pks.append(pk)
+                stack.extend(reversed(self.children.get(pk, [])))
+        return descendant_pks
+
+    def is_descendant(self, pk, of_pks, include_self=True):
+        """
+        Return True if the location is a descendant of any of the given
+        locations
+        """
+        of_pks = set(of_pks)
+        return any(ancestor in of_pks for ancestor in self.get_ancestor_pks(pk, include_self=include_self))
+
+    def _sort_key(self, pk):
+        return (self.names[pk], pk)
@@ -5,6 +5,8 @@ from functools import partial
 
 from django.db import models, transaction
 from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 import jsonfield
 from django_bulk_update.helper import bulk_update as bulk_update_helper
@@ -13,6 +15,11 @@ from memoized import memoized
 
 from corehq.apps.domain.models import Domain
 from corehq.apps.locations.adjacencylist import AdjListManager, AdjListModel
+from corehq.apps.locations.hierarchy import (
+    MAX_QUERY_PKS,
+    get_location_hierarchy,
+    invalidate_location_hierarchy,
+)
 from corehq.apps.products.models import SQLProduct
 from corehq.form_processor.exceptions import CaseNotFound
 from corehq.form_processor.interfaces.supply import SupplyInterface
@@ -326,7 +333,16 @@ class LocationManager(LocationQueriesMixin, AdjListManager):
         locations = self.filter(location_id__in=location_ids)
         return self.get_queryset_descendants(locations, include_self=True)
 
-    def get_locations_and_children_ids(self, location_ids):
+    def get_locations_and_children_ids(self, location_ids, domain=None):
+        """
+        Pass the domain of the locations to look up their children in the
+        domain's location hierarchy instead of querying the database.
+        """
+        hierarchy = get_location_hierarchy(domain) if domain else None
+        if hierarchy is not None:
+            return hierarchy.get_location_ids(
+                hierarchy.get_descendant_pks(hierarchy.get_pks(location_ids), include_self=True)
+            )
         return list(self.get_locations_and_children(location_ids).location_ids())
 
 
@@ -376,8 +392,13 @@ class SQLLocation(AdjListModel):
         """
         Returns the ancestor of given location_type_code of the location
         """
+        hierarchy = get_location_hierarchy(self.domain)
+        if hierarchy is not None and self.id in hierarchy:
+            ancestors = SQLLocation.objects.filter(id__in=hierarchy.get_ancestor_pks(self.id))
+        else:
+            ancestors = self.get_ancestors()
         try:
-            return self.get_ancestors().get(location_type__code=type_code)
+            return ancestors.get(location_type__code=type_code)
         except self.DoesNotExist:
             return None
 
@@ -646,10 +667,17 @@ class SQLLocation(AdjListModel):
         return group
 
     def is_direct_ancestor_of(self, location):
+        hierarchy = get_location_hierarchy(location.domain)
+        if hierarchy is not None and location.id in hierarchy:
+            return hierarchy.is_descendant(location.id, [self.pk])
         return (location.get_ancestors(include_self=True)
                 .filter(pk=self.pk).exists())
 
     def descendants_include_location(self, location_id):
+        hierarchy = get_location_hierarchy(self.domain)
+        if hierarchy is not None:
+            pk = hierarchy.pks_by_location_id.get(location_id)
+            return pk is not None and hierarchy.is_descendant(pk, [self.pk])
         return (
             self.get_descendants(include_self=True)
             .filter(location_id=location_id)
@@ -665,7 +693,11 @@ class SQLLocation(AdjListModel):
         try:
             return self._path
         except AttributeError:
-            self._path = list(self.get_ancestors(include_self=True).location_ids())
+            hierarchy = get_location_hierarchy(self.domain)
+            if hierarchy is not None and self.id in hierarchy:
+                self._path = hierarchy.get_location_ids(hierarchy.get_ancestor_pks(self.id, include_self=True))
+            else:
+                self._path = list(self.get_ancestors(include_self=True).location_ids())
         return self._path
 
     @path.setter
@@ -762,6 +794,11 @@ def set_site_code_if_needed(location):
         location.site_code = generate_code(location.name, all_codes)
 
 
+@receiver([post_save, post_delete], sender=SQLLocation, dispatch_uid="invalidate_location_hierarchy")
+def _invalidate_location_hierarchy(sender, instance, **kwargs):
+    invalidate_location_hierarchy(instance.domain)
+
+
 class LocationFixtureConfiguration(models.Model):
     domain = models.CharField(primary_key=True, max_length=255)
     sync_flat_fixture = models.BooleanField(default=True)
@@ -791,9 +828,19 @@ def get_case_sharing_groups_for_locations(locations, for_user_id=None):
     location_ids = [l.pk for l in locations if l.location_type.view_descendants]
     descendants = []
     if location_ids:
-        where = Q(domain=locations[0].domain, parent_id__in=location_ids)
-        descendants = SQLLocation.objects.get_queryset_descendants(where).filter(
-            location_type__shares_cases=True, is_archived=False)
+        hierarchy = get_location_hierarchy(locations[0].domain)
+        descendant_ids = hierarchy.get_descendant_pks(location_ids) if hierarchy is not None else None
+        if descendant_ids is not None and len(descendant_ids) <= MAX_QUERY_PKS:
+            positions = {pk: position for position, pk in enumerate(descendant_ids)}
+            descendants = sorted(
+                SQLLocation.objects.filter(
+                    id__in=descendant_ids, location_type__shares_cases=True, is_archived=False),
+                key=lambda loc: positions[loc.pk],
+            )
+        else:
+            where = Q(domain=locations[0].domain, parent_id__in=location_ids)
+            descendants = SQLLocation.objects.get_queryset_descendants(where).filter(
+                location_type__shares_cases=True, is_archived=False)
     for loc in descendants:
         yield loc.case_sharing_group_object(for_user_id)
 
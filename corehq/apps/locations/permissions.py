@@ -117,6 +117,7 @@ from corehq.apps.users.decorators import require_permission
 from corehq.apps.users.models import CouchUser
 from corehq.middleware import get_view_func
 
+from .hierarchy import get_location_hierarchy
 from .models import SQLLocation
 
 
@@ -271,6 +272,10 @@ def user_can_access_location_id(domain, user, location_id):
     if user.has_permission(domain, 'access_all_locations'):
         return True
 
+    hierarchy = get_location_hierarchy(domain)
+    if hierarchy is not None:
+        return _hierarchy_includes_any(hierarchy, user.get_location_ids(domain), [location_id])
+
     return (SQLLocation.objects
             .accessible_to_user(domain, user)
             .filter(location_id=location_id)
@@ -281,12 +286,21 @@ def user_can_access_any_location_id(domain, user, location_ids):
     if user.has_permission(domain, 'access_all_locations'):
         return True
 
+    hierarchy = get_location_hierarchy(domain)
+    if hierarchy is not None:
+        return _hierarchy_includes_any(hierarchy, user.get_location_ids(domain), location_ids)
+
     return (SQLLocation.objects
             .accessible_to_user(domain, user)
             .filter(location_id__in=location_ids)
             .exists())
 
 
+def _hierarchy_includes_any(hierarchy, assigned_location_ids, location_ids):
+    assigned_pks = hierarchy.get_pks(assigned_location_ids or [])
+    return any(hierarchy.is_descendant(pk, assigned_pks) for pk in hierarchy.get_pks(location_ids))
+
+
 def user_can_access_other_user(domain, user, other_user):
     if user.has_permission(domain, 'access_all_locations'):
         return True
@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase
+
+from ..hierarchy import LocationHierarchy, get_location_hierarchy
+from ..models import SQLLocation
+from .test_location_queries import BaseTestLocationQuerysetMethods
+
+
+class LocationHierarchyTest(SimpleTestCase):
+
+    def setUp(self):
+        self.hierarchy = LocationHierarchy([
+            (1, 'massachusetts', None, 'Massachusetts'),
+            (2, 'middlesex', 1, 'Middlesex'),
+            (3, 'cambridge', 2, 'Cambridge'),
+            (4, 'somerville', 2, 'Somerville'),
+            (5, 'suffolk', 1, 'Suffolk'),
+            (6, 'boston', 5, 'Boston'),
+            (7, 'california', None, 'California'),
+            (8, 'los-angeles', 7, 'Los Angeles'),
+        ])
+
+    def test_ancestors(self):
+        self.assertEqual(self.hierarchy.get_ancestor_pks(6), [1, 5])
+        self.assertEqual(self.hierarchy.get_ancestor_pks(6, include_self=True), [1, 5, 6])
+        self.assertEqual(self.hierarchy.get_ancestor_pks(1), [])
+        self.assertEqual(self.hierarchy.get_ancestor_pks(100), [])
+
+    def test_descendants(self):
+        self.assertEqual(self.hierarchy.get_descendant_pks([1]), [2, 3, 4, 5, 6])
+        self.assertEqual(self.hierarchy.get_descendant_pks([1], include_self=True), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(self.hierarchy.get_descendant_pks([3]), [])
+
+    def test_descendants_of_overlapping_locations(self):
+        self.assertEqual(
+            self.hierarchy.get_descendant_pks([8, 2, 1], include_self=True),
+            [8, 1, 2, 3, 4, 5, 6],
+        )
+        self.assertEqual(self.hierarchy.get_descendant_pks([2, 1]), [2, 3, 4, 5, 6])
+
+    def test_is_descendant(self):
+        self.assertTrue(self.hierarchy.is_descendant(6, [1]))
+        self.assertTrue(self.hierarchy.is_descendant(6, [6]))
+        self.assertFalse(self.hierarchy.is_descendant(6, [6], include_self=False))
+        self.assertFalse(self.hierarchy.is_descendant(6, [2, 7]))
+
+    def test_location_ids(self):
+        self.assertEqual(self.hierarchy.get_pks(['boston', 'unknown', 'suffolk']), [6, 5])
+        self.assertEqual(self.hierarchy.get_location_ids([6, 5]), ['boston', 'suffolk'])
+
+
+class LoadedLocationHierarchyTest(BaseTestLocationQuerysetMethods):
+
+    def test_matches_database_queries(self):
+        hierarchy = LocationHierarchy.load(self.domain)
+        for location in SQLLocation.objects.filter(domain=self.domain):
+            self.assertEqual(
+                hierarchy.get_ancestor_pks(location.id, include_self=True),
+                list(location.get_ancestors(include_self=True).values_list('id', flat=True)),
+            )
+            self.assertEqual(
+                hierarchy.get_descendant_pks([location.id]),
+                list(location.get_descendants().values_list('id', flat=True)),
+            )
+
+    def test_not_used_after_changes_in_transaction(self):
+        self.assertIsNone(get_location_hierarchy(self.domain))
@@ -134,7 +134,7 @@ def get_case_owners(request, domain, mobile_user_and_group_slugs):
     location_owner_ids = []
     if loc_ids:
         location_owner_ids = SQLLocation.objects.get_locations_and_children_ids(
-            loc_ids)
+            loc_ids, domain=domain)
 
     sharing_group_ids = []
     if selected_reporting_group_users or selected_user_ids:
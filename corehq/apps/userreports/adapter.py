@@ -46,6 +46,24 @@ class IndicatorAdapter(object):
         else:
             self._best_effort_save_rows(indicator_rows, doc)
 
+    def best_effort_save_docs(self, docs):
+        """
+        Like best_effort_save, for many documents at once.
+        """
+        rows_by_doc = []
+        for doc, indicator_rows, exception in self.get_all_values_for_docs(docs):
+            if exception is not None:
+                self.handle_exception(doc, exception)
+            else:
+                rows_by_doc.append((doc, indicator_rows))
+
+        try:
+            self.save_rows([row for doc, rows in rows_by_doc for row in rows], bulk_load=True)
+        except Exception:
+            # find out which documents fail
+            for doc, indicator_rows in rows_by_doc:
+                self._best_effort_save_rows(indicator_rows, doc)
+
     def _best_effort_save_rows(self, rows, doc):
         """
         Like save rows, but should catch errors and log them
@@ -79,7 +97,7 @@ class IndicatorAdapter(object):
         indicator_rows = self.get_all_values(doc, eval_context)
         self.save_rows(indicator_rows)
 
-    def save_rows(self, rows, use_shard_col=True):
+    def save_rows(self, rows, use_shard_col=True, bulk_load=False):
         raise NotImplementedError
 
     def bulk_save(self, docs):
@@ -92,6 +110,10 @@ class IndicatorAdapter(object):
         "Gets all the values from a document to save"
         return self.config.get_all_values(doc, eval_context)
 
+    def get_all_values_for_docs(self, docs, eval_contexts=None):
+        "Gets all the values from many documents to save"
+        return self.config.get_all_values_for_docs(docs, eval_contexts)
+
     def bulk_delete(self, docs, use_shard_col=True):
         for doc in docs:
             self.delete(doc, use_shard_col)
@@ -178,9 +200,9 @@ class IndicatorAdapterLoadTracker(object):
     def track_load(self, value=1):
         self._track_load(value)
 
-    def save_rows(self, rows, use_shard_col=True):
+    def save_rows(self, rows, use_shard_col=True, bulk_load=False):
         self._track_load(len(rows))
-        self.adapter.save_rows(rows, use_shard_col)
+        self.adapter.save_rows(rows, use_shard_col, bulk_load)
 
     def delete(self, doc, use_shard_col=True):
         self._track_load()
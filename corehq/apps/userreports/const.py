@@ -52,6 +52,12 @@ ASYNC_INDICATOR_QUEUE_TIME = timedelta(minutes=5)
 ASYNC_INDICATOR_CHUNK_SIZE = getattr(settings, 'ASYNC_INDICATOR_CHUNK_SIZE', 100)
 ASYNC_INDICATOR_MAX_RETRIES = 20
 
+# number of documents saved at a time when a data source is built or rebuilt
+BUILD_INDICATORS_CHUNK_SIZE = 100
+
+# saves of at least this many rows are loaded with COPY rather than INSERT
+UCR_BULK_LOAD_THRESHOLD = getattr(settings, 'UCR_BULK_LOAD_THRESHOLD', 500)
+
 XFORM_CACHE_KEY_PREFIX = 'xform_to_json_cache'
 
 NAMED_EXPRESSION_PREFIX = 'NamedExpression'
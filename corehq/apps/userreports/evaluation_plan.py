@@ -0,0 +1,766 @@
+"""Precompiled evaluation of data source filters and indicators
+
+Data source filters, expressions and indicators are trees of spec
+objects which are called recursively for every document. An
+``EvaluationPlan`` compiles those trees into flat closures:
+
+- constants are hoisted out of the closures,
+- property names and paths are resolved once at compile time,
+- structurally identical sub-expressions (e.g. the same property looked
+  up by several indicators, or by the filter and an indicator) share a
+  single closure whose result is cached for the current item, and
+- spec attribute lookups are done once instead of for every document.
+
+Sub-expressions that do not depend on anything specific to a data source
+have a canonical key (derived from their spec JSON for expressions that
+are not compiled). The results of the more expensive ones (e.g. related
+doc lookups and ``root_doc`` expressions) are cached in the evaluation
+context for the whole document, so they are computed once per document
+for all data sources in a domain that share the evaluation context.
+
+Filters and expressions that the compiler does not know about are called
+as they are, so the output of a plan is the same as evaluating the
+spec objects directly.
+
+Plans can also evaluate many items at once, column by column. Simple
+nodes (property lookups, datatype transforms, comparisons and boolean
+logic) are then evaluated for all items in a single list comprehension
+instead of one function call per item and node.
+"""
+import functools
+import json
+import types
+
+from corehq.apps.userreports.expressions.getters import (
+    DictGetter,
+    NestedDictGetter,
+    TransformedGetter,
+    evaluate_lazy_args,
+)
+from corehq.apps.userreports.expressions.specs import (
+    ConditionalExpressionSpec,
+    ConstantGetterSpec,
+    IdentityExpressionSpec,
+    IterationNumberExpressionSpec,
+    NamedExpressionSpec,
+    PropertyNameGetterSpec,
+    PropertyPathGetterSpec,
+    RootDocExpressionSpec,
+)
+from corehq.apps.userreports.filters import (
+    ANDFilter,
+    Filter,
+    NamedFilter,
+    NOTFilter,
+    ORFilter,
+    SinglePropertyValueFilter,
+)
+from corehq.apps.userreports.indicators import (
+    BooleanIndicator,
+    ColumnValue,
+    CompoundIndicator,
+    RawIndicator,
+    SmallBooleanIndicator,
+)
+from corehq.apps.userreports.operators import equal, not_equal
+from corehq.util import eval_lazy
+
+
+class EvaluationPlan(object):
+    """Compiled filter, base item expression and indicators of a data source
+
+    Plans are built from the (memoized) filter and indicator objects of a
+    ``DataSourceConfiguration`` and are cached with it, so there is one
+    plan per config revision.
+    """
+
+    def __init__(self, main_filter, base_item_expression, indicator):
+        compiler = _Compiler()
+        filter_node = compiler.filter(main_filter)
+        item_node = compiler.expression(base_item_expression) if base_item_expression else None
+        indicator_steps = compiler.indicator(indicator)
+
+        self.filter = compiler.emit(filter_node)
+        self._filter_node = filter_node
+        self._item_expression = compiler.emit(item_node) if item_node else None
+        self._steps = [
+            (column, compiler.emit(node) if node else None, fallback)
+            for column, node, fallback in indicator_steps
+        ]
+        self._step_nodes = [node for column, node, fallback in indicator_steps]
+        self._has_fallback_steps = any(fallback is not None for column, node, fallback in indicator_steps)
+        self.node_count = len(compiler.nodes)
+
+    def get_items(self, document, evaluation_context):
+        if not self.filter(document, evaluation_context):
+            return []
+        if self._item_expression is None:
+            return [document]
+        result = self._item_expression(document, evaluation_context)
+        if result is None:
+            return []
+        elif isinstance(result, list):
+            return result
+        return [result]
+
+    def get_values(self, item, evaluation_context):
+        values = []
+        for column, getter, indicator in self._steps:
+            if indicator is None:
+                values.append(ColumnValue(column, getter(item, evaluation_context)))
+            else:
+                values.extend(indicator.get_values(item, evaluation_context))
+        return values
+
+    def filter_many(self, documents, evaluation_contexts):
+        """Evaluate the filter for many documents
+
+        :returns: A list of filter results in the order of ``documents``.
+        """
+        return _evaluate_vector(self._filter_node, documents, evaluation_contexts, {})
+
+    def get_values_for_items(self, items, evaluation_contexts):
+        """Get the indicator values of many items, column by column
+
+        Any error raised by an indicator is raised for all items. Errors
+        may also be raised for items that would not raise an error with
+        ``get_values``, since boolean logic does not short-circuit.
+
+        :returns: A list of rows in the order of ``items``.
+        """
+        vectors = {}
+        cells = []
+        for (column, getter, indicator), node in zip(self._steps, self._step_nodes):
+            if indicator is None:
+                values = _evaluate_vector(node, items, evaluation_contexts, vectors)
+                cells.append([ColumnValue(column, value) for value in values])
+            else:
+                cells.append([
+                    indicator.get_values(item, evaluation_context)
+                    for item, evaluation_context in zip(items, evaluation_contexts)
+                ])
+        if not self._has_fallback_steps:
+            return [list(row) for row in zip(*cells)]
+        rows = []
+        for item_cells in zip(*cells):
+            row = []
+            for (column, getter, indicator), cell in zip(self._steps, item_cells):
+                if indicator is None:
+                    row.append(cell)
+                else:
+                    row.extend(cell)
+            rows.append(row)
+        return rows
+
+
+class _Node(object):
+
+    def __init__(self, key, make, children, trivial, shared, varies_by_iteration, vector):
+        self.key = key
+        self.make = make
+        self.children = children
+        self.trivial = trivial
+        self.vector = vector
+        self.simple = vector is not None and all(child.simple for child in children)
+        self.uses = 1
+        self.fn = None
+        self.varies_by_iteration = varies_by_iteration or any(
+            child.varies_by_iteration for child in children)
+        self.shared_key = _canonical(key) if shared and not self.varies_by_iteration else None
+
+
+class _Identity(object):
+    """Key part identifying an object in one plan only"""
+    __slots__ = ['id']
+
+    def __init__(self, obj):
+        self.id = id(obj)
+
+    def __eq__(self, other):
+        return isinstance(other, _Identity) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class _Compiler(object):
+
+    def __init__(self):
+        self.nodes = {}
+
+    def node(self, key, make, children=(), trivial=False, shared=False, varies_by_iteration=False,
+             vector=None):
+        """Get the node for ``key``, adding it if it does not exist
+
+        :param make: function taking the emitted closures of ``children``
+        and returning the closure for this node.
+        :param trivial: true if the closure is too cheap to be worth caching
+        when it is used more than once in the plan.
+        :param shared: true if the closure is expensive enough to cache its
+        result for other data sources evaluating the same document.
+        :param varies_by_iteration: true if the result depends on the
+        iteration number of the evaluation context.
+        :param vector: function taking a list of items and the results of
+        ``children`` for those items, and returning the results of this
+        node for those items. Only for nodes that are pure and cheap.
+        """
+        if key in self.nodes:
+            node = self.nodes[key]
+            node.uses += 1
+            # the children were compiled again to build the key: only
+            # count the existing node as used, not its children
+            for child in children:
+                child.uses -= 1
+        else:
+            node = self.nodes[key] = _Node(key, make, children, trivial, shared, varies_by_iteration, vector)
+        return node
+
+    def emit(self, node):
+        if node.fn is None:
+            fn = node.make(*[self.emit(child) for child in node.children])
+            if node.shared_key is not None:
+                fn = _cache_per_document(fn, node.shared_key)
+            elif node.uses > 1 and not node.trivial:
+                fn = _cache_per_item(fn)
+            node.fn = fn
+        return node.fn
+
+    def opaque(self, obj):
+        """Node calling an object that is not compiled"""
+        spec_json = _get_spec_json(obj)
+        if spec_json is None:
+            return self.node(('opaque', _Identity(obj)), lambda: obj, trivial=True)
+        # named references mean different things in different data sources
+        has_named_references = '"type":"named"' in spec_json
+        return self.node(
+            ('spec', _Identity(obj) if has_named_references else spec_json),
+            lambda: obj,
+            trivial=True,
+            shared=True,
+            varies_by_iteration='"type":"base_iteration_number"' in spec_json,
+        )
+
+    def expression(self, expr):
+        expr_type = type(expr)
+        if expr_type is ConstantGetterSpec:
+            constant = expr.constant
+            return self.node(
+                ('constant', _get_constant_key(constant) or _Identity(expr)),
+                lambda: lambda item, evaluation_context=None: constant,
+                trivial=True,
+                vector=functools.partial(_constant_vector, constant),
+            )
+        if expr_type is IdentityExpressionSpec:
+            return self.node(('identity',), lambda: _identity, trivial=True, vector=_identity_vector)
+        if expr_type is IterationNumberExpressionSpec:
+            return self.node(('iteration',), lambda: _iteration, trivial=True, varies_by_iteration=True)
+        if expr_type is PropertyNameGetterSpec:
+            return self._property_name(expr)
+        if expr_type is PropertyPathGetterSpec:
+            transform = _get_transform(expr.datatype)
+            return self.node(
+                ('property_path', tuple(expr.property_path), expr.datatype),
+                functools.partial(_make_property_path_getter, list(expr.property_path), transform),
+                trivial=not expr.datatype,
+                vector=functools.partial(_property_path_vector, list(expr.property_path), transform),
+            )
+        if expr_type is NamedExpressionSpec:
+            named = expr._factory_context.named_expressions[expr.name]
+            inner = self.expression(named)
+            return self.node(
+                ('named', expr.name, inner.key),
+                functools.partial(_make_named_expression, expr.name),
+                [inner],
+                trivial=True,  # named expressions are cached already
+                shared=True,
+            )
+        if expr_type is RootDocExpressionSpec:
+            inner = self.expression(expr._expression_fn)
+            return self.node(('root_doc', inner.key), _make_root_doc_expression, [inner], shared=True)
+        if expr_type is ConditionalExpressionSpec:
+            children = [
+                self.filter(expr._test_function),
+                self.expression(expr._true_expression),
+                self.expression(expr._false_expression),
+            ]
+            return self.node(
+                ('conditional',) + tuple(child.key for child in children),
+                _make_conditional_expression,
+                children,
+                shared=True,
+                vector=_conditional_vector,
+            )
+        if expr_type is TransformedGetter:
+            inner = self.expression(expr.getter)
+            if not expr.transform:
+                return inner
+            transform_key = _callable_key(expr.transform)
+            # transforms with a canonical key are module level functions:
+            # the datatype transforms
+            is_pure = _canonical(transform_key) is not None
+            return self.node(
+                ('transform', inner.key, transform_key or _Identity(expr.transform)),
+                functools.partial(_make_transformed_getter, expr.transform),
+                [inner],
+                vector=functools.partial(_transform_vector, expr.transform) if is_pure else None,
+            )
+        if isinstance(expr, functools.partial) and expr.func is evaluate_lazy_args and len(expr.args) == 1:
+            getter = expr.args[0]
+            if type(getter) is DictGetter:
+                return self.node(
+                    ('dict_getter', getter.property_name),
+                    functools.partial(_make_dict_getter, getter.property_name),
+                    trivial=True,
+                    vector=functools.partial(_dict_getter_vector, getter.property_name),
+                ) if _is_hashable(getter.property_name) else self.opaque(expr)
+            if type(getter) is NestedDictGetter:
+                return self.node(
+                    ('nested_dict_getter', tuple(getter.property_path)),
+                    functools.partial(_make_property_path_getter, list(getter.property_path), None),
+                    trivial=True,
+                    vector=functools.partial(_property_path_vector, list(getter.property_path), None),
+                ) if _is_hashable(tuple(getter.property_path)) else self.opaque(expr)
+        return self.opaque(expr)
+
+    def _property_name(self, expr):
+        transform = _get_transform(expr.datatype)
+        name_expression = expr._property_name_expression
+        if type(name_expression) is ConstantGetterSpec and _is_hashable(name_expression.constant):
+            name = name_expression.constant
+            return self.node(
+                ('property_name', name, expr.datatype),
+                functools.partial(_make_property_name_getter, name, transform),
+                trivial=not expr.datatype,
+                vector=functools.partial(_property_name_vector, name, transform),
+            )
+        name_node = self.expression(name_expression)
+        return self.node(
+            ('property_name_expression', name_node.key, expr.datatype),
+            functools.partial(_make_dynamic_property_name_getter, transform),
+            [name_node],
+        )
+
+    def filter(self, filter_):
+        filter_type = type(filter_)
+        if filter_type is Filter:
+            return self.node(('true',), lambda: _true, trivial=True, vector=_true_vector)
+        if filter_type is ANDFilter or filter_type is ORFilter:
+            children = [self.filter(sub) for sub in filter_.filters]
+            if filter_type is ANDFilter:
+                make, vector = _make_and_filter, _and_vector
+            else:
+                make, vector = _make_or_filter, _or_vector
+            return self.node(
+                (filter_type.__name__,) + tuple(child.key for child in children),
+                make,
+                children,
+                vector=vector,
+            )
+        if filter_type is NOTFilter:
+            inner = self.filter(filter_._filter)
+            return self.node(('not', inner.key), _make_not_filter, [inner], vector=_not_vector)
+        if filter_type is NamedFilter:
+            return self.filter(filter_.filter)
+        if filter_type is SinglePropertyValueFilter:
+            return self._compare(filter_)
+        return self.opaque(filter_)
+
+    def _compare(self, filter_):
+        operator = filter_.operator
+        operator_key = _callable_key(operator)
+        if operator_key is None:
+            return self.opaque(filter_)
+        value_node = self.expression(filter_.expression)
+        reference = filter_.reference_expression
+        if type(reference) is ConstantGetterSpec:
+            constant = reference.constant
+            if _is_hashable(constant):
+                base_operator = getattr(operator, '__wrapped__', operator)
+                return self.node(
+                    ('compare', operator_key, value_node.key, ('constant', type(constant), constant)),
+                    functools.partial(_make_constant_comparison, base_operator, operator, constant),
+                    [value_node],
+                    vector=functools.partial(_constant_comparison_vector, base_operator, operator, constant),
+                )
+        reference_node = self.expression(reference)
+        return self.node(
+            ('compare', operator_key, value_node.key, reference_node.key),
+            functools.partial(_make_comparison, operator),
+            [value_node, reference_node],
+            vector=functools.partial(_comparison_vector, operator),
+        )
+
+    def indicator(self, indicator):
+        """Get a list of ``(column, node, fallback_indicator)`` steps"""
+        indicator_type = type(indicator)
+        if indicator_type is CompoundIndicator:
+            return [step for sub in indicator.indicators for step in self.indicator(sub)]
+        if indicator_type is RawIndicator:
+            return [(indicator.column, self.expression(indicator.getter), None)]
+        if indicator_type is BooleanIndicator or indicator_type is SmallBooleanIndicator:
+            inner = self.filter(indicator.filter)
+            node = self.node(('boolean', inner.key), _make_boolean, [inner], vector=_boolean_vector)
+            return [(indicator.column, node, None)]
+        return [(None, None, indicator)]
+
+
+def _canonical(key):
+    """Get a string identifying what a node key refers to in any plan
+
+    :returns: A string or ``None`` if the key refers to objects that are
+    specific to one plan.
+    """
+    def to_json(value):
+        if value is None or isinstance(value, (str, int, float)):
+            return value
+        if isinstance(value, tuple):
+            return [to_json(item) for item in value]
+        if isinstance(value, (type, types.FunctionType)) and '<' not in value.__qualname__:
+            return {'function': '{}.{}'.format(value.__module__, value.__qualname__)}
+        raise _NotCanonical
+
+    try:
+        return json.dumps(to_json(key), separators=(',', ':'))
+    except _NotCanonical:
+        return None
+
+
+class _NotCanonical(Exception):
+    pass
+
+
+def _get_spec_json(obj):
+    to_json = getattr(obj, 'to_json', None)
+    if to_json is None:
+        return None
+    try:
+        spec = json.dumps(to_json(), sort_keys=True, separators=(',', ':'))
+    except (TypeError, ValueError):
+        return None
+    return '{}.{}:{}'.format(type(obj).__module__, type(obj).__qualname__, spec)
+
+
+def _get_constant_key(constant):
+    try:
+        return json.dumps(constant, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _callable_key(fn):
+    """Get a key identifying what a callable does, or None if unknown
+
+    Transforms and operators are created anew for every indicator and
+    filter. Their keys are the same if they do the same thing.
+    """
+    if isinstance(fn, functools.partial):
+        if fn.keywords or not all(map(_is_hashable, fn.args)):
+            return None
+        inner = tuple(_callable_key(arg) if callable(arg) else arg for arg in fn.args)
+        if None in inner:
+            return None
+        return ('partial', fn.func, inner)
+    wrapped = getattr(fn, '__wrapped__', None)
+    if wrapped is not None:
+        if not all(cell.cell_contents is wrapped for cell in fn.__closure__ or ()):
+            return None
+        return ('wrapped', fn.__qualname__, wrapped)
+    if getattr(fn, '__closure__', None):
+        return None  # a closure's behaviour depends on its free variables
+    return fn
+
+
+def _get_transform(datatype):
+    if not datatype:
+        # like transform_for_datatype(None), evaluate lazy values
+        return eval_lazy
+    from corehq.apps.userreports.expressions.getters import transform_for_datatype
+    return transform_for_datatype(datatype)
+
+
+def _cache_per_item(fn):
+    """Cache the result of ``fn`` for the current item and iteration
+
+    Like named expressions, results are stored in the iteration cache of
+    the evaluation context. The item is stored with the result to avoid
+    matching a different item that has been allocated at the same address.
+    """
+    token = object()
+
+    def cached(item, evaluation_context=None):
+        if evaluation_context is None:
+            return fn(item, evaluation_context)
+        key = (token, id(item))
+        cache = evaluation_context.iteration_cache
+        hit = cache.get(key)
+        if hit is not None and hit[0] is item:
+            return hit[1]
+        value = fn(item, evaluation_context)
+        cache[key] = (item, value)
+        return value
+    return cached
+
+
+def _cache_per_document(fn, shared_key):
+    """Cache the result of ``fn`` for the current item in all iterations
+
+    Results are stored in the document level cache of the evaluation
+    context, which is shared by all data sources evaluating the document.
+    """
+    def cached(item, evaluation_context=None):
+        if evaluation_context is None:
+            return fn(item, evaluation_context)
+        key = (shared_key, id(item))
+        cache = evaluation_context.cache
+        hit = cache.get(key)
+        if hit is not None and hit[0] is item:
+            evaluation_context.shared_cache_hits += 1
+            return hit[1]
+        evaluation_context.shared_cache_misses += 1
+        value = fn(item, evaluation_context)
+        cache[key] = (item, value)
+        return value
+    return cached
+
+
+def _identity(item, evaluation_context=None):
+    return item
+
+
+def _iteration(item, evaluation_context=None):
+    return evaluation_context.iteration
+
+
+def _true(item, evaluation_context=None):
+    return True
+
+
+def _make_property_name_getter(name, transform):
+    if transform is None:
+        def get_property(item, evaluation_context=None):
+            if isinstance(item, dict):
+                return item.get(name)
+            return None
+    else:
+        def get_property(item, evaluation_context=None):
+            return transform(item.get(name) if isinstance(item, dict) else None)
+    return get_property
+
+
+def _make_dynamic_property_name_getter(transform, name_expression):
+    transform = transform or _identity
+
+    def get_property(item, evaluation_context=None):
+        raw_value = None
+        if isinstance(item, dict):
+            raw_value = item.get(name_expression(item, evaluation_context))
+        return transform(raw_value)
+    return get_property
+
+
+def _make_dict_getter(name):
+    def get_property(item, evaluation_context=None):
+        if not isinstance(item, dict):
+            return None
+        try:
+            return item[name]
+        except KeyError:
+            return None
+    return get_property
+
+
+def _make_property_path_getter(path, transform):
+    def get_path(item, evaluation_context=None):
+        if not isinstance(item, dict) or not path:
+            value = None
+        else:
+            value = item
+            try:
+                for key in path:
+                    value = value[key]
+            except (KeyError, TypeError, ValueError):
+                value = None
+        return value if transform is None else transform(value)
+    return get_path
+
+
+def _make_named_expression(name, expression):
+    # same cache key as NamedExpressionSpec since the cache is shared
+    # with named expressions evaluated by expressions that are not compiled
+    def named(item, evaluation_context=None):
+        if evaluation_context is None:
+            return expression(item, evaluation_context)
+        key = 'named_expression-{}-{}'.format(name, id(item))
+        if evaluation_context.exists_in_cache(key):
+            return evaluation_context.get_cache_value(key)
+        result = expression(item, evaluation_context)
+        evaluation_context.set_iteration_cache_value(key, result)
+        return result
+    return named
+
+
+def _make_root_doc_expression(expression):
+    def root_doc(item, evaluation_context=None):
+        if evaluation_context is None:
+            return None
+        return expression(evaluation_context.root_doc, evaluation_context)
+    return root_doc
+
+
+def _make_conditional_expression(test, if_true, if_false):
+    def conditional(item, evaluation_context=None):
+        if test(item, evaluation_context):
+            return if_true(item, evaluation_context)
+        return if_false(item, evaluation_context)
+    return conditional
+
+
+def _make_transformed_getter(transform, getter):
+    def transformed(item, evaluation_context=None):
+        return transform(getter(item, evaluation_context))
+    return transformed
+
+
+def _make_and_filter(*filters):
+    def and_filter(item, evaluation_context=None):
+        for filter_ in filters:
+            if not filter_(item, evaluation_context):
+                return False
+        return True
+    return and_filter
+
+
+def _make_or_filter(*filters):
+    def or_filter(item, evaluation_context=None):
+        for filter_ in filters:
+            if filter_(item, evaluation_context):
+                return True
+        return False
+    return or_filter
+
+
+def _make_not_filter(filter_):
+    def not_filter(item, evaluation_context=None):
+        return not filter_(item, evaluation_context)
+    return not_filter
+
+
+def _make_comparison(operator, expression, reference_expression):
+    def compare(item, evaluation_context=None):
+        return operator(expression(item, evaluation_context), reference_expression(item, evaluation_context))
+    return compare
+
+
+def _make_constant_comparison(base_operator, operator, constant, expression):
+    if base_operator is equal:
+        def compare(item, evaluation_context=None):
+            return expression(item, evaluation_context) == constant
+    elif base_operator is not_equal:
+        def compare(item, evaluation_context=None):
+            return expression(item, evaluation_context) != constant
+    else:
+        def compare(item, evaluation_context=None):
+            return operator(expression(item, evaluation_context), constant)
+    return compare
+
+
+def _make_boolean(filter_):
+    def boolean(item, evaluation_context=None):
+        return 1 if filter_(item, evaluation_context) else 0
+    return boolean
+
+
+def _evaluate_vector(node, items, evaluation_contexts, vectors):
+    """Get the results of a node for many items
+
+    :param vectors: Dict of results of nodes that have been evaluated
+    for the same items already.
+    """
+    values = vectors.get(node)
+    if values is None:
+        if node.simple:
+            values = node.vector(items, *[
+                _evaluate_vector(child, items, evaluation_contexts, vectors)
+                for child in node.children
+            ])
+        else:
+            fn = node.fn
+            values = [
+                fn(item, evaluation_context)
+                for item, evaluation_context in zip(items, evaluation_contexts)
+            ]
+        vectors[node] = values
+    return values
+
+
+def _constant_vector(constant, items):
+    return [constant] * len(items)
+
+
+def _identity_vector(items):
+    return list(items)
+
+
+def _true_vector(items):
+    return [True] * len(items)
+
+
+def _property_name_vector(name, transform, items):
+    values = [item.get(name) if isinstance(item, dict) else None for item in items]
+    return values if transform is None else list(map(transform, values))
+
+
+def _dict_getter_vector(name, items):
+    return [item.get(name) if isinstance(item, dict) else None for item in items]
+
+
+def _property_path_vector(path, transform, items):
+    get_path = _make_property_path_getter(path, transform)
+    return [get_path(item) for item in items]
+
+
+def _transform_vector(transform, items, values):
+    return list(map(transform, values))
+
+
+def _conditional_vector(items, tests, true_values, false_values):
+    return [
+        true_value if test else false_value
+        for test, true_value, false_value in zip(tests, true_values, false_values)
+    ]
+
+
+def _and_vector(items, *results):
+    return [all(item_results) for item_results in zip(*results)]
+
+
+def _or_vector(items, *results):
+    return [any(item_results) for item_results in zip(*results)]
+
+
+def _not_vector(items, results):
+    return [not result for result in results]
+
+
+def _comparison_vector(operator, items, values, references):
+    return list(map(operator, values, references))
+
+
+def _constant_comparison_vector(base_operator, operator, constant, items, values):
+    if base_operator is equal:
+        return [value == constant for value in values]
+    elif base_operator is not_equal:
+        return [value != constant for value in values]
+    return [operator(value, constant) for value in values]
+
+
+def _boolean_vector(items, results):
+    return [1 if result else 0 for result in results]
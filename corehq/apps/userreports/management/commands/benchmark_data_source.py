@@ -0,0 +1,80 @@
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from corehq.apps.change_feed.data_sources import (
+    get_document_store_for_doc_type,
+)
+from corehq.apps.userreports.models import get_datasource_config
+from corehq.apps.userreports.specs import EvaluationContext
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-document transform time of a data source evaluated "
+        "with its spec objects and with its precompiled evaluation plan"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('domain')
+        parser.add_argument('data_source_id')
+        parser.add_argument('doc_ids', nargs='+')
+        parser.add_argument('--iterations', type=int, default=100)
+
+    def handle(self, domain, data_source_id, doc_ids, **options):
+        config, _ = get_datasource_config(data_source_id, domain)
+        doc_store = get_document_store_for_doc_type(
+            domain, config.referenced_doc_type, load_source="benchmark_data_source")
+        docs = list(doc_store.iter_documents(doc_ids))
+        if not docs:
+            raise CommandError("No documents found")
+
+        main_filter = config._get_main_filter()
+
+        def get_items_with_specs(doc, eval_context):
+            if not main_filter(doc, eval_context):
+                return []
+            if config.parsed_expression is None:
+                return [doc]
+            result = config.parsed_expression(doc, eval_context)
+            if result is None:
+                return []
+            return result if isinstance(result, list) else [result]
+
+        def transform_with_specs():
+            return [_transform(get_items_with_specs, config.indicators.get_values, doc) for doc in docs]
+
+        plan = config.evaluation_plan
+
+        def transform_with_plan():
+            return [_transform(plan.get_items, plan.get_values, doc) for doc in docs]
+
+        if _values(transform_with_specs()) != _values(transform_with_plan()):
+            raise CommandError("Evaluation plan output differs from spec output")
+
+        iterations = options['iterations']
+        spec_time = timeit.timeit(transform_with_specs, number=iterations)
+        plan_time = timeit.timeit(transform_with_plan, number=iterations)
+        per_doc = 1000000 / (iterations * len(docs))
+        print(f"Evaluation plan nodes: {plan.node_count}")
+        print(f"Spec objects:    {spec_time * per_doc:.1f}µs per doc")
+        print(f"Evaluation plan: {plan_time * per_doc:.1f}µs per doc")
+        print(f"Speedup: {spec_time / plan_time:.2f}x")
+
+
+def _transform(get_items, get_values, doc):
+    # same as DataSourceConfiguration.get_all_values
+    eval_context = EvaluationContext(doc)
+    rows = []
+    for item in get_items(doc, eval_context):
+        rows.append(get_values(item, eval_context))
+        eval_context.increment_iteration()
+    return rows
+
+
+def _values(results):
+    # inserted_at differs between evaluation contexts
+    return [
+        [[(value.column.id, value.value) for value in row if value.column.id != 'inserted_at'] for row in rows]
+        for rows in results
+    ]
@@ -75,6 +75,7 @@ from corehq.apps.userreports.dbaccessors import (
     get_registry_report_configs_for_domain,
     get_report_configs_for_domain,
 )
+from corehq.apps.userreports.evaluation_plan import EvaluationPlan
 from corehq.apps.userreports.exceptions import (
     BadSpecError,
     DataSourceConfigurationNotFoundError,
@@ -374,6 +375,8 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
         if eval_context is None:
             eval_context = EvaluationContext(document)
 
+        if self.use_evaluation_plan:
+            return self.evaluation_plan.filter(document, eval_context)
         filter_fn = self._get_main_filter()
         return filter_fn(document, eval_context)
 
@@ -562,7 +565,20 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
     def get_column_by_id(self, column_id):
         return self.columns_by_id.get(column_id)
 
+    @property
+    def use_evaluation_plan(self):
+        return toggles.UCR_EVALUATION_PLANS.enabled(self.domain)
+
+    @property
+    @memoized
+    def evaluation_plan(self):
+        return EvaluationPlan(self._get_main_filter(), self.parsed_expression, self.indicators)
+
     def get_items(self, document, eval_context=None):
+        if self.use_evaluation_plan:
+            if eval_context is None:
+                eval_context = EvaluationContext(document)
+            return self.evaluation_plan.get_items(document, eval_context)
         if self.filter(document, eval_context):
             if not self.base_item_expression:
                 return [document]
@@ -598,14 +614,59 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
                     )
                 return []
 
+        if self.use_evaluation_plan:
+            get_values = self.evaluation_plan.get_values
+        else:
+            get_values = self.indicators.get_values
         rows = []
         for item in self.get_items(doc, eval_context):
-            values = self.indicators.get_values(item, eval_context)
+            values = get_values(item, eval_context)
             rows.append(values)
             eval_context.increment_iteration()
 
         return rows
 
+    def get_all_values_for_docs(self, docs, eval_contexts=None):
+        """Get the rows of many documents
+
+        Data sources with evaluation plans, one item per document and no
+        validations are evaluated column by column for all documents at once.
+
+        :returns: A list of ``(doc, rows, exception)`` tuples in the order of
+        ``docs``. ``exception`` is the error raised evaluating the document,
+        if any.
+        """
+        if eval_contexts is None:
+            eval_contexts = [EvaluationContext(doc) for doc in docs]
+
+        if self.use_evaluation_plan and not self.has_validations and not self.base_item_expression:
+            try:
+                return self._get_all_values_by_column(docs, eval_contexts)
+            except Exception:
+                # find out which documents fail
+                pass
+
+        results = []
+        for doc, eval_context in zip(docs, eval_contexts):
+            try:
+                results.append((doc, self.get_all_values(doc, eval_context), None))
+            except Exception as e:
+                results.append((doc, [], e))
+        return results
+
+    def _get_all_values_by_column(self, docs, eval_contexts):
+        plan = self.evaluation_plan
+        passes = plan.filter_many(docs, eval_contexts)
+        items = [doc for doc, passed in zip(docs, passes) if passed]
+        item_contexts = [context for context, passed in zip(eval_contexts, passes) if passed]
+        rows = iter(plan.get_values_for_items(items, item_contexts))
+        for eval_context in item_contexts:
+            eval_context.increment_iteration()
+        return [
+            (doc, [next(rows)] if passed else [], None)
+            for doc, passed in zip(docs, passes)
+        ]
+
     def get_report_count(self):
         """
         Return the number of ReportConfigurations that reference this data source.
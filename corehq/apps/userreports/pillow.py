@@ -26,7 +26,11 @@ from corehq.apps.userreports.pillow_utils import rebuild_sql_tables
 from corehq.apps.userreports.specs import EvaluationContext
 from corehq.apps.userreports.util import get_indicator_adapter
 from corehq.pillows.base import is_couch_change_for_sql_domain
-from corehq.util.metrics import metrics_counter, metrics_histogram_timer
+from corehq.util.metrics import (
+    metrics_counter,
+    metrics_histogram,
+    metrics_histogram_timer,
+)
 from corehq.util.timer import TimingContext
 from pillowtop.checkpoints.manager import KafkaPillowCheckpoint
 from pillowtop.const import DEFAULT_PROCESSOR_CHUNK_SIZE
@@ -384,6 +388,23 @@ class RegistryDataSourceTableManager(UcrTableManager):
             self._add_adapter_for_data_source(config)
 
 
+def _record_shared_cache_metrics(eval_context):
+    """Record how often data sources reused each other's results for a doc"""
+    if not (eval_context.shared_cache_hits or eval_context.shared_cache_misses):
+        return
+    for name, value in [
+        ('hits', eval_context.shared_cache_hits),
+        ('misses', eval_context.shared_cache_misses),
+    ]:
+        metrics_histogram(
+            'commcare.ucr.shared_evaluation_cache.{}'.format(name),
+            value,
+            bucket_tag=name,
+            buckets=[0, 1, 5, 10, 50, 100, 500],
+            bucket_unit='',
+        )
+
+
 class ConfigurableReportPillowProcessor(BulkPillowProcessor):
     """Generic processor for UCR.
 
@@ -448,27 +469,47 @@ class ConfigurableReportPillowProcessor(BulkPillowProcessor):
         change_exceptions = []
 
         with self._metrics_timer('single_batch_transform'):
+            to_transform_by_adapter = defaultdict(list)
+            eval_contexts = []
             for doc in docs:
                 change = changes_by_id[doc['_id']]
                 doc_subtype = change.metadata.document_subtype
                 eval_context = EvaluationContext(doc)
+                eval_contexts.append(eval_context)
                 with self._metrics_timer('single_doc_transform'):
                     for adapter in adapters:
+                        # filtering has always been timed as part of 'transform'
                         with self._per_config_metrics_timer('transform', adapter.config._id):
                             if adapter.config.filter(doc, eval_context):
                                 if adapter.run_asynchronous:
                                     async_configs_by_doc_id[doc['_id']].append(adapter.config._id)
                                 else:
-                                    try:
-                                        rows_to_save_by_adapter[adapter].extend(adapter.get_all_values(doc, eval_context))
-                                    except Exception as e:
-                                        change_exceptions.append((change, e))
-                                    eval_context.reset_iteration()
+                                    to_transform_by_adapter[adapter].append((doc, eval_context))
                             elif (not doc_subtype
                                     or doc_subtype in adapter.config.get_case_type_or_xmlns_filter()):
                                 # Delete if the subtype is unknown or
                                 # if the subtype matches our filters, but the full filter no longer applies
                                 to_delete_by_adapter[adapter].append(doc)
+                        # Data sources can define named expressions with the
+                        # same name. Don't let the next one use this one's.
+                        eval_context.reset_iteration()
+
+            # evaluate each data source for all its documents at once
+            for adapter, to_transform in to_transform_by_adapter.items():
+                adapter_docs = [doc for doc, eval_context in to_transform]
+                adapter_contexts = [eval_context for doc, eval_context in to_transform]
+                with self._per_config_metrics_timer('transform', adapter.config._id):
+                    results = adapter.get_all_values_for_docs(adapter_docs, adapter_contexts)
+                for doc, rows, exception in results:
+                    if exception is not None:
+                        change_exceptions.append((changes_by_id[doc['_id']], exception))
+                    else:
+                        rows_to_save_by_adapter[adapter].extend(rows)
+                for eval_context in adapter_contexts:
+                    eval_context.reset_iteration()
+
+            for eval_context in eval_contexts:
+                _record_shared_cache_metrics(eval_context)
 
         with self._metrics_timer('single_batch_delete'):
             # bulk delete by adapter
@@ -563,6 +604,7 @@ class ConfigurableReportPillowProcessor(BulkPillowProcessor):
                         or doc_subtype in table.config.get_case_type_or_xmlns_filter()):
                     table.delete(doc)
 
+            _record_shared_cache_metrics(eval_context)
             if async_tables:
                 AsyncIndicator.update_from_kafka_change(change, async_tables)
 
@@ -79,6 +79,9 @@ class EvaluationContext(object):
         self.inserted_timestamp = datetime.utcnow()
         self.cache = {}
         self.iteration_cache = {}
+        # results shared between data sources, see evaluation_plan.py
+        self.shared_cache_hits = 0
+        self.shared_cache_misses = 0
 
     def exists_in_cache(self, key):
         return key in self.cache or key in self.iteration_cache
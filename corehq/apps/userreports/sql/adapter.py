@@ -1,3 +1,4 @@
+import datetime
 import hashlib
 import logging
 
@@ -6,11 +7,13 @@ from django.utils.translation import gettext as _
 import psycopg2
 import sqlalchemy
 from memoized import memoized
-from sqlalchemy.exc import ProgrammingError, OperationalError
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DBAPIError, OperationalError, ProgrammingError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.schema import Index, PrimaryKeyConstraint
 
 from corehq.apps.userreports.adapter import IndicatorAdapter
+from corehq.apps.userreports.const import UCR_BULK_LOAD_THRESHOLD
 from corehq.apps.userreports.exceptions import (
     ColumnNotFoundError,
     TableRebuildError,
@@ -26,6 +29,8 @@ logger = logging.getLogger(__name__)
 
 engine_metadata = {}
 
+BULK_LOAD_TABLE = 'ucr_bulk_load'
+
 
 def get_metadata(engine_id):
     return engine_metadata.setdefault(engine_id, sqlalchemy.MetaData())
@@ -144,10 +149,11 @@ class IndicatorSqlAdapter(IndicatorAdapter):
         except Exception as e:
             self.handle_exception(doc, e)
 
-    def save_rows(self, rows, use_shard_col=True):
+    def save_rows(self, rows, use_shard_col=True, bulk_load=False):
         """
         Saves rows to a data source after deleting the old rows
         :param use_shard_col: use shard column along with doc id for searching rows to delete/update
+        :param bulk_load: load the rows with COPY regardless of how many there are
         """
         if not rows:
             return
@@ -157,8 +163,13 @@ class IndicatorSqlAdapter(IndicatorAdapter):
             {i.column.database_column_name.decode('utf-8'): i.value for i in row}
             for row in rows
         ]
-        doc_ids = set(row['doc_id'] for row in formatted_rows)
         table = self.get_table()
+        if (bulk_load or len(formatted_rows) >= UCR_BULK_LOAD_THRESHOLD) and self.supports_bulk_load():
+            with self.session_context() as session:
+                self._bulk_load_rows(session, table, formatted_rows, self.supports_upsert() and use_shard_col)
+            return
+
+        doc_ids = set(row['doc_id'] for row in formatted_rows)
         if self.supports_upsert() and use_shard_col:
             queries = [self._upsert_query(table, formatted_rows)]
         else:
@@ -195,10 +206,64 @@ class IndicatorSqlAdapter(IndicatorAdapter):
             }
         )
 
+    def supports_bulk_load(self):
+        """Return True if rows can be loaded with COPY
+
+        Array values are not serialized for COPY.
+        """
+        return not any(isinstance(column.type, postgresql.ARRAY) for column in self.get_table().columns)
+
+    def _bulk_load_rows(self, session, table, rows, upsert):
+        """Load rows with COPY into a temporary table and merge them into the table
+
+        Errors are raised as the same SQLAlchemy exceptions as saving
+        the rows with INSERT.
+        """
+        quote = self.engine.dialect.identifier_preparer.quote
+        column_names = list(rows[0])
+        columns = ', '.join(quote(name) for name in column_names)
+        table_name = quote(table.name)
+        # without the constraints of the table so that violations are raised by the merge
+        session.execute(sqlalchemy.text(
+            f'CREATE TEMPORARY TABLE {BULK_LOAD_TABLE} ON COMMIT DROP AS '
+            f'SELECT {columns} FROM {table_name} WITH NO DATA'
+        ))
+
+        copy = f'COPY {BULK_LOAD_TABLE} ({columns}) FROM STDIN'
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(copy, _CopyRowsFile(rows, column_names))
+        except psycopg2.Error as e:
+            raise DBAPIError.instance(copy, None, e, psycopg2.Error) from e
+        finally:
+            cursor.close()
+
+        if upsert:
+            primary_keys = ', '.join(quote(column.name) for column in table.primary_key)
+            updates = ', '.join(
+                f'{quote(name)} = EXCLUDED.{quote(name)}'
+                for name in column_names if not table.c[name].primary_key
+            )
+            on_conflict = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+            queries = [
+                f'INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {BULK_LOAD_TABLE} '
+                f'ON CONFLICT ({primary_keys}) {on_conflict}'
+            ]
+        else:
+            queries = [
+                f'DELETE FROM {table_name} WHERE doc_id IN (SELECT doc_id FROM {BULK_LOAD_TABLE})',
+                f'INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {BULK_LOAD_TABLE}',
+            ]
+        for query in queries:
+            session.execute(sqlalchemy.text(query))
+        session.execute(sqlalchemy.text(f'DROP TABLE {BULK_LOAD_TABLE}'))
+
     def bulk_save(self, docs):
         rows = []
-        for doc in docs:
-            rows.extend(self.get_all_values(doc))
+        for doc, doc_rows, exception in self.get_all_values_for_docs(docs):
+            if exception is not None:
+                raise exception
+            rows.extend(doc_rows)
         self.save_rows(rows)
 
     def bulk_delete(self, docs, use_shard_col=True):
@@ -249,9 +314,16 @@ class MultiDBSqlAdapter(object):
         for adapter in self.all_adapters:
             adapter.save(doc, eval_context)
 
+    def best_effort_save_docs(self, docs):
+        for adapter in self.all_adapters:
+            adapter.best_effort_save_docs(docs)
+
     def get_all_values(self, doc, eval_context=None):
         return self.config.get_all_values(doc, eval_context)
 
+    def get_all_values_for_docs(self, docs, eval_contexts=None):
+        return self.config.get_all_values_for_docs(docs, eval_contexts)
+
     @property
     def run_asynchronous(self):
         return self.config.asynchronous
@@ -276,9 +348,9 @@ class MultiDBSqlAdapter(object):
         for adapter in self.all_adapters:
             adapter.clear_table()
 
-    def save_rows(self, rows, use_shard_col=True):
+    def save_rows(self, rows, use_shard_col=True, bulk_load=False):
         for adapter in self.all_adapters:
-            adapter.save_rows(rows, use_shard_col)
+            adapter.save_rows(rows, use_shard_col, bulk_load)
 
     def bulk_save(self, docs):
         for adapter in self.all_adapters:
@@ -323,6 +395,46 @@ class ErrorRaisingMultiDBAdapter(MultiDBSqlAdapter):
     mirror_adapter_cls = ErrorRaisingIndicatorSqlAdapter
 
 
+class _CopyRowsFile(object):
+    """Read-only file of rows in the text format of COPY
+
+    Rows are serialized as they are read.
+    """
+
+    def __init__(self, rows, column_names):
+        self._lines = (
+            '\t'.join(_copy_value(row.get(name)) for name in column_names) + '\n'
+            for row in rows
+        )
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    readline = read
+
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+
 def get_indicator_table(indicator_config, metadata, override_table_name=None):
     sql_columns = [column_to_sql(col) for col in indicator_config.get_columns()]
     table_name = override_table_name or get_table_name(indicator_config.domain, indicator_config.table_id)
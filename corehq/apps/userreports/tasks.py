@@ -31,6 +31,7 @@ from corehq.apps.userreports.const import (
     ASYNC_INDICATOR_CHUNK_SIZE,
     ASYNC_INDICATOR_MAX_RETRIES,
     ASYNC_INDICATOR_QUEUE_TIME,
+    BUILD_INDICATORS_CHUNK_SIZE,
     UCR_CELERY_QUEUE,
     UCR_INDICATOR_CELERY_QUEUE,
 )
@@ -68,14 +69,15 @@ celery_task_logger = logging.getLogger('celery.task')
 def _build_indicators(config, document_store, relevant_ids):
     adapter = get_indicator_adapter(config, raise_errors=True, load_source='build_indicators')
 
-    for doc in document_store.iter_documents(relevant_ids):
-        if config.asynchronous:
+    if config.asynchronous:
+        for doc in document_store.iter_documents(relevant_ids):
             AsyncIndicator.update_record(
                 doc.get('_id'), config.referenced_doc_type, config.domain, [config._id]
             )
-        else:
+    else:
+        for docs in chunked(document_store.iter_documents(relevant_ids), BUILD_INDICATORS_CHUNK_SIZE, list):
             # save is a noop if the filter doesn't match
-            adapter.best_effort_save(doc)
+            adapter.best_effort_save_docs(docs)
 
 
 @serial_task('{indicator_config_id}', default_retry_delay=60 * 10, timeout=3 * 60 * 60, max_retries=20,
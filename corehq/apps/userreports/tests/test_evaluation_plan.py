@@ -0,0 +1,266 @@
+import uuid
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+
+from freezegun import freeze_time
+
+from corehq.apps.userreports.evaluation_plan import _Compiler, _evaluate_vector
+from corehq.apps.userreports.expressions import getters
+from corehq.apps.userreports.expressions.factory import ExpressionFactory
+from corehq.apps.userreports.models import DataSourceConfiguration
+from corehq.apps.userreports.specs import EvaluationContext
+from corehq.apps.userreports.tests.utils import (
+    get_data_source_with_repeat,
+    get_sample_data_source,
+    get_sample_doc_and_indicators,
+)
+from corehq.util.test_utils import flag_enabled
+
+DOMAIN = 'user-reports'
+
+
+def _get_config():
+    date_expression = {
+        "type": "conditional",
+        "test": {
+            "type": "boolean_expression",
+            "expression": {"type": "property_path", "property_path": ["form", "visit"]},
+            "operator": "eq",
+            "property_value": "yes",
+        },
+        "expression_if_true": {
+            "type": "property_path",
+            "property_path": ["form", "visit_date"],
+            "datatype": "date",
+        },
+        "expression_if_false": {"type": "constant", "constant": None},
+    }
+    return DataSourceConfiguration(
+        domain=DOMAIN,
+        referenced_doc_type='XFormInstance',
+        table_id='evaluation-plan',
+        display_name='evaluation plan',
+        configured_filter={
+            "type": "not",
+            "filter": {
+                "type": "boolean_expression",
+                "expression": {"type": "property_name", "property_name": "xmlns"},
+                "operator": "in",
+                "property_value": ["skip-me"],
+            },
+        },
+        named_expressions={
+            "visit_date": date_expression,
+        },
+        named_filters={
+            "visited": {
+                "type": "boolean_expression",
+                "expression": {"type": "named", "name": "visit_date"},
+                "operator": "gte",
+                "property_value": "2020-01-01",
+            },
+        },
+        configured_indicators=[
+            {
+                "type": "expression",
+                "column_id": "visit_date",
+                "datatype": "date",
+                "expression": date_expression,
+            },
+            {
+                "type": "expression",
+                "column_id": "visit_month",
+                "datatype": "string",
+                "expression": {"type": "month_start_date", "date_expression": date_expression},
+            },
+            {
+                "type": "expression",
+                "column_id": "named_visit_date",
+                "datatype": "date",
+                "expression": {"type": "named", "name": "visit_date"},
+            },
+            {
+                "type": "boolean",
+                "column_id": "visited",
+                "filter": {"type": "named", "name": "visited"},
+            },
+            {
+                "type": "raw",
+                "column_id": "name",
+                "datatype": "string",
+                "property_path": ["form", "name"],
+            },
+            {
+                "type": "choice_list",
+                "column_id": "category",
+                "property_name": "category",
+                "choices": ["a", "b"],
+                "select_style": "multiple",
+            },
+        ],
+    )
+
+
+def _make_form(**form):
+    return {
+        '_id': uuid.uuid4().hex,
+        'domain': DOMAIN,
+        'doc_type': 'XFormInstance',
+        'xmlns': 'form-xmlns',
+        'category': 'a c',
+        'form': form,
+    }
+
+
+@freeze_time('2022-06-01')
+class TestEvaluationPlan(SimpleTestCase):
+
+    def _get_rows(self, config, doc):
+        with flag_enabled('UCR_EVALUATION_PLANS'):
+            plan_rows = config.get_all_values(doc, EvaluationContext(doc))
+        spec_rows = config.get_all_values(doc, EvaluationContext(doc))
+        self.assertEqual(_values(plan_rows), _values(spec_rows))
+        return _values(plan_rows)
+
+    def test_same_as_spec_evaluation(self):
+        config = _get_config()
+        docs = [
+            _make_form(visit='yes', visit_date='2022-05-04', name='Ana'),
+            _make_form(visit='yes', visit_date='2019-05-04T10:00:00.000000Z', name=12),
+            _make_form(visit='no', visit_date='2022-05-04'),
+            _make_form(visit='yes', visit_date=''),
+            _make_form(),
+            {'_id': 'not-a-form', 'domain': DOMAIN, 'doc_type': 'XFormInstance', 'form': 'text'},
+        ]
+        for doc in docs:
+            rows = self._get_rows(config, doc)
+            self.assertEqual(len(rows), 1)
+
+    def test_filter(self):
+        config = _get_config()
+        docs = [
+            _make_form(),
+            dict(_make_form(), xmlns='skip-me'),
+            dict(_make_form(), domain='other'),
+            dict(_make_form(), doc_type='XFormArchived'),
+        ]
+        with flag_enabled('UCR_EVALUATION_PLANS'):
+            plan_results = [config.filter(doc) for doc in docs]
+        self.assertEqual(plan_results, [config.filter(doc) for doc in docs])
+        self.assertEqual(plan_results, [True, False, False, False])
+        for doc in docs[1:]:
+            self.assertEqual(self._get_rows(config, doc), [])
+
+    def test_sample_data_source(self):
+        config = get_sample_data_source()
+        doc, _ = get_sample_doc_and_indicators()
+        self._get_rows(config, doc)
+
+    def test_data_source_with_repeat(self):
+        config = get_data_source_with_repeat()
+        doc = _make_form(time_logs=[
+            {'start_time': '2022-01-01T10:00:00Z', 'end_time': '2022-01-01T11:00:00Z', 'person': 'a'},
+            {'start_time': '2022-01-02T10:00:00Z', 'person': 'b'},
+        ])
+        doc['created'] = '2022-01-03'
+        self.assertEqual(len(self._get_rows(config, doc)), 2)
+
+    def test_shared_expressions_are_evaluated_once(self):
+        def count_transform_date_calls(get_values):
+            doc = _make_form(visit='yes', visit_date='2022-05-04')
+            with patch.object(getters, 'transform_date', wraps=getters.transform_date) as transform_date:
+                config = _get_config()
+                config.configured_indicators = [
+                    indicator for indicator in config.configured_indicators
+                    if indicator['column_id'] in ['visit_date', 'named_visit_date', 'visited']
+                ]
+                get_values(config)(doc, EvaluationContext(doc))
+            return transform_date.call_count
+
+        # the property_path expression is shared by the visit_date and
+        # named_visit_date columns, which each transform it to a date
+        self.assertEqual(count_transform_date_calls(lambda config: config.indicators.get_values), 4)
+        self.assertEqual(count_transform_date_calls(lambda config: config.evaluation_plan.get_values), 3)
+
+    def test_results_are_shared_between_data_sources(self):
+        def evaluate(configs):
+            doc = _make_form(visit='yes', visit_date='2022-05-04')
+            eval_context = EvaluationContext(doc)
+            with patch.object(getters, 'transform_date', wraps=getters.transform_date) as transform_date:
+                rows = [config.evaluation_plan.get_values(doc, eval_context) for config in configs()]
+            return rows, transform_date.call_count, eval_context
+
+        [row], single_calls, _ = evaluate(lambda: [_get_config()])
+        rows, calls, eval_context = evaluate(lambda: [_get_config(), _get_config()])
+        self.assertEqual(_values(rows), _values([row, row]))
+        # only the "date" datatype transforms of the indicator columns are repeated
+        self.assertEqual(calls, single_calls + 2)
+        self.assertGreater(eval_context.shared_cache_hits, 0)
+
+    def test_get_all_values_for_docs(self):
+        config = _get_config()
+        docs = [
+            _make_form(visit='yes', visit_date='2022-05-04', name='Ana'),
+            dict(_make_form(visit='yes', visit_date='2022-05-04'), xmlns='skip-me'),
+            _make_form(visit='no', visit_date='2022-05-04'),
+            _make_form(visit='yes', visit_date='2019-05-04T10:00:00.000000Z', name=12),
+            {'_id': 'not-a-form', 'domain': DOMAIN, 'doc_type': 'XFormInstance', 'form': 'text'},
+        ]
+        spec_rows = [config.get_all_values(doc) for doc in docs]
+        with flag_enabled('UCR_EVALUATION_PLANS'), \
+                patch.object(config.evaluation_plan, 'get_values', side_effect=AssertionError):
+            results = config.get_all_values_for_docs(docs)
+        self.assertEqual([doc for doc, rows, exception in results], docs)
+        self.assertEqual([exception for doc, rows, exception in results], [None] * len(docs))
+        self.assertEqual(
+            [_values(rows) for doc, rows, exception in results],
+            [_values(rows) for rows in spec_rows],
+        )
+        self.assertEqual(results[1][1], [])
+
+    def test_get_all_values_for_docs_with_error(self):
+        config = _get_config()
+        docs = [
+            _make_form(visit='yes', visit_date='2022-05-04'),
+            dict(_make_form(visit='yes', visit_date='2022-05-04'), category=12),
+        ]
+        with flag_enabled('UCR_EVALUATION_PLANS'):
+            [(_, rows, exception), (_, error_rows, error)] = config.get_all_values_for_docs(docs)
+        self.assertIsNone(exception)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(error_rows, [])
+        self.assertIsNotNone(error)
+
+    def test_get_all_values_for_docs_with_repeat(self):
+        config = get_data_source_with_repeat()
+        doc = _make_form(time_logs=[
+            {'start_time': '2022-01-01T10:00:00Z', 'person': 'a'},
+            {'start_time': '2022-01-02T10:00:00Z', 'person': 'b'},
+        ])
+        doc['created'] = '2022-01-03'
+        with flag_enabled('UCR_EVALUATION_PLANS'):
+            [(_, rows, exception)] = config.get_all_values_for_docs([doc])
+        self.assertIsNone(exception)
+        self.assertEqual(_values(rows), self._get_rows(config, doc))
+
+    def test_lazy_values_are_evaluated(self):
+        doc = {'name': gettext_lazy('Ana'), 'child': {'name': gettext_lazy('Bob')}}
+        specs = [
+            {"type": "property_name", "property_name": "name"},
+            {"type": "property_path", "property_path": ["child", "name"]},
+        ]
+        for spec in specs:
+            expression = ExpressionFactory.from_spec(spec)
+            compiler = _Compiler()
+            node = compiler.expression(expression)
+            value = compiler.emit(node)(doc, EvaluationContext(doc))
+            [vector_value] = _evaluate_vector(node, [doc], [EvaluationContext(doc)], {})
+            self.assertIs(type(expression(doc, EvaluationContext(doc))), str)
+            self.assertIs(type(value), str)
+            self.assertIs(type(vector_value), str)
+
+
+def _values(rows):
+    return [[(value.column.id, value.value) for value in row] for row in rows]
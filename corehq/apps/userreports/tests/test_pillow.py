@@ -914,6 +914,43 @@ class IndicatorConfigFilterTest(SimpleTestCase):
             self.assertTrue(self.config.deleted_filter(document), 'Failing dog: %s' % document)
 
 
+class NamedExpressionCacheIsolationTest(SimpleTestCase):
+
+    def test_data_sources_do_not_share_iteration_cache(self):
+        doc = {'_id': 'abc', 'domain': 'user-reports'}
+        change = mock.Mock(id='abc', deleted=False)
+        seen = {}
+
+        def get_adapter(name):
+            def filter_(doc, eval_context):
+                seen[f'{name}_filter'] = dict(eval_context.iteration_cache)
+                eval_context.iteration_cache['named_expression-count'] = name
+                return True
+
+            def get_all_values_for_docs(docs, eval_contexts):
+                seen[f'{name}_values'] = dict(eval_contexts[0].iteration_cache)
+                eval_contexts[0].iteration_cache['named_expression-count'] = name
+                return [(doc, [], None) for doc in docs]
+
+            adapter = mock.Mock(run_asynchronous=False)
+            adapter.config.filter.side_effect = filter_
+            adapter.get_all_values_for_docs.side_effect = get_all_values_for_docs
+            return adapter
+
+        table_manager = mock.Mock()
+        table_manager.get_adapters.return_value = [get_adapter('a'), get_adapter('b')]
+        processor = ConfigurableReportPillowProcessor(table_manager)
+        with patch('corehq.apps.userreports.pillow.bulk_fetch_changes_docs', return_value=(set(), [doc])):
+            processor._process_chunk_for_domain('user-reports', [change])
+
+        self.assertEqual(seen, {
+            'a_filter': {},
+            'b_filter': {},
+            'a_values': {},
+            'b_values': {},
+        })
+
+
 def _save_sql_case(doc):
     system_props = ['_id', '_rev', 'opened_on', 'owner_id', 'doc_type', 'domain', 'type']
     with drop_connected_signals(sql_case_post_save):
@@ -1,4 +1,5 @@
 import uuid
+from unittest.mock import patch
 
 from django.test import TestCase
 
@@ -120,3 +121,37 @@ class AdapterBulkSaveTest(TestCase):
 
     def test_save_rows_accepts_empty_list(self):
         self.adapter.save_rows([])
+
+    def test_bulk_load(self):
+        docs = [{
+            "_id": str(i),
+            "domain": self.domain,
+            "doc_type": "CommCareCase",
+            "name": 'doc\tname\\' + str(i)
+        } for i in range(10)]
+        docs.append({"_id": "10", "domain": self.domain, "doc_type": "CommCareCase", "name": None})
+        self.adapter.best_effort_save_docs(docs)
+        self.assertEqual(self._get_names(), {doc['_id']: doc['name'] for doc in docs})
+
+        docs[0]['name'] = 'updated'
+        self.adapter.best_effort_save_docs(docs[:1])
+        self.assertEqual(self._get_names()['0'], 'updated')
+        self.assertEqual(self.adapter.get_query_object().count(), 11)
+
+    def test_bulk_load_is_used_above_threshold(self):
+        docs = [{
+            "_id": str(i),
+            "domain": self.domain,
+            "doc_type": "CommCareCase",
+            "name": 'doc_name_' + str(i)
+        } for i in range(3)]
+        with patch('corehq.apps.userreports.sql.adapter.UCR_BULK_LOAD_THRESHOLD', 3), \
+                patch.object(self.adapter.adapter, '_bulk_load_rows',
+                             wraps=self.adapter.adapter._bulk_load_rows) as bulk_load_rows:
+            self.adapter.bulk_save(docs)
+            self.adapter.bulk_save(docs[:2])
+        self.assertEqual(bulk_load_rows.call_count, 1)
+        self.assertEqual(self.adapter.get_query_object().count(), 3)
+
+    def _get_names(self):
+        return {row.doc_id: row.name for row in self.adapter.get_query_object()}
@@ -2,6 +2,8 @@ import numbers
 
 from couchdbkit import ResourceNotFound
 
+from dimagi.utils.couch.bulk import get_docs
+
 from corehq.apps.groups.models import Group
 from corehq.apps.locations.models import SQLLocation
 from corehq.apps.users.models import CommCareUser, CouchUser, WebUser
@@ -26,13 +28,6 @@ def get_wrapped_owner(owner_id, support_deleted=False):
     if isinstance(owner_id, numbers.Number):
         return None
 
-    def _get_class(doc_type):
-        return {
-            'CommCareUser': CommCareUser,
-            'WebUser': WebUser,
-            'Group': Group,
-        }.get(doc_type)
-
     def _get_deleted_class(doc_type):
         return {
             'Group-Deleted': Group,
@@ -48,9 +43,43 @@ def get_wrapped_owner(owner_id, support_deleted=False):
     except ResourceNotFound:
         pass
     else:
-        cls = _get_class(owner_doc['doc_type'])
+        cls = _get_owner_class(owner_doc['doc_type'])
         if support_deleted and cls is None:
             cls = _get_deleted_class(owner_doc['doc_type'])
         return cls.wrap(owner_doc) if cls else None
 
     return None
+
+
+def get_wrapped_owners(owner_ids):
+    """
+    Returns a dict of the wrapped user, group or location object for
+    each of the given IDs, or None if the id isn't a known owner type.
+
+    Like ``get_wrapped_owner()``, but looks up all the owners in two
+    queries.
+    """
+    owners = {
+        owner_id: None for owner_id in owner_ids
+        if owner_id and not isinstance(owner_id, numbers.Number)
+    }
+    if not owners:
+        return owners
+
+    for location in SQLLocation.objects.filter(location_id__in=list(owners)):
+        owners[location.location_id] = location
+
+    doc_ids = [owner_id for owner_id, owner in owners.items() if owner is None]
+    for owner_doc in get_docs(user_db(), doc_ids):
+        cls = _get_owner_class(owner_doc['doc_type'])
+        if cls:
+            owners[owner_doc['_id']] = cls.wrap(owner_doc)
+    return owners
+
+
+def _get_owner_class(doc_type):
+    return {
+        'CommCareUser': CommCareUser,
+        'WebUser': WebUser,
+        'Group': Group,
+    }.get(doc_type)
@@ -100,14 +100,14 @@ def _get_es_query(domain, user_type, user_filters):
     location_ids = []
     if 'web_user_assigned_location_ids' in user_filters.keys():
         location_ids = SQLLocation.objects.get_locations_and_children_ids(
-            user_filters['web_user_assigned_location_ids']
+            user_filters['web_user_assigned_location_ids'], domain=domain
         )
     elif location_id:
         if selected_location_only:
             # This block will never execute for WEB_USER_TYPE
             location_ids = [location_id]
         else:
-            location_ids = SQLLocation.objects.get_locations_and_children_ids([location_id])
+            location_ids = SQLLocation.objects.get_locations_and_children_ids([location_id], domain=domain)
 
     if location_ids:
         query = query.location(location_ids)
@@ -29,7 +29,7 @@ from django_prbac.exceptions import PermissionDenied
 from django_prbac.utils import has_privilege
 from memoized import memoized
 
-from casexml.apps.phone.models import SyncLogSQL
+from casexml.apps.phone.models import LiveCaseGraphSnapshot, SyncLogSQL
 from couchexport.models import Format
 from couchexport.writers import Excel2007ExportWriter
 from soil import DownloadBase
@@ -492,6 +492,7 @@ def force_user_412(request, domain, user_id):
     metrics_counter('commcare.force_user_412.count', tags={'domain': domain})
 
     SyncLogSQL.objects.filter(user_id=user_id).delete()
+    LiveCaseGraphSnapshot.objects.filter(domain=domain, user_id=user_id).delete()
 
     messages.success(
         request,
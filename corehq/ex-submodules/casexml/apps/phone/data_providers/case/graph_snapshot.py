@@ -0,0 +1,254 @@
+"""Persistent case graph snapshots for livequery restores
+
+The livequery algorithm walks the case graph (owned cases, their hosts,
+parents and open extensions) one level at a time, issuing a
+``get_related_indices`` and a ``get_closed_and_deleted_ids`` query per
+level. For users with large case footprints most of that graph has not
+changed since their previous restore.
+
+``CaseGraphSnapshotSource`` records all graph data read during a restore
+so it can be saved as a ``LiveCaseGraphSnapshot``. On the next restore
+the snapshot is validated against the current ``server_modified_on`` of
+every case it references, and graph data for cases that have not been
+touched since the snapshot was taken (and are not related to a case that
+has) is served from memory. Only the modified parts of the graph are
+read from the database.
+
+Index rows only change when the case that owns them is modified, and
+closing or deleting a case updates its ``server_modified_on``, so a case
+is considered unchanged if neither it nor any case with an index
+related to it has been modified. New open extensions of unchanged cases
+are found with a single ``get_related_indices`` query that excludes all
+indices already in the snapshot.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from casexml.apps.case.const import CASE_INDEX_EXTENSION
+from casexml.apps.phone.models import LiveCaseGraphSnapshot
+
+from corehq.form_processor.models import CommCareCase, CommCareCaseIndex
+from corehq.util.metrics import metrics_counter
+
+GRAPH_FORMAT_VERSION = 1
+
+# Changes committed shortly after a snapshot was taken may have been
+# written with a ``server_modified_on`` that precedes the snapshot.
+SNAPSHOT_DATE_MARGIN = timedelta(minutes=5)
+SNAPSHOT_MAX_AGE = timedelta(days=7)
+
+EXTENSION_ID = CommCareCaseIndex.RELATIONSHIP_MAP[CASE_INDEX_EXTENSION]
+
+
+class CaseGraphSource:
+    """Read case graph data from the database"""
+
+    def __init__(self, domain):
+        self.domain = domain
+
+    def get_related_indices(self, case_ids, exclude_indices):
+        return CommCareCaseIndex.objects.get_related_indices(
+            self.domain, case_ids, exclude_indices)
+
+    def get_closed_and_deleted_ids(self, case_ids):
+        return CommCareCase.objects.get_closed_and_deleted_ids(self.domain, case_ids)
+
+    def get_last_modified_dates(self, case_ids):
+        return CommCareCase.objects.get_last_modified_dates(self.domain, case_ids)
+
+
+class CaseGraphSnapshotSource(CaseGraphSource):
+    """Read case graph data from a snapshot where it is still valid
+
+    Everything read through this source, whether it came from the
+    snapshot or the database, is recorded so a new snapshot can be
+    saved with ``to_json()`` once the case graph walk is complete.
+    """
+
+    def __init__(self, domain):
+        super().__init__(domain)
+        # snapshots taken from this source are valid as of this date
+        self.date = datetime.utcnow() - SNAPSHOT_DATE_MARGIN
+        self.cached_case_count = 0
+        self.queried_case_count = 0
+
+        # snapshot data that is still valid
+        self._clean_ids = set()         # explored cases that can be served
+        self._related = defaultdict(dict)  # case_id -> {index key: row}
+        self._clean_status = {}         # case_id -> (closed, deleted)
+
+        # data read during this restore
+        self._explored = set()
+        self._rows = {}                 # index key -> row
+        self._status = {}               # case_id -> (closed, deleted)
+
+    def load(self, graph, since):
+        """Load snapshot data that is still valid
+
+        :param graph: Snapshot graph JSON (see ``to_json()``).
+        :param since: Date as of which the snapshot was valid.
+        """
+        rows = [tuple(row) for row in graph["indices"]]
+        status = {case_id: tuple(value) for case_id, value in graph["status"].items()}
+        explored = set(graph["explored"])
+        case_ids = explored | set(status)
+        case_ids.update(row[0] for row in rows)
+        case_ids.update(row[2] for row in rows if row[2])
+        if not case_ids:
+            return
+
+        modified_dates = self.get_last_modified_dates(list(case_ids))
+        stale = {case_id for case_id in case_ids
+                 if case_id not in modified_dates or modified_dates[case_id] >= since}
+
+        dirty = set(stale)
+        clean_rows = {}
+        for row in rows:
+            case_id, identifier, referenced_id, referenced_type, relationship_id = row
+            if case_id in stale:
+                # the index may have changed or been removed
+                dirty.add(referenced_id)
+                continue
+            clean_rows[_index_key(row)] = row
+            self._related[case_id][_index_key(row)] = row
+            if relationship_id == EXTENSION_ID and referenced_id:
+                if case_id not in status:
+                    # cannot tell if this extension is returned as a
+                    # related index of its host
+                    dirty.add(referenced_id)
+                elif status[case_id] == (False, False):
+                    self._related[referenced_id][_index_key(row)] = row
+
+        # Find indices that are not in the snapshot: new open extensions
+        # of snapshot cases and current indices of modified cases.
+        stale_subcase_ids = {row[0] for row in rows if row[0] in stale}
+        new_indices = super().get_related_indices(
+            list(explored | stale_subcase_ids), list(clean_rows))
+        for index in new_indices:
+            dirty.add(index.case_id)
+            dirty.add(index.referenced_id)
+
+        self._clean_ids = explored - dirty
+        self._clean_status = {case_id: value for case_id, value in status.items()
+                              if case_id not in stale}
+
+    def add_open_case_ids(self, case_ids):
+        """Record case ids known to be open and not deleted (owned cases)"""
+        for case_id in case_ids:
+            self._status[case_id] = (False, False)
+
+    def get_related_indices(self, case_ids, exclude_indices):
+        cached_ids = [case_id for case_id in case_ids if case_id in self._clean_ids]
+        query_ids = [case_id for case_id in case_ids if case_id not in self._clean_ids]
+        self.cached_case_count += len(cached_ids)
+        self.queried_case_count += len(query_ids)
+        self._explored.update(case_ids)
+
+        related = {}
+        for case_id in cached_ids:
+            for key, row in self._related[case_id].items():
+                if key not in exclude_indices and key not in related:
+                    related[key] = _row_to_index(self.domain, row)
+                    if row[0] in self._clean_status:
+                        self._status[row[0]] = self._clean_status[row[0]]
+        if query_ids:
+            query_id_set = set(query_ids)
+            for index in super().get_related_indices(query_ids, exclude_indices):
+                related[_index_key(_index_to_row(index))] = index
+                if (index.relationship_id == EXTENSION_ID
+                        and index.referenced_id in query_id_set
+                        and index.case_id not in query_id_set):
+                    # only returned if the extension case is open and not deleted
+                    self._status[index.case_id] = (False, False)
+
+        for key, index in related.items():
+            self._rows[key] = _index_to_row(index)
+        return list(related.values())
+
+    def get_closed_and_deleted_ids(self, case_ids):
+        result = []
+        query_ids = []
+        for case_id in case_ids:
+            if case_id in self._clean_status:
+                closed, deleted = self._status[case_id] = self._clean_status[case_id]
+                if closed or deleted:
+                    result.append((case_id, closed, deleted))
+            else:
+                query_ids.append(case_id)
+        if query_ids:
+            for case_id in query_ids:
+                self._status[case_id] = (False, False)
+            for case_id, closed, deleted in super().get_closed_and_deleted_ids(query_ids):
+                self._status[case_id] = (closed, deleted)
+                result.append((case_id, closed, deleted))
+        return result
+
+    def to_json(self):
+        return {
+            "version": GRAPH_FORMAT_VERSION,
+            "explored": sorted(self._explored),
+            "indices": [list(row) for row in self._rows.values()],
+            "status": {case_id: list(value) for case_id, value in self._status.items()},
+        }
+
+
+def get_case_graph_snapshot_source(domain, user_id, use_snapshot=True):
+    """Get a case graph source initialized from the user's last snapshot
+
+    :param use_snapshot: If false, ignore any existing snapshot. A new
+    snapshot can still be saved from the returned source.
+    """
+    source = CaseGraphSnapshotSource(domain)
+    snapshot = None
+    if use_snapshot:
+        snapshot = LiveCaseGraphSnapshot.objects.filter(domain=domain, user_id=user_id).first()
+    if (snapshot is not None
+            and snapshot.graph.get("version") == GRAPH_FORMAT_VERSION
+            and snapshot.date > datetime.utcnow() - SNAPSHOT_MAX_AGE):
+        source.load(snapshot.graph, snapshot.date)
+        result = 'hit'
+    else:
+        result = 'miss'
+    metrics_counter('commcare.restore.case_graph_snapshot.load', tags={
+        'domain': domain,
+        'result': result,
+    })
+    return source
+
+
+def save_case_graph_snapshot(domain, user_id, source):
+    LiveCaseGraphSnapshot.objects.update_or_create(
+        domain=domain,
+        user_id=user_id,
+        defaults={"date": source.date, "graph": source.to_json()},
+    )
+    metrics_counter('commcare.restore.case_graph_snapshot.cached_cases',
+                    source.cached_case_count, tags={'domain': domain})
+    metrics_counter('commcare.restore.case_graph_snapshot.queried_cases',
+                    source.queried_case_count, tags={'domain': domain})
+
+
+def _index_key(row):
+    return '{} {}'.format(row[0], row[1])
+
+
+def _index_to_row(index):
+    return (
+        index.case_id,
+        index.identifier,
+        index.referenced_id,
+        index.referenced_type,
+        index.relationship_id,
+    )
+
+
+def _row_to_index(domain, row):
+    case_id, identifier, referenced_id, referenced_type, relationship_id = row
+    return CommCareCaseIndex(
+        domain=domain,
+        case_id=case_id,
+        identifier=identifier,
+        referenced_id=referenced_id,
+        referenced_type=referenced_type,
+        relationship_id=relationship_id,
+    )
@@ -23,20 +23,29 @@ Example case graphs with outcomes:
 """
 import logging
 from collections import defaultdict
-from functools import partial, wraps
+from functools import wraps
 from itertools import chain, islice
 
 from casexml.apps.case.const import CASE_INDEX_EXTENSION as EXTENSION
 from casexml.apps.phone.const import ASYNC_RETRY_AFTER
 from casexml.apps.phone.tasks import ASYNC_RESTORE_SENT
 
-from corehq.form_processor.models import CommCareCase, CommCareCaseIndex
+from corehq.form_processor.models import CommCareCase
 from corehq.sql_db.routers import read_from_plproxy_standbys
-from corehq.toggles import LIVEQUERY_READ_FROM_STANDBYS, NAMESPACE_USER
+from corehq.toggles import (
+    LIVEQUERY_CASE_GRAPH_SNAPSHOT,
+    LIVEQUERY_READ_FROM_STANDBYS,
+    NAMESPACE_USER,
+)
 from corehq.util.metrics import metrics_counter, metrics_histogram
 from corehq.util.metrics.load_counters import case_load_counter
 from corehq.util.timer import TimingContext
 
+from .graph_snapshot import (
+    CaseGraphSource,
+    get_case_graph_snapshot_source,
+    save_case_graph_snapshot,
+)
 from .load_testing import get_xml_for_response
 from .stock import get_stock_payload
 from .utils import get_case_sync_updates
@@ -59,13 +68,20 @@ def do_livequery(timing_context, restore_state, response, async_task=None):
     """Get case sync restore response
 
     This function makes no changes to external state other than updating
-    the `restore_state.current_sync_log` and progress of `async_task`.
+    the `restore_state.current_sync_log`, progress of `async_task` and
+    the user's case graph snapshot (if enabled).
     Extends `response` with restore elements.
     """
 
     debug = logging.getLogger(__name__).debug
     domain = restore_state.domain
+    user_id = restore_state.restore_user.user_id
     owner_ids = list(restore_state.owner_ids)
+    use_graph_snapshot = (
+        LIVEQUERY_CASE_GRAPH_SNAPSHOT.enabled(user_id, NAMESPACE_USER)
+        # standbys may lag behind, which would make the snapshot date wrong
+        and not LIVEQUERY_READ_FROM_STANDBYS.enabled(user_id, NAMESPACE_USER)
+    )
 
     debug("sync %s for %r", restore_state.current_sync_log._id, owner_ids)
     with timing_context("livequery"):
@@ -74,7 +90,20 @@ def do_livequery(timing_context, restore_state, response, async_task=None):
                 domain, owner_ids, closed=False)
             debug("owned: %r", owned_ids)
 
-        live_ids, indices = get_live_case_ids_and_indices(domain, owned_ids, timing_context)
+        if use_graph_snapshot:
+            with timing_context("load_case_graph_snapshot"):
+                graph_source = get_case_graph_snapshot_source(
+                    domain, user_id, use_snapshot=not restore_state.overwrite_cache)
+                graph_source.add_open_case_ids(owned_ids)
+        else:
+            graph_source = None
+
+        live_ids, indices = get_live_case_ids_and_indices(
+            domain, owned_ids, timing_context, graph_source)
+
+        if use_graph_snapshot:
+            with timing_context("save_case_graph_snapshot"):
+                save_case_graph_snapshot(domain, user_id, graph_source)
 
         if restore_state.last_sync_log:
             with timing_context("discard_already_synced_cases"):
@@ -130,7 +159,12 @@ def get_all_related_live_cases(domain, case_ids):
     return new_cases
 
 
-def get_live_case_ids_and_indices(domain, owned_ids, timing_context):
+def get_live_case_ids_and_indices(domain, owned_ids, timing_context, graph_source=None):
+    """Get live case ids and the indices of all related cases
+
+    :param graph_source: Optional ``CaseGraphSource`` used to read case
+    indices and status. Defaults to reading everything from the database.
+    """
     def index_key(index):
         return '{} {}'.format(index.case_id, index.identifier)
 
@@ -257,7 +291,7 @@ def get_live_case_ids_and_indices(domain, owned_ids, timing_context):
             if index.relationship == 'extension'
         }
         check_cases = list(set(case_ids) - open_cases)
-        rows = CommCareCase.objects.get_closed_and_deleted_ids(domain, check_cases)
+        rows = graph_source.get_closed_and_deleted_ids(check_cases)
         for case_id, closed, deleted in rows:
             if deleted:
                 deleted_ids.add(case_id)
@@ -289,7 +323,9 @@ def get_live_case_ids_and_indices(domain, owned_ids, timing_context):
     next_ids = all_ids = set(owned_ids)
     owned_ids = set(owned_ids)  # owned, open case ids (may be extensions)
     open_ids = set(owned_ids)
-    get_related_indices = partial(CommCareCaseIndex.objects.get_related_indices, domain)
+    if graph_source is None:
+        graph_source = CaseGraphSource(domain)
+    get_related_indices = graph_source.get_related_indices
     while next_ids:
         exclude = set(chain.from_iterable(seen_ix[id] for id in next_ids))
         with timing_context("get_related_indices({} cases, {} seen)".format(len(next_ids), len(exclude))):
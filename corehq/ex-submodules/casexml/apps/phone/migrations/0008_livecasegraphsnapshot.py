@@ -0,0 +1,26 @@
+# Generated by Django 3.2.20 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('phone', '0007_delete_ownershipcleanlinessflag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiveCaseGraphSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=255)),
+                ('user_id', models.CharField(max_length=255)),
+                ('date', models.DateTimeField(db_index=True)),
+                ('graph', models.JSONField()),
+            ],
+            options={
+                'unique_together': {('domain', 'user_id')},
+            },
+        ),
+    ]
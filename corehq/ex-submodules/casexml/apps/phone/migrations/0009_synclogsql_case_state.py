@@ -0,0 +1,18 @@
+# Generated by Django 3.2.20 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('phone', '0008_livecasegraphsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='synclogsql',
+            name='case_state',
+            field=models.BinaryField(null=True),
+        ),
+    ]
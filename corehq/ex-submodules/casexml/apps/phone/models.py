@@ -20,6 +20,10 @@ from casexml.apps.phone.exceptions import (
     IncompatibleSyncLogType,
     MissingSyncLog,
 )
+from casexml.apps.phone.synclog_encoding import (
+    merge_case_state,
+    split_case_state,
+)
 from dimagi.ext.couchdbkit import (
     BooleanProperty,
     DateTimeProperty,
@@ -428,7 +432,11 @@ def synclog_to_sql_object(synclog_json_object):
     ]
     for from_field, to_field in field_mapping:
         setattr(synclog, to_field, getattr(synclog_json_object, from_field, None))
-    synclog.doc = synclog_json_object.to_json()
+    doc = synclog_json_object.to_json()
+    if toggles.COMPACT_SYNCLOG_FORMAT.enabled(synclog_json_object.domain):
+        synclog.doc, synclog.case_state = split_case_state(doc)
+    else:
+        synclog.doc, synclog.case_state = doc, None
     return synclog
 
 
@@ -461,6 +469,9 @@ class SyncLogSQL(models.Model):
     case_count = models.IntegerField(null=True)
     request_user_id = models.CharField(max_length=255, null=True)
     auth_type = models.CharField(max_length=128, null=True)
+    # compact encoding of case state fields removed from doc
+    # see casexml.apps.phone.synclog_encoding
+    case_state = models.BinaryField(null=True)
 
     def save(self, *args, **kwargs):
         super(SyncLogSQL, self).save(*args, **kwargs)
@@ -474,6 +485,23 @@ class SyncLogSQL(models.Model):
             )
 
 
+class LiveCaseGraphSnapshot(models.Model):
+    """Case graph data read by the most recent livequery restore of a user
+
+    Stores the case indices and case statuses that were fetched while
+    walking the case graph so the next restore only needs to re-read the
+    parts of the graph that have been modified since ``date``. See
+    ``casexml.apps.phone.data_providers.case.graph_snapshot``.
+    """
+    domain = models.CharField(max_length=255)
+    user_id = models.CharField(max_length=255)
+    date = models.DateTimeField(db_index=True)
+    graph = models.JSONField()
+
+    class Meta(object):
+        unique_together = ('domain', 'user_id')
+
+
 class IndexTree(DocumentSchema):
     """
     Document type representing a case dependency tree (which is flattened to a single dict)
@@ -1049,6 +1077,8 @@ def get_properly_wrapped_sync_log(doc_id):
 
 
 def properly_wrap_sync_log(doc, synclog_sql=None):
+    if synclog_sql is not None and synclog_sql.case_state is not None:
+        doc = merge_case_state(doc, synclog_sql.case_state)
     synclog = SimplifiedSyncLog.wrap(doc)
     if synclog_sql:
         synclog._synclog_sql = synclog_sql
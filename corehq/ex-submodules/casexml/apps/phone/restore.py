@@ -1,8 +1,11 @@
+import copy
+import io
 import logging
 import os
-import shutil
 import tempfile
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime, timedelta
 from looseversion import LooseVersion
 from io import BytesIO
@@ -12,6 +15,7 @@ from wsgiref.util import FileWrapper
 from xml.etree import cElementTree as ElementTree
 
 from django.conf import settings
+from django.db import connections
 from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.text import slugify
 
@@ -30,7 +34,7 @@ from corehq.apps.domain.models import Domain
 from corehq.blobs import CODES, get_blob_db
 from corehq.blobs.exceptions import NotFound
 from corehq.const import LOADTEST_HARD_LIMIT
-from corehq.toggles import EXTENSION_CASES_SYNC_ENABLED
+from corehq.toggles import EXTENSION_CASES_SYNC_ENABLED, PARALLEL_RESTORE_PROVIDERS
 from corehq.util.metrics import metrics_counter, metrics_histogram
 from corehq.util.timer import TimingContext
 from dimagi.utils.logging import notify_error
@@ -110,13 +114,17 @@ class RestoreContent(object):
         self.username = username
         self.items = items
         self.num_items = 0
+        self.response_body = None
+        self.body_parts = []
 
     def __enter__(self):
         self.response_body = tempfile.TemporaryFile('w+b')
+        self.body_parts = [self.response_body]
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.response_body.close()
+        for part in self.body_parts:
+            part.close()
 
     def append(self, xml_element):
         self.num_items += 1
@@ -131,31 +139,113 @@ class RestoreContent(object):
         for element in iterable:
             self.append(element)
 
-    def _write_to_file(self, fileobj):
+    def _get_start_tag(self):
         # Add 1 to num_items to account for message element
         items = (self.items_template % ('%s' % (self.num_items + 1)).encode('utf-8')) if self.items else b''
-        fileobj.write(self.start_tag_template % {
+        return self.start_tag_template % {
             b"items": items,
             b"username": self.username.encode("utf8"),
             b"nature": ResponseNature.OTA_RESTORE_SUCCESS.encode("utf8"),
-        })
+        }
 
-        self.response_body.seek(0)
-        shutil.copyfileobj(self.response_body, fileobj)
+    def splice(self, content):
+        """Append the body of another ``RestoreContent`` without copying it
 
-        fileobj.write(self.closing_tag)
+        Takes over ownership of the other content's body. Elements
+        appended after this are written after the spliced body.
+        """
+        self.num_items += content.num_items
+        self.body_parts.extend(content.body_parts)
+        content.body_parts = []
+        content.response_body = None
+        self.response_body = tempfile.TemporaryFile('w+b')
+        self.body_parts.append(self.response_body)
 
     def get_fileobj(self):
-        fileobj = tempfile.TemporaryFile('w+b')
+        """Get a file object with the complete response content
+
+        The response body is not copied: the returned file object reads
+        the start tag, body and closing tag in sequence and takes over
+        ownership of the body files. No more elements may be appended.
+        """
+        parts, self.body_parts = self.body_parts, []
+        self.response_body = None
         try:
-            self._write_to_file(fileobj)
-            fileobj.seek(0)
-            return fileobj
+            return ComposedFile(
+                [BytesIO(self._get_start_tag())] + parts + [BytesIO(self.closing_tag)]
+            )
         except:  # noqa
-            fileobj.close()
+            for part in parts:
+                part.close()
             raise
 
 
+class ComposedFile(io.RawIOBase):
+    """Read-only, seekable file object reading a sequence of file objects
+
+    All parts must be seekable. They are closed when this file is closed.
+    """
+
+    def __init__(self, parts):
+        super().__init__()
+        self._parts = []
+        start = 0
+        for part in parts:
+            size = part.seek(0, os.SEEK_END)
+            self._parts.append((start, size, part))
+            start += size
+        self._size = start
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            pos = offset
+        elif whence == os.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == os.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError("invalid whence ({}, should be 0, 1 or 2)".format(whence))
+        if pos < 0:
+            raise ValueError("negative seek position {}".format(pos))
+        self._pos = pos
+        return pos
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast('B')
+        filled = 0
+        for start, size, part in self._parts:
+            if filled == len(view):
+                break
+            end = start + size
+            if self._pos >= end:
+                continue
+            part.seek(self._pos - start)
+            want = min(len(view) - filled, end - self._pos)
+            data = part.read(want)
+            view[filled:filled + len(data)] = data
+            filled += len(data)
+            self._pos += len(data)
+            if len(data) < want:
+                break  # part was shorter than expected
+        return filled
+
+    def close(self):
+        if not self.closed:
+            for start, size, part in self._parts:
+                part.close()
+        super().close()
+
+
 class RestoreResponse(object):
 
     def __init__(self, fileobj):
@@ -466,6 +556,37 @@ class RestoreState:
         self.current_sync_log.duration = self.duration.seconds
         self.current_sync_log.save()
 
+    def copy_for_provider(self):
+        """
+        Returns a copy of the state with its own provider log and copy of
+        the current sync log, for a provider that runs concurrently with
+        other providers. See ``merge_provider_states()``.
+        """
+        state = copy.copy(self)
+        state.provider_log = {}
+        state.current_sync_log = SimplifiedSyncLog.wrap(copy.deepcopy(self.current_sync_log.to_json()))
+        return state
+
+    def merge_provider_states(self, provider_states):
+        """
+        Applies the changes that providers made to their copies of the
+        state (see ``copy_for_provider()``) to this state
+        """
+        original = self.current_sync_log.to_json()
+        merged = copy.deepcopy(original)
+        changed = set()
+        for state in provider_states:
+            self.provider_log.update(state.provider_log)
+            for name, value in state.current_sync_log.to_json().items():
+                if value == original.get(name):
+                    continue
+                if name in changed:
+                    raise ValueError(f"Sync log property {name!r} was changed by more than one provider")
+                changed.add(name)
+                merged[name] = value
+        if changed:
+            self.current_sync_log = SimplifiedSyncLog.wrap(merged)
+
     def _new_sync_log(self):
         previous_log_id = None if self.is_initial else self.last_sync_log._id
         new_synclog = SimplifiedSyncLog(
@@ -711,6 +832,8 @@ class RestoreConfig(object):
         """
         :returns: A file-like object containing response content.
         """
+        if PARALLEL_RESTORE_PROVIDERS.enabled(self.domain):
+            return self._generate_restore_response_in_parallel(async_task)
         username = self.restore_user.username
         count_items = self.params.include_item_count
         with RestoreContent(username, count_items) as content:
@@ -724,6 +847,53 @@ class RestoreConfig(object):
 
             return content.get_fileobj()
 
+    def _generate_restore_response_in_parallel(self, async_task=None):
+        """Run each provider in its own thread with its own content buffer
+
+        Buffers are spliced together in provider order once all providers
+        are done, so the payload is the same as when generated serially.
+        Each provider also gets its own copy of the restore state, and the
+        changes they make to it are merged afterwards.
+        """
+        def run(provider, extend, part, restore_state, timing_context):
+            provider.timing_context = timing_context
+            try:
+                with timing_context:
+                    extend(provider, restore_state, part)
+            finally:
+                connections.close_all()
+
+        def extend_elements(provider, restore_state, part):
+            part.extend(provider.get_elements(restore_state))
+
+        def extend_response(provider, restore_state, part):
+            provider.extend_response(restore_state, part)
+
+        jobs = [(provider, extend_elements) for provider in
+                get_element_providers(self.timing_context, skip_fixtures=self.skip_fixtures)]
+        jobs.extend((provider, extend_response) for provider in
+                    get_async_providers(self.timing_context, async_task))
+        username = self.restore_user.username
+        count_items = self.params.include_item_count
+        with ExitStack() as stack:
+            content = stack.enter_context(RestoreContent(username, count_items))
+            parts = [stack.enter_context(RestoreContent(username, count_items)) for job in jobs]
+            states = [self.restore_state.copy_for_provider() for job in jobs]
+            timing_contexts = [TimingContext(provider.__class__.__name__) for provider, extend in jobs]
+            with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+                futures = [
+                    executor.submit(run, provider, extend, part, state, timing_context)
+                    for (provider, extend), part, state, timing_context
+                    in zip(jobs, parts, states, timing_contexts)
+                ]
+            for timing_context in timing_contexts:
+                self.timing_context.add_context(timing_context)
+            for future, part in zip(futures, parts):
+                future.result()  # raise error if the provider failed
+                content.splice(part)
+            self.restore_state.merge_provider_states(states)
+            return content.get_fileobj()
+
     def set_cached_payload_if_necessary(self, fileobj, duration, is_async):
         # must cache if the duration was longer than the threshold
         is_long_restore = duration > timedelta(seconds=INITIAL_SYNC_CACHE_THRESHOLD)
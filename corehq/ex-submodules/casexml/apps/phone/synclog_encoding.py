@@ -0,0 +1,235 @@
+"""Compact binary encoding of sync log case state
+
+The case state of a ``SimplifiedSyncLog`` (the sets of case ids on the
+phone and the child/extension index trees) makes up nearly all of a
+large sync log. Stored as JSON it must be parsed in full on every sync.
+
+The encoding stores every case id once in a sorted string table, with
+UUIDs packed as 16 bytes, and refers to them by their position in the
+table everywhere else:
+
+    header          b'SLCS' + format version (1 byte)
+    case id table   dashed UUIDs, hex UUIDs, other strings
+    identifiers     index identifiers ('parent', 'host', ...)
+    case id sets    case_ids_on_phone, dependent_case_ids_on_phone,
+                    closed_cases: arrays of case id table positions
+    index trees     index_tree, extension_index_tree: adjacency arrays
+
+All integers are unsigned 32-bit little-endian.
+"""
+import re
+import struct
+import sys
+from array import array
+
+MAGIC = b'SLCS'
+FORMAT_VERSION = 1
+
+CASE_ID_SET_FIELDS = ['case_ids_on_phone', 'dependent_case_ids_on_phone', 'closed_cases']
+INDEX_TREE_FIELDS = ['index_tree', 'extension_index_tree']
+CASE_STATE_FIELDS = CASE_ID_SET_FIELDS + INDEX_TREE_FIELDS
+
+_DASHED_UUID = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+_HEX_UUID = re.compile(r'^[0-9a-f]{32}$')
+_COUNT = struct.Struct('<I')
+_UINT32 = 'I' if array('I').itemsize == 4 else 'L'
+
+
+class CaseStateDecodeError(Exception):
+    pass
+
+
+def split_case_state(doc):
+    """Move case state out of a sync log JSON doc
+
+    :returns: A tuple ``(doc, case_state)``. ``doc`` is a copy of the
+    input without case state fields and ``case_state`` is the encoded
+    case state. If the case state cannot be encoded, the input doc is
+    returned unchanged with ``None``.
+    """
+    if not all(field in doc for field in CASE_STATE_FIELDS) or not _is_encodable(doc):
+        return doc, None
+    doc = dict(doc)
+    state = {field: doc.pop(field) for field in CASE_STATE_FIELDS}
+    return doc, encode_case_state(state)
+
+
+def merge_case_state(doc, case_state):
+    """Get a copy of sync log JSON doc with decoded case state added"""
+    doc = dict(doc)
+    doc.update(decode_case_state(case_state))
+    return doc
+
+
+def encode_case_state(state):
+    """Encode case state JSON
+
+    :param state: Dict with all of ``CASE_STATE_FIELDS`` in the format
+    produced by ``SimplifiedSyncLog.to_json()``.
+    :returns: bytes
+    """
+    trees = [state[field]['indices'] for field in INDEX_TREE_FIELDS]
+    case_ids = set()
+    identifiers = set()
+    for field in CASE_ID_SET_FIELDS:
+        case_ids.update(state[field])
+    for tree in trees:
+        for case_id, indices in tree.items():
+            case_ids.add(case_id)
+            identifiers.update(indices)
+            case_ids.update(indices.values())
+
+    dashed = sorted(cid for cid in case_ids if _DASHED_UUID.match(cid))
+    hexed = sorted(cid for cid in case_ids if _HEX_UUID.match(cid))
+    other = sorted(case_ids.difference(dashed, hexed))
+    table = dashed + hexed + other
+    positions = {case_id: n for n, case_id in enumerate(table)}
+    identifiers = sorted(identifiers)
+    identifier_positions = {identifier: n for n, identifier in enumerate(identifiers)}
+
+    parts = [MAGIC, bytes([FORMAT_VERSION])]
+    parts.append(_pack_uuids([cid.replace('-', '') for cid in dashed]))
+    parts.append(_pack_uuids(hexed))
+    parts.append(_pack_strings(other))
+    parts.append(_pack_strings(identifiers))
+    for field in CASE_ID_SET_FIELDS:
+        parts.append(_pack_ints(sorted(positions[case_id] for case_id in state[field])))
+    for tree in trees:
+        subcases = sorted(tree, key=positions.__getitem__)
+        parts.append(_pack_ints([positions[case_id] for case_id in subcases]))
+        parts.append(_pack_ints([len(tree[case_id]) for case_id in subcases]))
+        parts.append(_pack_ints([
+            identifier_positions[identifier]
+            for case_id in subcases for identifier in tree[case_id]
+        ]))
+        parts.append(_pack_ints([
+            positions[referenced_id]
+            for case_id in subcases for referenced_id in tree[case_id].values()
+        ]))
+    return b''.join(parts)
+
+
+def decode_case_state(data):
+    """Decode case state
+
+    :param data: bytes (or memoryview) produced by ``encode_case_state``.
+    :returns: Dict with all of ``CASE_STATE_FIELDS`` in the format
+    expected by ``SimplifiedSyncLog.wrap()``.
+    """
+    data = bytes(data)
+    if len(data) <= len(MAGIC) or data[:len(MAGIC)] != MAGIC:
+        raise CaseStateDecodeError("Not an encoded sync log case state")
+    version = data[len(MAGIC)]
+    if version != FORMAT_VERSION:
+        raise CaseStateDecodeError(f"Unknown sync log case state version: {version}")
+    reader = _Reader(data, len(MAGIC) + 1)
+
+    dashed = [
+        f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+        for h in reader.uuids()
+    ]
+    table = dashed + reader.uuids() + reader.strings()
+    identifiers = reader.strings()
+
+    state = {}
+    for field in CASE_ID_SET_FIELDS:
+        state[field] = list(map(table.__getitem__, reader.ints()))
+    for field in INDEX_TREE_FIELDS:
+        subcases = reader.ints()
+        counts = reader.ints()
+        identifier_ids = reader.ints()
+        referenced_ids = reader.ints()
+        pairs = list(zip(
+            map(identifiers.__getitem__, identifier_ids),
+            map(table.__getitem__, referenced_ids),
+        ))
+        indices = {}
+        offset = 0
+        for case_n, count in zip(subcases, counts):
+            end = offset + count
+            indices[table[case_n]] = dict(pairs[offset:end])
+            offset = end
+        state[field] = {'doc_type': 'IndexTree', 'indices': indices}
+    if reader.offset != len(data):
+        raise CaseStateDecodeError("Unexpected data after sync log case state")
+    return state
+
+
+def _is_encodable(doc):
+    def is_str(value):
+        return isinstance(value, str)
+
+    for field in CASE_ID_SET_FIELDS:
+        if not isinstance(doc[field], list) or not all(map(is_str, doc[field])):
+            return False
+    for field in INDEX_TREE_FIELDS:
+        tree = doc[field]
+        if not isinstance(tree, dict) or not isinstance(tree.get('indices'), dict):
+            return False
+        for indices in tree['indices'].values():
+            if not isinstance(indices, dict):
+                return False
+            if not all(map(is_str, indices)) or not all(map(is_str, indices.values())):
+                return False
+    return True
+
+
+def _pack_ints(values):
+    values = array(_UINT32, values)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return _COUNT.pack(len(values)) + values.tobytes()
+
+
+def _pack_uuids(hex_values):
+    return _COUNT.pack(len(hex_values)) + bytes.fromhex(''.join(hex_values))
+
+
+def _pack_strings(values):
+    encoded = [value.encode('utf-8') for value in values]
+    return _pack_ints([len(value) for value in encoded]) + b''.join(encoded)
+
+
+class _Reader:
+
+    def __init__(self, data, offset):
+        self.data = data
+        self.offset = offset
+
+    def count(self):
+        try:
+            value, = _COUNT.unpack_from(self.data, self.offset)
+        except struct.error as err:
+            raise CaseStateDecodeError(str(err))
+        self.offset += _COUNT.size
+        return value
+
+    def take(self, size):
+        end = self.offset + size
+        if end > len(self.data):
+            raise CaseStateDecodeError("Truncated sync log case state")
+        value = self.data[self.offset:end]
+        self.offset = end
+        return value
+
+    def ints(self):
+        count = self.count()
+        values = array(_UINT32)
+        values.frombytes(self.take(count * values.itemsize))
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values
+
+    def uuids(self):
+        hex_data = self.take(self.count() * 16).hex()
+        return [hex_data[i:i + 32] for i in range(0, len(hex_data), 32)]
+
+    def strings(self):
+        lengths = self.ints()
+        data = self.take(sum(lengths))
+        values = []
+        offset = 0
+        for length in lengths:
+            values.append(data[offset:offset + length].decode('utf-8'))
+            offset += length
+        return values
@@ -9,7 +9,7 @@ from celery import current_app, current_task
 from celery.schedules import crontab
 from celery.signals import after_task_publish
 
-from casexml.apps.phone.models import SyncLogSQL
+from casexml.apps.phone.models import LiveCaseGraphSnapshot, SyncLogSQL
 from dimagi.utils.logging import notify_exception
 
 from corehq.apps.celery import periodic_task, task
@@ -75,6 +75,7 @@ def update_celery_state(sender=None, headers=None, **kwargs):
 def prune_synclogs():
     """
     Drops all partition tables containing data that's older than 63 days (9 weeks)
+    and deletes expired case graph snapshots
     """
     db = router.db_for_write(SyncLogSQL)
     oldest_date = SyncLogSQL.objects.aggregate(Min('date'))['date__min']
@@ -90,6 +91,9 @@ def prune_synclogs():
             cursor.execute(drop_query)
         oldest_date += timedelta(weeks=1)
 
+    from casexml.apps.phone.data_providers.case.graph_snapshot import SNAPSHOT_MAX_AGE
+    LiveCaseGraphSnapshot.objects.filter(date__lt=datetime.utcnow() - SNAPSHOT_MAX_AGE).delete()
+
     # find and log synclogs for which the trigger did not function properly
     with connections[db].cursor() as cursor:
         cursor.execute("select count(*) from only phone_synclogsql")
@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from casexml.apps.phone.data_providers.case.graph_snapshot import (
+    CaseGraphSnapshotSource,
+    CaseGraphSource,
+)
+from casexml.apps.phone.data_providers.case.livequery import (
+    get_live_case_ids_and_indices,
+)
+
+from corehq.form_processor.models import CommCareCaseIndex
+from corehq.util.timer import TimingContext
+
+DOMAIN = 'graph-snapshot'
+CHILD = CommCareCaseIndex.CHILD
+EXTENSION = CommCareCaseIndex.EXTENSION
+
+
+class FakeCaseDB:
+
+    def __init__(self):
+        self.cases = {}     # case_id -> {closed, deleted, modified}
+        self.indices = {}   # (case_id, identifier) -> (referenced_id, relationship_id)
+
+    def save(self, case_id, closed=False, deleted=False, indices=()):
+        self.cases[case_id] = {
+            'closed': closed,
+            'deleted': deleted,
+            'modified': datetime.utcnow(),
+        }
+        for identifier, referenced_id, relationship_id in indices:
+            self.indices[(case_id, identifier)] = (referenced_id, relationship_id)
+
+    def get_related_indices(self, case_ids, exclude_indices):
+        def make_index(case_id, identifier, referenced_id, relationship_id):
+            return CommCareCaseIndex(
+                domain=DOMAIN,
+                case_id=case_id,
+                identifier=identifier,
+                referenced_id=referenced_id,
+                referenced_type='thing',
+                relationship_id=relationship_id,
+            )
+
+        def is_open(case_id):
+            case = self.cases[case_id]
+            return not case['closed'] and not case['deleted']
+
+        case_ids = set(case_ids)
+        return [
+            make_index(case_id, identifier, referenced_id, relationship_id)
+            for (case_id, identifier), (referenced_id, relationship_id) in self.indices.items()
+            if '{} {}'.format(case_id, identifier) not in exclude_indices and (
+                case_id in case_ids
+                or (referenced_id in case_ids and relationship_id == EXTENSION and is_open(case_id))
+            )
+        ]
+
+    def get_closed_and_deleted_ids(self, case_ids):
+        return [
+            (case_id, self.cases[case_id]['closed'], self.cases[case_id]['deleted'])
+            for case_id in case_ids
+            if case_id in self.cases
+            and (self.cases[case_id]['closed'] or self.cases[case_id]['deleted'])
+        ]
+
+    def get_last_modified_dates(self, case_ids):
+        return {case_id: self.cases[case_id]['modified']
+                for case_id in case_ids if case_id in self.cases}
+
+
+def _fake_method(func):
+    def method(source, *args):
+        return func(*args)
+    return method
+
+
+class TestCaseGraphSnapshotSource(SimpleTestCase):
+
+    def setUp(self):
+        self.db = FakeCaseDB()
+        for name in ['get_related_indices', 'get_closed_and_deleted_ids', 'get_last_modified_dates']:
+            patcher = patch.object(CaseGraphSource, name, _fake_method(getattr(self.db, name)))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # owned: a, d; a <--ext-- b; a --child--> p; h <--ext-- d
+        self.db.save('p')
+        self.db.save('h')
+        self.db.save('a', indices=[('parent', 'p', CHILD)])
+        self.db.save('b', indices=[('host', 'a', EXTENSION)])
+        self.db.save('d', indices=[('host', 'h', EXTENSION)])
+        self.owned_ids = ['a', 'd']
+
+    def walk(self, source=None):
+        owned_ids = [case_id for case_id in self.owned_ids
+                     if not (self.db.cases[case_id]['closed'] or self.db.cases[case_id]['deleted'])]
+        if isinstance(source, CaseGraphSnapshotSource):
+            source.add_open_case_ids(owned_ids)
+        live_ids, indices = get_live_case_ids_and_indices(DOMAIN, owned_ids, TimingContext(), source)
+        return live_ids, {
+            case_id: sorted(str(ix) for ix in case_indices)
+            for case_id, case_indices in indices.items()
+            if case_indices
+        }
+
+    def take_snapshot(self):
+        source = CaseGraphSnapshotSource(DOMAIN)
+        self.walk(source)
+        return source.to_json(), source.date
+
+    def assert_snapshot_walk_matches(self, graph, date):
+        source = CaseGraphSnapshotSource(DOMAIN)
+        source.load(graph, date)
+        self.assertEqual(self.walk(source), self.walk())
+        return source
+
+    def advance_clock(self):
+        for case in self.db.cases.values():
+            case['modified'] -= timedelta(days=1)
+
+    def test_unchanged_graph_is_served_from_snapshot(self):
+        graph, date = self.take_snapshot()
+        self.advance_clock()
+        source = self.assert_snapshot_walk_matches(graph, date)
+        self.assertEqual(source.queried_case_count, 0)
+        self.assertGreater(source.cached_case_count, 0)
+
+    def test_new_extension_of_unchanged_host(self):
+        graph, date = self.take_snapshot()
+        self.advance_clock()
+        self.db.save('e', indices=[('host', 'p', EXTENSION)])
+        self.assertIn('e', self.assert_snapshot_walk_matches(graph, date).to_json()['explored'])
+
+    def test_closed_extension(self):
+        graph, date = self.take_snapshot()
+        self.advance_clock()
+        self.db.save('b', closed=True)
+        self.assert_snapshot_walk_matches(graph, date)
+
+    def test_moved_index(self):
+        graph, date = self.take_snapshot()
+        self.advance_clock()
+        self.db.save('b', indices=[('host', 'h', EXTENSION)])
+        self.assert_snapshot_walk_matches(graph, date)
+
+    def test_deleted_parent(self):
+        graph, date = self.take_snapshot()
+        self.advance_clock()
+        self.db.save('p', deleted=True)
+        self.assert_snapshot_walk_matches(graph, date)
+
+    def test_changed_owned_cases(self):
+        graph, date = self.take_snapshot()
+        self.advance_clock()
+        self.owned_ids = ['b']
+        self.assert_snapshot_walk_matches(graph, date)
+
+    def test_hard_deleted_case(self):
+        graph, date = self.take_snapshot()
+        self.advance_clock()
+        del self.db.cases['b']
+        del self.db.indices[('b', 'host')]
+        self.assert_snapshot_walk_matches(graph, date)
@@ -1,3 +1,6 @@
+import os
+from io import BytesIO
+
 from django.test import TestCase
 from django.test.testcases import SimpleTestCase
 from corehq.apps.users.dbaccessors import delete_all_users
@@ -7,9 +10,11 @@ from casexml.apps.case.tests.util import (
     delete_all_sync_logs,
 )
 from casexml.apps.case.mock import CaseBlock
-from casexml.apps.phone.restore import RestoreContent
+from casexml.apps.phone.restore import ComposedFile, RestoreContent
 from casexml.apps.phone.tests.utils import create_restore_user
 from casexml.apps.phone.utils import MockDevice
+from corehq.util.test_utils import flag_enabled
+from corehq.util.timer import TimingContext
 
 
 class OtaV3RestoreTest(TestCase):
@@ -40,6 +45,31 @@ class OtaV3RestoreTest(TestCase):
         ))
         self.assertIn(case_id, device.sync().cases)
 
+    def test_parallel_restore_matches_serial_restore(self):
+        restore_user = create_restore_user(domain=self.domain)
+        device = MockDevice(self.project, restore_user)
+        device.change_cases(CaseBlock(
+            create=True,
+            case_id='my-case-id',
+            user_id=restore_user.user_id,
+            owner_id=restore_user.user_id,
+            case_type='test-case-type',
+        ))
+        serial = device.restore()
+        with flag_enabled('PARALLEL_RESTORE_PROVIDERS'):
+            parallel = device.restore()
+
+        def without_restore_id(sync):
+            return sync.payload.replace(sync.restore_id.encode('utf-8'), b'restore-id')
+
+        self.assertEqual(without_restore_id(parallel), without_restore_id(serial))
+        serial_log = serial.get_log()
+        parallel_log = parallel.get_log()
+        self.assertEqual(parallel_log.case_ids_on_phone, {'my-case-id'})
+        self.assertEqual(parallel_log.case_ids_on_phone, serial_log.case_ids_on_phone)
+        self.assertEqual(parallel_log.owner_ids_on_phone, serial_log.owner_ids_on_phone)
+        self.assertEqual(parallel_log.log_format, serial_log.log_format)
+
 
 class TestRestoreContent(SimpleTestCase):
 
@@ -73,3 +103,64 @@ class TestRestoreContent(SimpleTestCase):
             response.append(body.encode('utf-8'))
             with response.get_fileobj() as fileobj:
                 self.assertEqual(expected, fileobj.read().decode('utf-8'))
+
+    def test_fileobj_outlives_content(self):
+        user = 'user1'
+        body = '<elem>data0</elem>'
+        expected = self._expected(user, body, items=None)
+        with RestoreContent(user, False) as response:
+            response.append(body.encode('utf-8'))
+            fileobj = response.get_fileobj()
+        with fileobj:
+            self.assertEqual(fileobj.seek(0, os.SEEK_END), len(expected))
+            fileobj.seek(0)
+            self.assertEqual(expected, fileobj.read().decode('utf-8'))
+
+    def test_splice(self):
+        user = 'user1'
+        expected = self._expected(user, '<a/><b/><c/>', items=4)
+        with RestoreContent(user, True) as response, RestoreContent(user, True) as part:
+            response.append(b'<a/>')
+            part.append(b'<b/>')
+            response.splice(part)
+            response.append(b'<c/>')
+            self.assertEqual(part.body_parts, [])
+            with response.get_fileobj() as fileobj:
+                self.assertEqual(expected, fileobj.read().decode('utf-8'))
+
+
+class TestTimingContextMerge(SimpleTestCase):
+
+    def test_add_context(self):
+        timing_context = TimingContext('restore')
+        with timing_context:
+            sub_context = TimingContext('provider')
+            with sub_context, sub_context('inner'):
+                pass
+            timing_context.add_context(sub_context)
+        names = [timer.full_name for timer in timing_context.to_list()]
+        self.assertEqual(names, ['restore', 'restore.provider', 'restore.provider.inner'])
+        self.assertTrue(all(timer.root is timing_context.root for timer in timing_context.to_list()))
+
+
+class TestComposedFile(SimpleTestCase):
+
+    def test_read_across_parts(self):
+        with ComposedFile([BytesIO(b'abc'), BytesIO(b''), BytesIO(b'defg')]) as fileobj:
+            self.assertEqual(fileobj.read(2), b'ab')
+            self.assertEqual(fileobj.read(3), b'cde')
+            self.assertEqual(fileobj.read(), b'fg')
+            self.assertEqual(fileobj.read(), b'')
+
+    def test_seek(self):
+        with ComposedFile([BytesIO(b'abc'), BytesIO(b'defg')]) as fileobj:
+            self.assertEqual(fileobj.seek(-2, os.SEEK_END), 5)
+            self.assertEqual(fileobj.read(), b'fg')
+            fileobj.seek(1)
+            self.assertEqual(fileobj.tell(), 1)
+            self.assertEqual(fileobj.read(3), b'bcd')
+
+    def test_close_closes_parts(self):
+        parts = [BytesIO(b'abc'), BytesIO(b'def')]
+        ComposedFile(parts).close()
+        self.assertTrue(all(part.closed for part in parts))
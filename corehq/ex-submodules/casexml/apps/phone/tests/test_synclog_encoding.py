@@ -0,0 +1,123 @@
+import uuid
+from datetime import datetime
+
+from django.test import SimpleTestCase, TestCase
+
+from casexml.apps.phone.models import (
+    IndexTree,
+    SimplifiedSyncLog,
+    SyncLogSQL,
+    get_properly_wrapped_sync_log,
+)
+from casexml.apps.phone.synclog_encoding import (
+    CASE_STATE_FIELDS,
+    CaseStateDecodeError,
+    decode_case_state,
+    encode_case_state,
+    merge_case_state,
+    split_case_state,
+)
+from corehq.util.test_utils import flag_enabled
+
+
+def _make_sync_log():
+    dashed = [str(uuid.uuid4()) for i in range(3)]
+    hexed = [uuid.uuid4().hex for i in range(3)]
+    return SimplifiedSyncLog(
+        domain='synclog-encoding',
+        user_id='user',
+        date=datetime(2022, 1, 1),
+        case_ids_on_phone=set(dashed + hexed + ['not-a-uuid', 'ÜNICÖDE']),
+        dependent_case_ids_on_phone={dashed[0], 'not-a-uuid'},
+        closed_cases={hexed[2]},
+        index_tree=IndexTree(indices={
+            dashed[1]: {'parent': dashed[0]},
+            hexed[0]: {'parent': 'not-a-uuid', 'mother': hexed[1]},
+        }),
+        extension_index_tree=IndexTree(indices={
+            'ÜNICÖDE': {'host': dashed[2]},
+        }),
+    )
+
+
+class TestSyncLogEncoding(SimpleTestCase):
+
+    def assert_state_equal(self, state, doc):
+        for field in ['case_ids_on_phone', 'dependent_case_ids_on_phone', 'closed_cases']:
+            self.assertEqual(set(state[field]), set(doc[field]), field)
+        for field in ['index_tree', 'extension_index_tree']:
+            self.assertEqual(state[field]['indices'], doc[field]['indices'], field)
+
+    def test_round_trip(self):
+        doc = _make_sync_log().to_json()
+        state = decode_case_state(encode_case_state(doc))
+        self.assert_state_equal(state, doc)
+
+    def test_empty_state(self):
+        doc = SimplifiedSyncLog(domain='synclog-encoding').to_json()
+        state = decode_case_state(encode_case_state(doc))
+        self.assert_state_equal(state, doc)
+
+    def test_split_and_merge(self):
+        doc = _make_sync_log().to_json()
+        slim_doc, case_state = split_case_state(doc)
+        for field in CASE_STATE_FIELDS:
+            self.assertNotIn(field, slim_doc)
+        self.assertEqual(slim_doc['user_id'], 'user')
+
+        synclog = SimplifiedSyncLog.wrap(merge_case_state(slim_doc, case_state))
+        original = SimplifiedSyncLog.wrap(doc)
+        self.assertEqual(synclog.case_ids_on_phone, original.case_ids_on_phone)
+        self.assertEqual(synclog.dependent_case_ids_on_phone, original.dependent_case_ids_on_phone)
+        self.assertEqual(synclog.closed_cases, original.closed_cases)
+        self.assertEqual(synclog.index_tree.indices, original.index_tree.indices)
+        self.assertEqual(synclog.extension_index_tree.indices, original.extension_index_tree.indices)
+
+    def test_encoding_is_smaller(self):
+        synclog = _make_sync_log()
+        synclog.case_ids_on_phone.update(uuid.uuid4().hex for i in range(1000))
+        doc = synclog.to_json()
+        slim_doc, case_state = split_case_state(doc)
+        json_size = sum(len(str(doc[field])) for field in CASE_STATE_FIELDS)
+        self.assertLess(len(case_state), json_size / 2)
+
+    def test_unencodable_state_is_not_split(self):
+        doc = _make_sync_log().to_json()
+        doc['index_tree']['indices']['abc'] = {'parent': None}
+        self.assertEqual(split_case_state(doc), (doc, None))
+
+    def test_decode_bad_data(self):
+        with self.assertRaises(CaseStateDecodeError):
+            decode_case_state(b'{"case_ids_on_phone": []}')
+        data = encode_case_state(_make_sync_log().to_json())
+        with self.assertRaises(CaseStateDecodeError):
+            decode_case_state(data[:-1])
+        with self.assertRaises(CaseStateDecodeError):
+            decode_case_state(data[:4] + b'\xff' + data[5:])
+
+
+class TestCompactSyncLogStorage(TestCase):
+
+    def tearDown(self):
+        SyncLogSQL.objects.all().delete()
+        super().tearDown()
+
+    def _save_and_reload(self, synclog):
+        synclog.save()
+        return synclog._synclog_sql, get_properly_wrapped_sync_log(synclog._id)
+
+    @flag_enabled('COMPACT_SYNCLOG_FORMAT')
+    def test_save_compact_format(self):
+        synclog = _make_sync_log()
+        synclog_sql, loaded = self._save_and_reload(synclog)
+        self.assertIsNotNone(synclog_sql.case_state)
+        self.assertNotIn('case_ids_on_phone', synclog_sql.doc)
+        self.assertEqual(loaded.case_ids_on_phone, synclog.case_ids_on_phone)
+        self.assertEqual(loaded.index_tree.indices, synclog.index_tree.indices)
+
+    def test_read_json_format(self):
+        synclog = _make_sync_log()
+        synclog_sql, loaded = self._save_and_reload(synclog)
+        self.assertIsNone(synclog_sql.case_state)
+        self.assertEqual(loaded.case_ids_on_phone, synclog.case_ids_on_phone)
+        self.assertEqual(loaded.index_tree.indices, synclog.index_tree.indices)
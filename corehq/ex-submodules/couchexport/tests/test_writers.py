@@ -1,10 +1,13 @@
 from codecs import BOM_UTF8
 from contextlib import closing
+import datetime
 import io
 import os
+import zipfile
 
 from django.test import SimpleTestCase
 from lxml import html, etree
+import pyarrow.parquet
 from unittest.mock import patch, Mock
 
 from couchexport.export import export_from_tables
@@ -12,6 +15,7 @@ from couchexport.models import Format
 from couchexport.writers import (
     MAX_XLS_COLUMNS,
     CsvFileWriter,
+    ParquetExportWriter,
     PythonDictWriter,
     XlsLengthException,
     ZippedExportWriter,
@@ -143,6 +147,87 @@ class Excel2003ExportWriterTests(SimpleTestCase):
         export_from_tables(tables, file_, format_)
 
 
+class ParquetExportWriterTests(SimpleTestCase):
+
+    def _write_table(self, headers, rows, column_types):
+        writer = ParquetExportWriter()
+        file_ = io.BytesIO()
+        writer.open([('table', [headers])], file_, table_titles={'table': 'Spam'},
+                    archive_basepath='export', column_types={'table': column_types})
+        writer.write([('table', rows)])
+        writer.close()
+        with zipfile.ZipFile(file_) as archive:
+            self.assertEqual(archive.namelist(), ['export/Spam.parquet'])
+            return pyarrow.parquet.ParquetFile(io.BytesIO(archive.read('export/Spam.parquet')))
+
+    def test_typed_columns(self):
+        parquet_file = self._write_table(
+            ['name', 'age', 'weight', 'dob', 'received_on', 'number'],
+            [
+                ['Alice', '42', '61.5', '1980-01-31', '2020-06-01T12:30:00.000000Z', '1'],
+                ['Bob', '---', '', '---', '2020-06-01 12:30:00', None],
+            ],
+            ['string', 'integer', 'decimal', 'date', 'datetime'],
+        )
+        table = parquet_file.read()
+        self.assertEqual(
+            [str(field.type) for field in table.schema],
+            ['string', 'int64', 'double', 'date32[day]', 'timestamp[us]', 'string'],
+        )
+        self.assertEqual(table.to_pylist(), [
+            {
+                'name': 'Alice',
+                'age': 42,
+                'weight': 61.5,
+                'dob': datetime.date(1980, 1, 31),
+                'received_on': datetime.datetime(2020, 6, 1, 12, 30),
+                'number': '1',
+            },
+            {
+                'name': 'Bob',
+                'age': None,
+                'weight': None,
+                'dob': None,
+                'received_on': datetime.datetime(2020, 6, 1, 12, 30),
+                'number': None,
+            },
+        ])
+
+    @patch('couchexport.writers.PARQUET_ROW_GROUP_VALUES', 4)
+    def test_row_groups(self):
+        parquet_file = self._write_table(
+            ['a', 'b'],
+            [[str(i), i] for i in range(5)],
+            None,
+        )
+        self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+        self.assertEqual(parquet_file.read().column('b').to_pylist(), ['0', '1', '2', '3', '4'])
+
+    def test_invalid_values_in_first_row_group(self):
+        parquet_file = self._write_table(
+            ['age', 'dob'],
+            [['42', '1980-01-31'], ['about 40', '---']],
+            ['integer', 'date'],
+        )
+        table = parquet_file.read()
+        self.assertEqual([str(field.type) for field in table.schema], ['string', 'date32[day]'])
+        self.assertEqual(table.column('age').to_pylist(), ['42', 'about 40'])
+
+    @patch('couchexport.writers.PARQUET_ROW_GROUP_VALUES', 4)
+    def test_invalid_values_in_later_row_group(self):
+        with self.assertLogs('couchexport.writers', level='WARNING') as logs:
+            parquet_file = self._write_table(
+                ['age', 'dob'],
+                [['42', '1980-01-31'], ['---', '---'], ['about 40', '---']],
+                ['integer', 'date'],
+            )
+        table = parquet_file.read()
+        self.assertEqual([str(field.type) for field in table.schema], ['int64', 'date32[day]'])
+        self.assertEqual(table.column('age').to_pylist(), [42, None, None])
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("{'age': 1}", logs.output[0])
+
+
 class HeaderNameTest(SimpleTestCase):
 
     def test_names_matching_case(self):
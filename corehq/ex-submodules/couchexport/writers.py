@@ -1,4 +1,6 @@
+import datetime
 import io
+import logging
 from codecs import BOM_UTF8
 import os
 import re
@@ -9,6 +11,8 @@ import json
 from collections import OrderedDict
 import openpyxl
 import math
+import pyarrow
+import pyarrow.parquet
 
 from django.template.loader import render_to_string, get_template
 from django.utils.functional import Promise
@@ -22,6 +26,12 @@ from couchexport.util import get_excel_format_value, get_legacy_excel_safe_value
 
 MAX_XLS_COLUMNS = 256
 
+logger = logging.getLogger(__name__)
+
+# Parquet row groups are sized to hold about this many values, so that tables
+# with many columns don't buffer too many rows in memory
+PARQUET_ROW_GROUP_VALUES = 1000000
+
 
 class XlsLengthException(Exception):
     pass
@@ -161,14 +171,18 @@ class ExportWriter(object):
     max_table_name_size = 500
     target_app = 'Excel'  # Where does this writer export to? Export button to say "Export to Excel"
 
-    def open(self, header_table, file, max_column_size=2000, table_titles=None, archive_basepath=''):
+    def open(self, header_table, file, max_column_size=2000, table_titles=None, archive_basepath='',
+             column_types=None):
         """
         Create any initial files, headings, etc necessary.
         :param header_table: tuple of one of the following formats
             tuple(sheet_name, [['col1header', 'col2header', ....]])
             tuple(sheet_name, [FormattedRow])
+        :param column_types: optional dict of table indices to a list of the
+            data types of the table's columns (see ``add_table``)
         """
         table_titles = table_titles or {}
+        column_types = column_types or {}
 
         self._isopen = True
         self.max_column_size = max_column_size
@@ -176,6 +190,8 @@ class ExportWriter(object):
         self.file = file
         self.archive_basepath = archive_basepath
 
+        self.column_types = {}
+
         self._init()
         self.table_name_generator = UniqueHeaderGenerator(
             self.max_table_name_size
@@ -184,10 +200,16 @@ class ExportWriter(object):
             self.add_table(
                 table_index,
                 list(table)[0],
-                table_title=table_titles.get(table_index)
+                table_title=table_titles.get(table_index),
+                column_types=column_types.get(table_index),
             )
 
-    def add_table(self, table_index, headers, table_title=None):
+    def add_table(self, table_index, headers, table_title=None, column_types=None):
+        """
+        :param column_types: optional list of the data types of the table's
+            columns ('string', 'integer', 'decimal', 'date', 'datetime' or None
+            if unknown). Only used by writers of typed formats.
+        """
         def _clean_name(name):
             if isinstance(name, bytes):
                 name = name.decode('utf8')
@@ -207,6 +229,7 @@ class ExportWriter(object):
             except AttributeError:
                 headers = [g.next_unique(header) for header in headers]
 
+        self.column_types[table_index] = column_types
         self._init_table(table_index, table_title_truncated)
         self.write_row(table_index, headers)
 
@@ -344,6 +367,179 @@ class CsvExportWriter(ZippedExportWriter):
     format = Format.CSV
 
 
+class ParquetFileWriter(ExportFileWriter):
+    """
+    Writes a table to a Parquet file. The first row written is the headers.
+
+    Rows are buffered and written in row groups. Columns with a known data
+    type are written as typed Parquet columns, and missing values (e.g. the
+    '---' placeholder) are written as nulls. The column types are decided
+    when the first row group is written: a typed column with values that
+    can't be converted to its type is written as strings instead. In later
+    row groups such values are written as nulls, and are counted in
+    ``invalid_value_counts`` and logged. All other columns are strings.
+    """
+    column_types = None
+
+    def _open(self):
+        self._parquet_writer = None
+        self._headers = None
+        self._rows = []
+        self.invalid_value_counts = {}
+
+    def write_row(self, row):
+        if self._headers is None:
+            self._begin_table(row)
+            return
+        self._rows.append(row)
+        if len(self._rows) >= self._row_group_size:
+            self._write_row_group()
+
+    def _begin_table(self, headers):
+        self._headers = [
+            header.decode('utf-8') if isinstance(header, bytes) else str(header)
+            for header in headers
+        ]
+        column_types = list(self.column_types or [])
+        column_types += [None] * (len(headers) - len(column_types))
+        self._types = []
+        self._converters = []
+        for column_type in column_types:
+            type_alias, converter = _PARQUET_TYPES.get(column_type, _PARQUET_TYPES[None])
+            self._types.append(type_alias)
+            self._converters.append(converter)
+        self._row_group_size = max(1, PARQUET_ROW_GROUP_VALUES // max(len(headers), 1))
+
+    def _write_row_group(self):
+        columns = [
+            self._convert_column(index, [row[index] for row in self._rows])
+            for index in range(len(self._headers))
+        ]
+        if self._parquet_writer is None:
+            self._schema = pyarrow.schema([
+                (header, pyarrow.type_for_alias(type_alias))
+                for header, type_alias in zip(self._headers, self._types)
+            ])
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(self._file, self._schema)
+        arrays = [pyarrow.array(values, type=field.type) for values, field in zip(columns, self._schema)]
+        self._parquet_writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self._schema))
+        self._rows = []
+
+    def _convert_column(self, index, values):
+        convert = self._converters[index]
+        converted = []
+        invalid_count = 0
+        for value in values:
+            try:
+                converted.append(convert(value))
+            except (TypeError, ValueError):
+                converted.append(None)
+                invalid_count += 1
+        if not invalid_count:
+            return converted
+        if self._parquet_writer is None:
+            # The schema has not been written yet
+            self._types[index] = _PARQUET_TYPES[None][0]
+            self._converters[index] = _PARQUET_TYPES[None][1]
+            return [_to_parquet_string(value) for value in values]
+        header = self._headers[index]
+        self.invalid_value_counts[header] = self.invalid_value_counts.get(header, 0) + invalid_count
+        return converted
+
+    def _end_file(self):
+        if self._headers is None:
+            return
+        if self._rows or self._parquet_writer is None:
+            self._write_row_group()
+        self._parquet_writer.close()
+        if self.invalid_value_counts:
+            logger.warning(
+                "Values of the wrong type were written as nulls in Parquet table %r: %r",
+                self.name,
+                self.invalid_value_counts,
+            )
+
+
+# Values written as nulls in typed Parquet columns
+PARQUET_MISSING_VALUES = (None, '', '---')
+
+
+def _to_parquet_string(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return str(value)
+
+
+def _to_parquet_integer(value):
+    if value in PARQUET_MISSING_VALUES:
+        return None
+    if isinstance(value, str):
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or not -2 ** 63 <= value < 2 ** 63:
+        raise ValueError(f"{value!r} is not a 64-bit integer")
+    return value
+
+
+def _to_parquet_decimal(value):
+    if value in PARQUET_MISSING_VALUES:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{value!r} is not a decimal")
+    return float(value)
+
+
+def _to_parquet_datetime(value):
+    if value in PARQUET_MISSING_VALUES:
+        return None
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    elif isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    if not isinstance(value, datetime.datetime):
+        raise ValueError(f"{value!r} is not a datetime")
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _to_parquet_date(value):
+    value = _to_parquet_datetime(value)
+    return value.date() if value is not None else None
+
+
+# data types of export columns to the Parquet column type and a function
+# to convert values to it
+_PARQUET_TYPES = {
+    None: ('string', _to_parquet_string),
+    'string': ('string', _to_parquet_string),
+    'integer': ('int64', _to_parquet_integer),
+    'small_integer': ('int64', _to_parquet_integer),
+    'decimal': ('double', _to_parquet_decimal),
+    'date': ('date32', _to_parquet_date),
+    'datetime': ('timestamp[us]', _to_parquet_datetime),
+}
+
+
+class ParquetExportWriter(ZippedExportWriter):
+    """
+    Writer that creates a zip file containing a Parquet file for each table.
+    """
+    format = Format.PARQUET
+    writer_class = ParquetFileWriter
+    table_file_extension = ".parquet"
+
+    def _init_table(self, table_index, table_title):
+        super(ParquetExportWriter, self)._init_table(table_index, table_title)
+        self.tables[table_index].column_types = self.column_types.get(table_index)
+
+    def _write_row(self, sheet_index, row):
+        self.tables[sheet_index].write_row(list(row))
+
+
 class UnzippedCsvExportWriter(OnDiskExportWriter):
     """
     Serve the first table as a csv
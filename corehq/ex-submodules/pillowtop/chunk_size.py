@@ -0,0 +1,71 @@
+from corehq.util.metrics import metrics_gauge
+from corehq.util.metrics.const import MPM_MAX
+
+# seconds after which a chunk that is not full is processed anyway
+DEFAULT_MAX_WAIT_SECONDS = 30
+
+
+class AdaptiveChunkSize(object):
+    """
+    Chooses the chunk size of a batch pillow from how long chunks take to process.
+
+    Full chunks mean that the pillow is behind on its change feed. The chunk
+    size then grows, up to the size that is expected to take ``target_seconds``
+    to process, so that a backlog is worked through in big chunks. Chunks that
+    take longer than ``target_seconds`` shrink the size. When the pillow is
+    caught up chunks are processed after at most ``max_wait_seconds``.
+
+    Configure with ``settings.PILLOW_ADAPTIVE_CHUNK_SIZES``, a dict of pillow
+    names to keyword arguments for this class.
+    """
+
+    def __init__(self, pillow_name, initial_size, min_size=1, max_size=1000, target_seconds=10,
+                 max_wait_seconds=DEFAULT_MAX_WAIT_SECONDS, growth_factor=2):
+        """
+        :param target_seconds: The processing time of a chunk to aim for.
+        Lower values mean changes are processed sooner, higher values mean
+        more changes are processed per second during backlogs.
+        :param growth_factor: The most the chunk size can grow by after one chunk.
+        """
+        self.pillow_name = pillow_name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.growth_factor = growth_factor
+        self.size = self._bounded(initial_size)
+        self._seconds_per_change = None
+
+    def record(self, chunk_length, seconds, full):
+        """
+        Record the processing time of a chunk and update the chunk size
+
+        :param chunk_length: The number of changes in the chunk.
+        :param seconds: How long the chunk took to process.
+        :param full: True if the chunk was processed because it reached the
+        chunk size rather than because of ``max_wait_seconds``.
+        """
+        if not chunk_length:
+            return
+        seconds_per_change = seconds / chunk_length
+        if self._seconds_per_change is None:
+            self._seconds_per_change = seconds_per_change
+        else:
+            # smooth out the odd slow or fast chunk
+            self._seconds_per_change = (self._seconds_per_change + seconds_per_change) / 2
+
+        if self._seconds_per_change:
+            target_size = int(self.target_seconds / self._seconds_per_change)
+        else:
+            target_size = self.max_size
+        if target_size < self.size:
+            self.size = self._bounded(target_size)
+        elif full:
+            self.size = self._bounded(min(target_size, int(self.size * self.growth_factor)))
+
+        metrics_gauge('commcare.change_feed.chunk_size', self.size, tags={
+            'pillow_name': self.pillow_name,
+        }, multiprocess_mode=MPM_MAX)
+
+    def _bounded(self, size):
+        return max(self.min_size, min(self.max_size, size))
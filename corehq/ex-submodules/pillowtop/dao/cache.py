@@ -0,0 +1,69 @@
+"""
+Cache of documents fetched for changes, shared by pillows that process
+the same changes (see ``settings.PILLOW_DOCUMENT_CACHE``).
+
+Documents are cached per version: the document revision if the change has
+one, or else the time the change was first published. A cached document
+is therefore never older than the change it was fetched for.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from corehq.util.metrics import metrics_counter
+
+
+def get_document_cache():
+    alias = getattr(settings, 'PILLOW_DOCUMENT_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def get_cached_documents(changes):
+    """
+    :returns: A dict of change ids to cached documents of the changes
+    """
+    cache = get_document_cache()
+    if cache is None:
+        return {}
+    keys_by_id = _get_cache_keys(changes)
+    if not keys_by_id:
+        return {}
+    docs_by_key = cache.get_many(list(keys_by_id.values()))
+    docs_by_id = {
+        change_id: docs_by_key[key]
+        for change_id, key in keys_by_id.items()
+        if key in docs_by_key
+    }
+    _record_metrics(hits=len(docs_by_id), misses=len(keys_by_id) - len(docs_by_id))
+    return docs_by_id
+
+
+def cache_documents(changes, docs_by_id):
+    cache = get_document_cache()
+    if cache is None:
+        return
+    keys_by_id = _get_cache_keys(changes)
+    cache.set_many(
+        {key: docs_by_id[change_id] for change_id, key in keys_by_id.items() if change_id in docs_by_id},
+        timeout=settings.PILLOW_DOCUMENT_CACHE_TIMEOUT,
+    )
+
+
+def _get_cache_keys(changes):
+    keys_by_id = {}
+    for change in changes:
+        metadata = change.metadata
+        if metadata is None:
+            continue
+        version = metadata.document_rev or metadata.original_publication_datetime.isoformat()
+        key = '{}:{}:{}'.format(metadata.data_source_name, change.id, version)
+        keys_by_id[change.id] = 'pillow-doc-{}'.format(hashlib.md5(key.encode('utf-8')).hexdigest())
+    return keys_by_id
+
+
+def _record_metrics(hits, misses):
+    if hits:
+        metrics_counter('commcare.change_feed.document_cache', hits, tags={'result': 'hit'})
+    if misses:
+        metrics_counter('commcare.change_feed.document_cache', misses, tags={'result': 'miss'})
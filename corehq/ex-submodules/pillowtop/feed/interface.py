@@ -4,6 +4,7 @@ from abc import ABCMeta, abstractmethod
 from corehq.sql_db.util import handle_connection_failure, get_all_db_aliases
 from jsonobject import DefaultProperty
 from dimagi.ext import jsonobject
+from pillowtop.dao.cache import cache_documents, get_cached_documents
 from pillowtop.dao.exceptions import DocumentNotFoundError
 
 
@@ -82,8 +83,13 @@ class Change(object):
     @handle_connection_failure(get_db_aliases=get_all_db_aliases)
     def get_document(self):
         if self.should_fetch_document():
+            cached_document = get_cached_documents([self]).get(self.id)
+            if cached_document is not None:
+                self.document = cached_document
+                return self.document
             try:
                 self.document = self.document_store.get_document(self.id)
+                cache_documents([self], {self.id: self.document})
             except DocumentNotFoundError as e:
                 self.document = None
                 self._document_checked = True  # set this flag to avoid multiple redundant lookups
@@ -146,6 +152,8 @@ class ChangeFeed(metaclass=ABCMeta):
     """
 
     sequence_format = 'text'
+    # true if changes come from partitions that can be processed independently
+    supports_partitions = False
 
     @abstractmethod
     def iter_changes(self, since, forever):
@@ -154,6 +162,21 @@ class ChangeFeed(metaclass=ABCMeta):
         """
         pass
 
+    def defer_processed_offsets(self):
+        """
+        Only treat changes as processed once they are passed to ``mark_processed``
+        rather than when they are read. For pillows that do not finish processing
+        changes in the order they are read.
+        """
+        raise NotImplementedError
+
+    def mark_processed(self, change):
+        """
+        Record that a change and all changes read before it from the same
+        partition have been processed.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def get_latest_offsets(self):
         """
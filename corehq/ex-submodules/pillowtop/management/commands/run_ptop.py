@@ -78,6 +78,23 @@ class Command(BaseCommand):
             help="The batch size for this pillow. Some pillows process changes in bulk, "
             "setting this value to 1 will process each change as it comes in.",
         )
+        parser.add_argument(
+            '--partition-workers',
+            action='store',
+            dest='partition_workers',
+            default=0,
+            type=int,
+            help="Process chunks of different Kafka partitions concurrently with this many threads. "
+            "Only applies to pillows with batch processors.",
+        )
+        parser.add_argument(
+            '--pipelined',
+            action='store_true',
+            dest='pipelined',
+            default=False,
+            help="Prepare each chunk while the previous chunk is loaded. "
+            "Only applies to pillows with processors that support pipelining.",
+        )
         parser.add_argument(
             '--dedicated-migration-process',
             action='store_true',
@@ -102,6 +119,8 @@ class Command(BaseCommand):
         num_processes = options['num_processes']
         process_number = options['process_number']
         processor_chunk_size = options['processor_chunk_size']
+        partition_workers = options['partition_workers']
+        pipelined = options['pipelined']
         dedicated_migration_process = options['dedicated_migration_process']
         exclude_ucrs = options['exclude_ucrs']
         assert 0 <= process_number < num_processes
@@ -134,6 +153,10 @@ class Command(BaseCommand):
             pillow = get_pillow_by_name(pillow_name, num_processes=num_processes, process_num=process_number,
             processor_chunk_size=processor_chunk_size, dedicated_migration_process=dedicated_migration_process,
             **other_options)
+            if partition_workers:
+                pillow.partition_workers = partition_workers
+            if pipelined:
+                pillow.pipelined = pipelined
             start_pillow(pillow)
             sys.exit()
         elif list_checkpoints:
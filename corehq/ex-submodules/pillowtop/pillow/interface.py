@@ -1,9 +1,11 @@
 import time
 from abc import ABCMeta, abstractproperty, abstractmethod
 from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from django.conf import settings
+from django.db import close_old_connections
 from memoized import memoized
 
 import sys
@@ -15,6 +17,7 @@ from corehq.util.metrics.const import MPM_MAX
 from corehq.util.timer import TimingContext
 from dimagi.utils.logging import notify_exception
 from kafka.common import TopicPartition
+from pillowtop.chunk_size import DEFAULT_MAX_WAIT_SECONDS, AdaptiveChunkSize
 from pillowtop.const import CHECKPOINT_MIN_WAIT
 from pillowtop.dao.exceptions import DocumentMissingError
 from pillowtop.utils import force_seq_int
@@ -55,6 +58,13 @@ class PillowBase(metaclass=ABCMeta):
     retry_errors = True
     # this will be the batch size for processors that support batch processing
     processor_chunk_size = 0
+    # number of threads processing chunks of different partitions concurrently.
+    # Only used with batch processors and change feeds that support partitions,
+    # and if all processors support partition workers.
+    partition_workers = 0
+    # set to true to prepare each chunk while the previous chunk is loaded.
+    # Only used with batch processors that support pipelining.
+    pipelined = False
 
     @abstractproperty
     def pillow_id(self):
@@ -139,6 +149,44 @@ class PillowBase(metaclass=ABCMeta):
         else:
             return self.processors
 
+    @property
+    @memoized
+    def pipelined_processors(self):
+        if self.pipelined:
+            return [processor for processor in self.batch_processors if processor.supports_pipelining]
+        else:
+            return []
+
+    @property
+    def processes_partitions_concurrently(self):
+        return bool(
+            self.partition_workers
+            and self.batch_processors
+            and all(processor.supports_partition_workers for processor in self.processors)
+            and self.get_change_feed().supports_partitions
+        )
+
+    @property
+    @memoized
+    def chunk_size_controller(self):
+        options = settings.PILLOW_ADAPTIVE_CHUNK_SIZES.get(self.get_name())
+        if options is None or not self.processor_chunk_size:
+            return None
+        return AdaptiveChunkSize(self.get_name(), self.processor_chunk_size, **options)
+
+    @property
+    def chunk_size(self):
+        """The number of changes to process at once with batch processors"""
+        if self.chunk_size_controller:
+            return self.chunk_size_controller.size
+        return self.processor_chunk_size
+
+    @property
+    def max_chunk_wait_seconds(self):
+        if self.chunk_size_controller:
+            return self.chunk_size_controller.max_wait_seconds
+        return DEFAULT_MAX_WAIT_SECONDS
+
     def process_changes(self, since, forever):
         """
         Process changes on all the pillow processors.
@@ -147,13 +195,17 @@ class PillowBase(metaclass=ABCMeta):
             batch processors. If there are batch processors, checkpoint is updated
             at the end of the batch, otherwise is updated for every change.
         """
+        if self.processes_partitions_concurrently:
+            return self._process_changes_by_partition(since, forever)
+        if self.pipelined_processors:
+            return self._process_changes_pipelined(since, forever)
+
         context = PillowRuntimeContext(changes_seen=0)
-        min_wait_seconds = 30
 
         def process_offset_chunk(chunk, context):
             if not chunk:
                 return
-            self._batch_process_with_error_handling(chunk)
+            self._process_chunk(chunk)
             self._update_checkpoint(chunk[-1], context)
 
         # keep track of chunk for batch processors
@@ -168,11 +220,12 @@ class PillowBase(metaclass=ABCMeta):
                         # Queue and process in chunks for both batch
                         #   and serial processors
                         changes_chunk.append(change)
-                        chunk_full = len(changes_chunk) == self.processor_chunk_size
-                        time_elapsed = (datetime.utcnow() - last_process_time).seconds > min_wait_seconds
+                        chunk_full = len(changes_chunk) >= self.chunk_size
+                        time_elapsed = (
+                            (datetime.utcnow() - last_process_time).seconds > self.max_chunk_wait_seconds)
                         if chunk_full or time_elapsed:
                             last_process_time = datetime.utcnow()
-                            self._batch_process_with_error_handling(changes_chunk)
+                            self._process_chunk(changes_chunk, full=chunk_full)
                             # update checkpoint for just the latest change
                             self._update_checkpoint(changes_chunk[-1], context)
                             # reset for next chunk
@@ -192,7 +245,178 @@ class PillowBase(metaclass=ABCMeta):
             if context.changes_seen and change:
                 self._update_checkpoint(change, context)
 
-    def _batch_process_with_error_handling(self, changes_chunk):
+    def _process_changes_by_partition(self, since, forever):
+        """
+        Like ``process_changes`` with batch processors, but chunks of changes
+        are collected per partition and chunks of different partitions are
+        processed concurrently by ``partition_workers`` threads.
+
+            Chunks of one partition are processed in order. The checkpoint
+            of a partition only moves past a change once its chunk has
+            been processed.
+        """
+        change_feed = self.get_change_feed()
+        change_feed.defer_processed_offsets()
+        context = PillowRuntimeContext(changes_seen=0)
+        chunks_by_partition = defaultdict(list)
+        in_progress = {}  # partition -> (future, chunk, full)
+        last_process_time = datetime.utcnow()
+        checkpoint_reset = False
+
+        def complete(partition):
+            future, chunk, full = in_progress.pop(partition)
+            processing_time = future.result()
+            if self.chunk_size_controller:
+                self.chunk_size_controller.record(len(chunk), processing_time, full)
+            change_feed.mark_processed(chunk[-1])
+            self._update_checkpoint(chunk[-1], context)
+
+        def submit(partition, executor, full=False):
+            chunk = chunks_by_partition.pop(partition)
+            if partition in in_progress:
+                complete(partition)
+            future = executor.submit(self._process_partition_chunk, chunk)
+            in_progress[partition] = (future, chunk, full)
+
+        def submit_all(executor):
+            for partition in list(chunks_by_partition):
+                submit(partition, executor)
+
+        def complete_all(done_only=False):
+            for partition, (future, chunk, full) in list(in_progress.items()):
+                if not done_only or future.done():
+                    complete(partition)
+
+        change = None
+        with ThreadPoolExecutor(max_workers=self.partition_workers) as executor:
+            try:
+                for change in change_feed.iter_changes(since=since or None, forever=forever):
+                    context.changes_seen += 1
+                    if change:
+                        partition = (change.topic, change.partition)
+                        chunks_by_partition[partition].append(change)
+                        if len(chunks_by_partition[partition]) >= self.chunk_size:
+                            submit(partition, executor, full=True)
+                        if (datetime.utcnow() - last_process_time).seconds > self.max_chunk_wait_seconds:
+                            last_process_time = datetime.utcnow()
+                            submit_all(executor)
+                        complete_all(done_only=True)
+                    else:
+                        self._update_checkpoint(None, None)
+            except PillowtopCheckpointReset:
+                checkpoint_reset = True
+            submit_all(executor)
+            complete_all()
+
+        if checkpoint_reset:
+            self.process_changes(since=self.get_last_checkpoint_sequence(), forever=forever)
+        elif forever:
+            if context.changes_seen and change:
+                self._update_checkpoint(change, context)
+
+    def _process_changes_pipelined(self, since, forever):
+        """
+        Like ``process_changes`` with batch processors, but chunks are prepared
+        by pipelined processors (e.g. documents are fetched) while the previous
+        chunk is loaded by a separate thread.
+
+            Chunks are loaded in order. The checkpoint only moves past a chunk
+            once it has been loaded.
+        """
+        context = PillowRuntimeContext(changes_seen=0)
+        changes_chunk = []
+        loading = []  # at most one (future, chunk, full, prepare_time)
+        last_process_time = datetime.utcnow()
+        checkpoint_reset = False
+
+        def finish_loading():
+            if loading:
+                future, chunk, full, prepare_time = loading.pop()
+                load_time = future.result()
+                if self.chunk_size_controller:
+                    self.chunk_size_controller.record(len(chunk), prepare_time + load_time, full)
+                self._update_checkpoint(chunk[-1], context)
+
+        def submit(chunk, executor, full=False):
+            timer = TimingContext()
+            with timer:
+                chunk = self._deduplicate_changes(chunk)
+                prepared = self._prepare_chunk(chunk)
+            finish_loading()
+            future = executor.submit(self._load_prepared_chunk, chunk, prepared)
+            loading.append((future, chunk, full, timer.duration))
+
+        change = None
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            try:
+                for change in self.get_change_feed().iter_changes(since=since or None, forever=forever):
+                    context.changes_seen += 1
+                    if change:
+                        changes_chunk.append(change)
+                        chunk_full = len(changes_chunk) >= self.chunk_size
+                        time_elapsed = (
+                            (datetime.utcnow() - last_process_time).seconds > self.max_chunk_wait_seconds)
+                        if chunk_full or time_elapsed:
+                            last_process_time = datetime.utcnow()
+                            submit(changes_chunk, executor, full=chunk_full)
+                            changes_chunk = []
+                    else:
+                        self._update_checkpoint(None, None)
+            except PillowtopCheckpointReset:
+                checkpoint_reset = True
+            if changes_chunk:
+                submit(changes_chunk, executor)
+            finish_loading()
+
+        if checkpoint_reset:
+            self.process_changes(since=self.get_last_checkpoint_sequence(), forever=forever)
+        elif forever:
+            if context.changes_seen and change:
+                self._update_checkpoint(change, context)
+
+    def _prepare_chunk(self, changes_chunk):
+        """
+        :returns: A dict of pipelined processors to their prepared chunk, or to
+        the exception raised preparing it.
+        """
+        prepared = {}
+        for processor in self.pipelined_processors:
+            try:
+                prepared[processor] = processor.prepare_changes_chunk(changes_chunk)
+            except Exception as ex:
+                prepared[processor] = ex
+        return prepared
+
+    def _load_prepared_chunk(self, changes_chunk, prepared):
+        # runs in the loading thread, which has its own database connections
+        close_old_connections()
+        timer = TimingContext()
+        try:
+            with timer:
+                self._batch_process_with_error_handling(changes_chunk, prepared)
+        finally:
+            close_old_connections()
+        return timer.duration
+
+    def _process_partition_chunk(self, changes_chunk):
+        # runs in a worker thread, which has its own database connections
+        close_old_connections()
+        timer = TimingContext()
+        try:
+            with timer:
+                self._batch_process_with_error_handling(changes_chunk)
+        finally:
+            close_old_connections()
+        return timer.duration
+
+    def _process_chunk(self, changes_chunk, full=False):
+        timer = TimingContext()
+        with timer:
+            self._batch_process_with_error_handling(changes_chunk)
+        if self.chunk_size_controller:
+            self.chunk_size_controller.record(len(changes_chunk), timer.duration, full)
+
+    def _batch_process_with_error_handling(self, changes_chunk, prepared=None):
         """
         Process given chunk in batch mode first on batch-processors
             and only latter on serial processors one by one, so that
@@ -203,6 +427,8 @@ class PillowBase(metaclass=ABCMeta):
 
             If there is an exception in chunked processing, falls back
             to serial processing.
+
+            ``prepared`` is the result of ``_prepare_chunk`` for pipelined pillows.
         """
         processing_time = 0
 
@@ -218,7 +444,13 @@ class PillowBase(metaclass=ABCMeta):
             timer = TimingContext()
             with timer:
                 try:
-                    retry_changes, change_exceptions = processor.process_changes_chunk(changes_chunk)
+                    if prepared and processor in prepared:
+                        prepared_chunk = prepared[processor]
+                        if isinstance(prepared_chunk, Exception):
+                            raise prepared_chunk
+                        retry_changes, change_exceptions = processor.load_changes_chunk(prepared_chunk)
+                    else:
+                        retry_changes, change_exceptions = processor.process_changes_chunk(changes_chunk)
                 except Exception as ex:
                     notify_exception(
                         None,
@@ -429,11 +661,13 @@ class ConstructedPillow(PillowBase):
 
     def __init__(self, name, checkpoint, change_feed, processor, process_num=0,
                  change_processed_event_handler=None, processor_chunk_size=0,
-                 is_dedicated_migration_process=False):
+                 is_dedicated_migration_process=False, partition_workers=0, pipelined=False):
         self._name = name
         self._checkpoint = checkpoint
         self._change_feed = change_feed
         self.processor_chunk_size = processor_chunk_size
+        self.partition_workers = partition_workers
+        self.pipelined = pipelined
         if isinstance(processor, list):
             self.processors = processor
         else:
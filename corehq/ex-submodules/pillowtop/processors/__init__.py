@@ -1,3 +1,3 @@
-from .interface import PillowProcessor, BulkPillowProcessor
+from .interface import PillowProcessor, BulkPillowProcessor, PipelinedBulkPillowProcessor
 from .sample import NoopProcessor, LoggingProcessor
 from .elastic import ElasticProcessor
@@ -23,7 +23,7 @@ from corehq.util.es.elasticsearch import (
 )
 from corehq.util.metrics import metrics_histogram_timer
 
-from .interface import BulkPillowProcessor, PillowProcessor
+from .interface import PillowProcessor, PipelinedBulkPillowProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +52,8 @@ class ElasticProcessor(PillowProcessor):
     Writes to:
       - ES
     """
+    # changes are processed without state shared between calls
+    supports_partition_workers = True
 
     def __init__(self, adapter, doc_filter_fn=None, change_filter_fn=None):
         self.adapter = adapter
@@ -127,10 +129,12 @@ class ElasticProcessor(PillowProcessor):
             })
 
 
-class BulkElasticProcessor(ElasticProcessor, BulkPillowProcessor):
+class BulkElasticProcessor(ElasticProcessor, PipelinedBulkPillowProcessor):
     """Generic processor to transform documents and insert into ES.
 
     Processes one "chunk" of changes at a time (chunk size specified by pillow).
+    Pipelined pillows extract and transform a chunk while the previous chunk
+    is loaded.
 
     Reads from:
       - Usually Couch
@@ -140,7 +144,7 @@ class BulkElasticProcessor(ElasticProcessor, BulkPillowProcessor):
       - ES
     """
 
-    def process_changes_chunk(self, changes_chunk):
+    def prepare_changes_chunk(self, changes_chunk):
         logger.info('Processing chunk of changes in BulkElasticProcessor')
         if self.change_filter_fn:
             changes_chunk = [
@@ -164,7 +168,10 @@ class BulkElasticProcessor(ElasticProcessor, BulkPillowProcessor):
                 error_collector,
             )
             error_changes = error_collector.errors
+        return retry_changes, error_changes, changes_to_process, es_actions
 
+    def load_changes_chunk(self, prepared):
+        retry_changes, error_changes, changes_to_process, es_actions = prepared
         try:
             with self._datadog_timing('bulk_load'):
                 _, errors = self.adapter.bulk(
@@ -3,6 +3,10 @@ from abc import ABCMeta, abstractmethod
 
 class PillowProcessor(metaclass=ABCMeta):
     supports_batch_processing = False
+    supports_pipelining = False
+    # set to true if changes of different partitions can be processed by
+    #   the same processor in concurrent threads (see partition_workers)
+    supports_partition_workers = False
 
     @abstractmethod
     def process_change(self, change):
@@ -32,3 +36,32 @@ class BulkPillowProcessor(PillowProcessor):
             reprocessed but for which exceptions are to be handled by handle_pillow_error
         """
         pass
+
+
+class PipelinedBulkPillowProcessor(BulkPillowProcessor):
+    # Processors that split processing a chunk in two stages. A pipelined
+    #   pillow prepares a chunk while the previous chunk is loaded.
+
+    supports_pipelining = True
+
+    def process_changes_chunk(self, changes_chunk):
+        return self.load_changes_chunk(self.prepare_changes_chunk(changes_chunk))
+
+    @abstractmethod
+    def prepare_changes_chunk(self, changes_chunk):
+        """
+        Should do the work for given changes_chunk that does not depend on
+            previous chunks having been loaded, e.g. fetching documents.
+
+            Returns the state to be passed to load_changes_chunk.
+        """
+        pass
+
+    @abstractmethod
+    def load_changes_chunk(self, prepared):
+        """
+        Should finish processing a chunk prepared by prepare_changes_chunk.
+
+            Must return the same as process_changes_chunk.
+        """
+        pass
@@ -1,9 +1,13 @@
 import uuid
-from django.test import SimpleTestCase
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
 from pillowtop.dao.mock import MockDocumentStore
 from pillowtop.feed.couch import change_from_couch_row
-from pillowtop.feed.interface import Change
+from pillowtop.feed.interface import Change, ChangeMeta
 from pillowtop.feed.mock import RandomChangeFeed, MockChangeFeed
+from pillowtop.utils import bulk_fetch_changes_docs
 from six.moves import range
 
 
@@ -137,3 +141,51 @@ class TestRandomChangeFeed(SimpleTestCase):
         changes = feed.iter_changes(0)
         for change in changes:
             self.assertEqual(val, change)
+
+
+@override_settings(PILLOW_DOCUMENT_CACHE='locmem')
+class TestDocumentCache(SimpleTestCase):
+
+    def setUp(self):
+        caches['locmem'].clear()
+        self.doc_id = uuid.uuid4().hex
+        self.doc = {'_id': self.doc_id, '_rev': '1-abc', 'random_property': uuid.uuid4().hex}
+        self.dao = MockDocumentStore({self.doc_id: self.doc})
+
+    def _change(self, rev='1-abc'):
+        metadata = ChangeMeta(
+            document_id=self.doc_id,
+            document_rev=rev,
+            data_source_type='couch',
+            data_source_name='test',
+        )
+        return Change(id=self.doc_id, sequence_id='', metadata=metadata, document_store=self.dao)
+
+    def test_get_document_is_cached(self):
+        self.assertEqual(self._change().get_document(), self.doc)
+        with patch.object(self.dao, 'get_document') as get_document:
+            self.assertEqual(self._change().get_document(), self.doc)
+        get_document.assert_not_called()
+
+    def test_other_version_is_not_cached(self):
+        self._change().get_document()
+        with patch.object(self.dao, 'get_document', return_value=self.doc) as get_document:
+            self._change(rev='2-def').get_document()
+        get_document.assert_called_once_with(self.doc_id)
+
+    def test_bulk_fetch_is_cached(self):
+        bulk_fetch_changes_docs([self._change()])
+        with patch.object(self.dao, 'iter_documents', return_value=[]) as iter_documents:
+            change = self._change()
+            bad_changes, docs = bulk_fetch_changes_docs([change])
+        iter_documents.assert_called_once_with([])
+        self.assertEqual(bad_changes, set())
+        self.assertEqual(docs, [self.doc])
+        self.assertEqual(change.get_document(), self.doc)
+
+    @override_settings(PILLOW_DOCUMENT_CACHE=None)
+    def test_disabled(self):
+        self._change().get_document()
+        with patch.object(self.dao, 'get_document', return_value=self.doc) as get_document:
+            self._change().get_document()
+        get_document.assert_called_once_with(self.doc_id)
@@ -0,0 +1,57 @@
+from django.test import SimpleTestCase, override_settings
+
+from pillowtop.chunk_size import DEFAULT_MAX_WAIT_SECONDS, AdaptiveChunkSize
+from pillowtop.tests.utils import make_fake_constructed_pillow
+
+
+class AdaptiveChunkSizeTest(SimpleTestCase):
+
+    def test_grows_while_behind(self):
+        chunk_size = AdaptiveChunkSize('pillow', 10, target_seconds=10)
+        sizes = []
+        for i in range(5):
+            chunk_size.record(chunk_size.size, chunk_size.size * 0.01, full=True)
+            sizes.append(chunk_size.size)
+        self.assertEqual(sizes, [20, 40, 80, 160, 320])
+
+    def test_does_not_grow_past_target(self):
+        chunk_size = AdaptiveChunkSize('pillow', 10, target_seconds=1)
+        for i in range(5):
+            chunk_size.record(chunk_size.size, chunk_size.size * 0.02, full=True)
+        self.assertEqual(chunk_size.size, 50)
+
+    def test_does_not_grow_when_caught_up(self):
+        chunk_size = AdaptiveChunkSize('pillow', 10)
+        chunk_size.record(3, 0.03, full=False)
+        self.assertEqual(chunk_size.size, 10)
+
+    def test_shrinks_when_slow(self):
+        chunk_size = AdaptiveChunkSize('pillow', 100, target_seconds=10)
+        chunk_size.record(100, 50, full=True)
+        self.assertEqual(chunk_size.size, 20)
+
+    def test_bounds(self):
+        chunk_size = AdaptiveChunkSize('pillow', 10, min_size=5, max_size=15)
+        chunk_size.record(10, 0, full=True)
+        self.assertEqual(chunk_size.size, 15)
+        chunk_size.record(15, 1000, full=True)
+        self.assertEqual(chunk_size.size, 5)
+
+
+class PillowChunkSizeTest(SimpleTestCase):
+
+    def test_fixed_chunk_size(self):
+        pillow = make_fake_constructed_pillow('fake-chunk-size', 'fake-chunk-size')
+        pillow.processor_chunk_size = 10
+        self.assertIsNone(pillow.chunk_size_controller)
+        self.assertEqual(pillow.chunk_size, 10)
+        self.assertEqual(pillow.max_chunk_wait_seconds, DEFAULT_MAX_WAIT_SECONDS)
+
+    @override_settings(PILLOW_ADAPTIVE_CHUNK_SIZES={'fake-chunk-size': {'max_wait_seconds': 5}})
+    def test_adaptive_chunk_size(self):
+        pillow = make_fake_constructed_pillow('fake-chunk-size', 'fake-chunk-size')
+        pillow.processor_chunk_size = 10
+        self.assertIsNotNone(pillow.chunk_size_controller)
+        pillow.chunk_size_controller.record(10, 0.1, full=True)
+        self.assertEqual(pillow.chunk_size, 20)
+        self.assertEqual(pillow.max_chunk_wait_seconds, 5)
@@ -0,0 +1,175 @@
+import threading
+import uuid
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase
+
+from pillowtop.feed.interface import Change, ChangeFeed, ChangeMeta
+from pillowtop.pillow.interface import ConstructedPillow
+from pillowtop.processors.elastic import BulkElasticProcessor
+from pillowtop.processors.interface import BulkPillowProcessor
+
+
+class PartitionedChangeFeed(ChangeFeed):
+    """
+    Change feed with changes from several partitions of one topic, read
+    round robin. Keeps track of processed offsets like the kafka feed.
+    """
+    supports_partitions = True
+
+    def __init__(self, num_partitions, changes_per_partition):
+        self._changes = [
+            _make_change(partition, offset)
+            for offset in range(changes_per_partition)
+            for partition in range(num_partitions)
+        ]
+        self.processed_offsets = {}
+        self.deferred = False
+
+    def iter_changes(self, since, forever=False):
+        for change in self._changes:
+            if not self.deferred:
+                self.mark_processed(change)
+            yield change
+
+    def defer_processed_offsets(self):
+        self.deferred = True
+
+    def mark_processed(self, change):
+        self.processed_offsets[(change.topic, change.partition)] = change.sequence_id
+
+    def get_latest_offsets(self):
+        return {}
+
+    def get_latest_offsets_as_checkpoint_value(self):
+        return {}
+
+    def get_processed_offsets(self):
+        return dict(self.processed_offsets)
+
+
+class ChunkRecordingProcessor(BulkPillowProcessor):
+    supports_partition_workers = True
+
+    def __init__(self):
+        self.chunks = []
+        self.threads = set()
+
+    def process_change(self, change):
+        raise AssertionError("changes should be processed in chunks")
+
+    def process_changes_chunk(self, changes_chunk):
+        self.chunks.append(changes_chunk)
+        self.threads.add(threading.get_ident())
+        return set(), []
+
+
+class ThreadUnsafeProcessor(ChunkRecordingProcessor):
+    supports_partition_workers = False
+
+
+class CheckpointRecorder(object):
+
+    def __init__(self, change_feed):
+        self.change_feed = change_feed
+        self.checkpoints = []
+
+    def update_checkpoint(self, change, context):
+        self.checkpoints.append((change, self.change_feed.get_processed_offsets()))
+        return False
+
+
+class PartitionProcessingTest(SimpleTestCase):
+
+    def _run_pillow(self, partition_workers, processor=None):
+        feed = PartitionedChangeFeed(num_partitions=3, changes_per_partition=10)
+        processor = processor or ChunkRecordingProcessor()
+        recorder = CheckpointRecorder(feed)
+        pillow = ConstructedPillow(
+            name='test-partition-processing',
+            checkpoint=None,
+            change_feed=feed,
+            processor=processor,
+            change_processed_event_handler=recorder,
+            processor_chunk_size=4,
+            partition_workers=partition_workers,
+        )
+        pillow.process_changes(since=None, forever=False)
+        return processor, recorder
+
+    def test_chunks_contain_one_partition(self):
+        processor, _ = self._run_pillow(partition_workers=2)
+        for chunk in processor.chunks:
+            self.assertEqual(len({change.partition for change in chunk}), 1)
+        self.assertEqual(sum(len(chunk) for chunk in processor.chunks), 30)
+        self.assertNotIn(threading.get_ident(), processor.threads)
+
+    def test_chunks_of_a_partition_are_processed_in_order(self):
+        processor, _ = self._run_pillow(partition_workers=2)
+        for partition in range(3):
+            offsets = [
+                change.sequence_id
+                for chunk in processor.chunks if chunk[0].partition == partition
+                for change in chunk
+            ]
+            self.assertEqual(offsets, list(range(10)))
+
+    def test_checkpoint_only_includes_processed_changes(self):
+        processor, recorder = self._run_pillow(partition_workers=2)
+        for change, offsets in recorder.checkpoints:
+            self.assertEqual(offsets[(change.topic, change.partition)], change.sequence_id)
+        self.assertEqual(recorder.checkpoints[-1][1], {('topic', 0): 9, ('topic', 1): 9, ('topic', 2): 9})
+
+    def test_serial_without_partition_workers(self):
+        processor, _ = self._run_pillow(partition_workers=0)
+        self.assertEqual([len(chunk) for chunk in processor.chunks], [4] * 7 + [2])
+        self.assertEqual(processor.threads, {threading.get_ident()})
+
+    def test_serial_if_processor_does_not_support_partition_workers(self):
+        processor, _ = self._run_pillow(partition_workers=2, processor=ThreadUnsafeProcessor())
+        self.assertEqual([len(chunk) for chunk in processor.chunks], [4] * 7 + [2])
+        self.assertEqual(processor.threads, {threading.get_ident()})
+
+    def test_elastic_processor_processes_partitions_concurrently(self):
+        feed = PartitionedChangeFeed(num_partitions=2, changes_per_partition=4)
+        for change in feed._changes:
+            change.document = {'_id': change.id}
+        # each bulk request waits for the other partition's request
+        barrier = threading.Barrier(2, timeout=10)
+        bulk_threads = set()
+
+        def bulk(actions, raise_errors):
+            bulk_threads.add(threading.get_ident())
+            barrier.wait()
+            return len(actions), []
+
+        adapter = Mock(index_name='test', bulk=Mock(side_effect=bulk))
+        processor = BulkElasticProcessor(adapter)
+        pillow = ConstructedPillow(
+            name='test-partition-processing',
+            checkpoint=None,
+            change_feed=feed,
+            processor=processor,
+            change_processed_event_handler=CheckpointRecorder(feed),
+            processor_chunk_size=4,
+            partition_workers=2,
+        )
+        with patch('pillowtop.processors.elastic.bulk_fetch_changes_docs', return_value=([], [])), \
+                patch('pillowtop.processors.elastic.build_bulk_payload',
+                      side_effect=lambda changes, error_collector: [change.id for change in changes]):
+            pillow.process_changes(since=None, forever=False)
+
+        self.assertEqual(adapter.bulk.call_count, 2)
+        self.assertEqual(len(bulk_threads), 2)
+        self.assertEqual(feed.processed_offsets, {('topic', 0): 3, ('topic', 1): 3})
+
+
+def _make_change(partition, offset):
+    doc_id = uuid.uuid4().hex
+    return Change(
+        id=doc_id,
+        sequence_id=offset,
+        metadata=ChangeMeta(document_id=doc_id, data_source_type='sql', data_source_name='test'),
+        topic='topic',
+        partition=partition,
+    )
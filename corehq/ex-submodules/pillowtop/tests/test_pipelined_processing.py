@@ -0,0 +1,87 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from pillowtop.pillow.interface import ConstructedPillow
+from pillowtop.processors.interface import PipelinedBulkPillowProcessor
+from pillowtop.tests.test_partition_processing import PartitionedChangeFeed
+
+
+class RecordingPipelinedProcessor(PipelinedBulkPillowProcessor):
+
+    def __init__(self, events, fail_prepare=False):
+        self.events = events
+        self.fail_prepare = fail_prepare
+        self.load_threads = set()
+        self.serial_changes = []
+
+    def process_change(self, change):
+        self.serial_changes.append(change)
+
+    def prepare_changes_chunk(self, changes_chunk):
+        self.events.append(('prepare', changes_chunk[-1].sequence_id))
+        if self.fail_prepare:
+            raise ValueError('prepare failed')
+        return changes_chunk
+
+    def load_changes_chunk(self, prepared):
+        self.load_threads.add(threading.get_ident())
+        self.events.append(('load', prepared[-1].sequence_id))
+        return set(), []
+
+
+class EventRecorder(object):
+
+    def __init__(self, events):
+        self.events = events
+
+    def update_checkpoint(self, change, context):
+        self.events.append(('checkpoint', change.sequence_id))
+        return False
+
+
+class PipelinedProcessingTest(SimpleTestCase):
+
+    def _run_pillow(self, fail_prepare=False):
+        events = []
+        processor = RecordingPipelinedProcessor(events, fail_prepare)
+        pillow = ConstructedPillow(
+            name='test-pipelined-processing',
+            checkpoint=None,
+            change_feed=PartitionedChangeFeed(num_partitions=1, changes_per_partition=10),
+            processor=processor,
+            change_processed_event_handler=EventRecorder(events),
+            processor_chunk_size=4,
+            pipelined=True,
+        )
+        pillow.process_changes(since=None, forever=False)
+        return processor, events
+
+    def test_next_chunk_is_prepared_before_previous_is_checkpointed(self):
+        processor, events = self._run_pillow()
+        self.assertEqual(
+            [event for event in events if event[0] != 'load'],
+            [
+                ('prepare', 3),
+                ('prepare', 7),
+                ('checkpoint', 3),
+                ('prepare', 9),
+                ('checkpoint', 7),
+                ('checkpoint', 9),
+            ]
+        )
+        self.assertNotIn(threading.get_ident(), processor.load_threads)
+
+    def test_chunks_are_loaded_before_checkpoint(self):
+        processor, events = self._run_pillow()
+        loads_and_checkpoints = [event for event in events if event[0] != 'prepare']
+        self.assertEqual(loads_and_checkpoints, [
+            ('load', 3), ('checkpoint', 3),
+            ('load', 7), ('checkpoint', 7),
+            ('load', 9), ('checkpoint', 9),
+        ])
+
+    def test_prepare_error_falls_back_to_serial_processing(self):
+        processor, events = self._run_pillow(fail_prepare=True)
+        self.assertEqual([change.sequence_id for change in processor.serial_changes], list(range(10)))
+        self.assertNotIn('load', [event[0] for event in events])
@@ -8,6 +8,7 @@ from django.conf import settings
 from django.db import migrations
 
 from dimagi.utils.modules import to_function
+from pillowtop.dao.cache import cache_documents, get_cached_documents
 from pillowtop.dao.exceptions import (
     DocumentMismatchError,
     DocumentMissingError,
@@ -330,10 +331,13 @@ def bulk_fetch_changes_docs(changes, domain=None):
     docs = []
     for _, _changes in changes_by_doctype.items():
         doc_store = _changes[0].document_store
-        doc_ids_to_query = [change.id for change in _changes if change.should_fetch_document()]
+        changes_to_fetch = [change for change in _changes if change.should_fetch_document()]
+        cached_docs_by_id = get_cached_documents(changes_to_fetch)
+        doc_ids_to_query = [change.id for change in changes_to_fetch if change.id not in cached_docs_by_id]
         new_docs = list(doc_store.iter_documents(doc_ids_to_query))
+        cache_documents(changes_to_fetch, {doc['_id']: doc for doc in new_docs})
         docs_queried_prior = [change.document for change in _changes if change.document]
-        docs.extend(new_docs + docs_queried_prior)
+        docs.extend(new_docs + list(cached_docs_by_id.values()) + docs_queried_prior)
 
     # catch missing docs
     bad_changes = set()
@@ -7,7 +7,8 @@ from collections import OrderedDict, namedtuple
 from datetime import datetime
 
 from django.db import DatabaseError, models, transaction
-from django.db.models import F
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
 
 from ddtrace import tracer
 from jsonfield.fields import JSONField
@@ -27,6 +28,7 @@ from corehq.blobs.util import get_content_md5
 from corehq.sql_db.models import PartitionedModel, RequireDBManager
 from corehq.sql_db.util import (
     get_db_aliases_for_partitioned_query,
+    paginate_query,
     split_list_by_db_partition,
 )
 from corehq.util.json import CommCareJSONEncoder
@@ -50,6 +52,7 @@ from .util import (
 DEFAULT_PARENT_IDENTIFIER = 'parent'
 
 CaseAction = namedtuple("CaseAction", ["action_type", "updated_known_properties", "indices"])
+CasePropertyResult = namedtuple('CasePropertyResult', 'case value')
 
 
 class CommCareCaseManager(RequireDBManager):
@@ -100,6 +103,51 @@ class CommCareCaseManager(RequireDBManager):
         for chunk in chunked((x for x in case_ids if x), 100, list):
             yield from self.get_cases(chunk, domain)
 
+    def iter_case_record_batches(self, domain, case_type=None, properties=None, q_expression=None,
+                                 db=None, batch_size=1000, load_source=None):
+        """Iterate over lightweight records of the cases in a domain
+
+        Cases are read in batches ordered by primary key, paginated by the
+        last key of the previous batch, from each partitioned database in
+        turn (or only from ``db``).
+
+        :param properties: Names of the case properties to load. Values
+            are extracted from ``case_json`` by the database, so the rest of
+            ``case_json`` is never read. Names of ``CommCareCase`` fields
+            are also read from their columns. If None, all of ``case_json``
+            is loaded.
+        :param q_expression: Optional ``Q`` object to filter cases further.
+        :returns: Generator of lists of ``CaseRecord`` objects.
+        """
+        q = Q(domain=domain)
+        if case_type is not None:
+            q &= Q(type=case_type)
+        if q_expression is not None:
+            q &= q_expression
+
+        fields = list(CaseRecord.BASE_FIELDS)
+        if properties is None:
+            fields.append('case_json')
+            annotate = None
+        else:
+            properties = list(properties)
+            model_fields = {field.name for field in self.model._meta.fields} - {'id', 'case_json'}
+            fields.extend(name for name in properties if name in model_fields and name not in fields)
+            fields.append(CaseRecord.CASE_JSON_ANNOTATION)
+            table = self.model._meta.db_table
+            annotate = {CaseRecord.CASE_JSON_ANNOTATION: RawSQL(
+                f'SELECT jsonb_object_agg(key, value) FROM jsonb_each("{table}"."case_json"::jsonb) '
+                'WHERE key = ANY(%s)',
+                [properties],
+                output_field=models.JSONField(),
+            )}
+
+        for db_name in [db] if db else get_db_aliases_for_partitioned_query():
+            rows = paginate_query(db_name, self.model, q, annotate=annotate, query_size=batch_size,
+                                  values=fields, load_source=load_source)
+            for chunk in chunked(rows, batch_size, list):
+                yield [CaseRecord(dict(zip(fields, row))) for row in chunk]
+
     def get_case_by_external_id(self, domain, external_id, case_type=None, raise_multiple=False):
         """Get case in domain with external id and optional case type
 
@@ -125,6 +173,26 @@ class CommCareCaseManager(RequireDBManager):
             raise error
         return cases[0]
 
+    def get_cases_by_external_ids(self, domain, external_ids, case_types=None):
+        """Get cases in domain with any of the given external ids
+
+        Cases are not partitioned by external id, so each partitioned
+        database is queried once for the whole list.
+
+        :param case_types: Optional list of case types to filter by.
+        :returns: List of `CommCareCase` objects, excluding deleted cases
+        """
+        external_ids = [external_id for external_id in external_ids if external_id]
+        if not external_ids:
+            return []
+        q = Q(domain=domain, external_id__in=external_ids, deleted=False)
+        if case_types is not None:
+            q &= Q(type__in=list(case_types))
+        cases = []
+        for db_name in get_db_aliases_for_partitioned_query():
+            cases.extend(self.using(db_name).filter(q))
+        return cases
+
     def get_case_ids_that_exist(self, domain, case_ids):
         result = []
         for db_name, case_ids_chunk in split_list_by_db_partition(case_ids):
@@ -301,6 +369,50 @@ class CommCareCaseManager(RequireDBManager):
             publish_case_deleted(domain, case_id)
 
 
+class CaseRecord(object):
+    """Some properties of a case, as loaded by
+    ``CommCareCase.objects.iter_case_record_batches``
+
+    Supports the parts of the ``CommCareCase`` API that only need the
+    loaded properties of the case itself.
+    """
+    BASE_FIELDS = ('case_id', 'domain', 'type', 'owner_id', 'closed', 'deleted', 'server_modified_on')
+    CASE_JSON_ANNOTATION = 'record_case_json'
+
+    def __init__(self, values):
+        self.case_json = values.pop('case_json', None) or values.pop(self.CASE_JSON_ANNOTATION, None) or {}
+        self._fields = values
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['_fields'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __repr__(self):
+        return f"CaseRecord(case_id={self.case_id!r})"
+
+    @property
+    def is_deleted(self):
+        return self.deleted
+
+    def get_case_property(self, property, dynamic_only=False):
+        if property in self.case_json:
+            return self.case_json[property]
+        if not dynamic_only:
+            return self._fields.get(property)
+
+    def resolve_case_property(self, property_name):
+        """Like ``CommCareCase.resolve_case_property``, for properties of
+        the case itself
+        """
+        if '/' in property_name:
+            raise ValueError(f"Case records can't resolve {property_name!r}")
+        if property_name == '_id':
+            property_name = 'case_id'
+        return [CasePropertyResult(self, self.get_case_property(property_name))]
+
+
 class CommCareCase(PartitionedModel, models.Model, RedisLockableMixIn,
                    AttachmentMixin, CaseToXMLMixin, TrackRelatedChanges,
                    MessagingCaseContactMixin):
@@ -640,8 +752,6 @@ class CommCareCase(PartitionedModel, models.Model, RedisLockableMixIn,
         return result
 
     def _resolve_case_property(self, property_name, result):
-        CasePropertyResult = namedtuple('CasePropertyResult', 'case value')
-
         if property_name.lower().startswith('parent/'):
             parents = self.get_parents(identifier=DEFAULT_PARENT_IDENTIFIER)
             for parent in parents:
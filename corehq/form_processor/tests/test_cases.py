@@ -114,6 +114,34 @@ class TestCommCareCaseManager(BaseCaseManagerTest):
         result = CommCareCase.objects.iter_cases(case_ids, DOMAIN)
         self.assertEqual({r.case_id for r in result}, {case1.case_id, case2.case_id})
 
+    def test_iter_case_record_batches(self):
+        case1 = _create_case(case_type='t1', name='one', case_json={'dob': '2020-01-01', 'name': 'json'})
+        case2 = _create_case(case_type='t1', name='two', case_json={'dob': None, 'other': 'x'})
+        _create_case(case_type='t2')
+
+        batches = list(CommCareCase.objects.iter_case_record_batches(
+            DOMAIN, 't1', properties=['dob', 'name'], batch_size=1))
+        self.assertTrue(all(len(batch) == 1 for batch in batches))
+        records = {record.case_id: record for batch in batches for record in batch}
+        self.assertEqual(set(records), {case1.case_id, case2.case_id})
+
+        record1 = records[case1.case_id]
+        self.assertEqual(record1.case_json, {'dob': '2020-01-01', 'name': 'json'})
+        self.assertEqual(record1.get_case_property('name'), 'json')
+        self.assertEqual(record1.type, 't1')
+        self.assertFalse(record1.closed)
+
+        record2 = records[case2.case_id]
+        self.assertEqual(record2.case_json, {'dob': None})
+        self.assertEqual(record2.get_case_property('name'), 'two')
+        self.assertEqual(record2.get_case_property('other'), None)
+
+    def test_iter_case_record_batches_with_all_properties(self):
+        case = _create_case(case_type='t1', case_json={'dob': '2020-01-01', 'other': 'x'})
+        [[record]] = CommCareCase.objects.iter_case_record_batches(DOMAIN, 't1')
+        self.assertEqual(record.case_id, case.case_id)
+        self.assertEqual(record.case_json, {'dob': '2020-01-01', 'other': 'x'})
+
     def test_get_case_by_external_id(self):
         case1 = _create_case(external_id='123')
         case2 = _create_case(domain='d2', case_type='t1', external_id='123')
@@ -147,6 +175,22 @@ class TestCommCareCaseManager(BaseCaseManagerTest):
         case = CommCareCase.objects.get_case_by_external_id(DOMAIN, '123')
         self.assertIn(case.case_id, {case1_id, case2_id})
 
+    def test_get_cases_by_external_ids(self):
+        case1 = _create_case(case_type='t1', external_id='123')
+        case2 = _create_case(case_type='t2', external_id='456')
+        _create_case(case_type='t1', external_id='789')
+        _create_case(domain='d2', case_type='t1', external_id='123')
+        if settings.USE_PARTITIONED_DATABASE:
+            self.addCleanup(lambda: FormProcessorTestUtils.delete_all_cases('d2'))
+
+        cases = CommCareCase.objects.get_cases_by_external_ids(DOMAIN, ['123', '456', 'missing', None])
+        self.assertItemsEqual([c.case_id for c in cases], [case1.case_id, case2.case_id])
+
+        cases = CommCareCase.objects.get_cases_by_external_ids(DOMAIN, ['123', '456'], case_types=['t2'])
+        self.assertEqual([c.case_id for c in cases], [case2.case_id])
+
+        self.assertEqual(CommCareCase.objects.get_cases_by_external_ids(DOMAIN, []), [])
+
     def test_get_case_ids_that_exist(self):
         case1 = _create_case()
         case2 = _create_case()
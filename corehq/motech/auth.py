@@ -171,6 +171,15 @@ class BearerAuthManager(AuthManager):
         return HTTPBearerAuth(self.username, self.password)
 
 
+def _save_last_token(connection_settings):
+    if connection_settings.pk is None:
+        connection_settings.save()
+    else:
+        # Pooled sessions refresh tokens long after their
+        # ConnectionSettings was loaded. Don't overwrite later changes.
+        connection_settings.save(update_fields=['last_token_aes'])
+
+
 class OAuth2ClientGrantManager(AuthManager):
     """
     Follows the OAuth 2.0 client credentials grant type flow
@@ -203,7 +212,7 @@ class OAuth2ClientGrantManager(AuthManager):
         refreshed so that it can be reused in the future.
         """
         self.connection_settings.last_token = value
-        self.connection_settings.save()
+        _save_last_token(self.connection_settings)
 
     def get_session(self, domain_name: str) -> Session:
         def set_last_token(token):
@@ -273,7 +282,7 @@ class OAuth2PasswordGrantManager(AuthManager):
         refreshed so that it can be reused in the future.
         """
         self.connection_settings.last_token = value
-        self.connection_settings.save()
+        _save_last_token(self.connection_settings)
 
     def get_session(self, domain_name: str) -> Session:
 
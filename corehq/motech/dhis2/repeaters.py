@@ -141,7 +141,7 @@ class Dhis2Repeater(FormRepeater, Dhis2Instance):
         # Notify admins if API version is not supported
         self.get_api_version()
 
-        requests = self.connection_settings.get_requests(repeat_record.payload_id)
+        requests = self.connection_settings.get_requests(repeat_record.payload_id, pooled=True)
         for form_config in self.dhis2_config['form_configs']:
             if form_config['xmlns'] == payload['form']['@xmlns']:
                 try:
@@ -216,7 +216,7 @@ class Dhis2EntityRepeater(CaseRepeater, Dhis2Instance):
                           if 'case_property' in c],
             form_question_values=get_form_question_values(payload),
         )
-        requests = self.connection_settings.get_requests(repeat_record.payload_id)
+        requests = self.connection_settings.get_requests(repeat_record.payload_id, pooled=True)
         try:
             return send_dhis2_entities(requests, self, case_trigger_infos)
         except Exception:
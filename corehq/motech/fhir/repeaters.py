@@ -75,7 +75,7 @@ class FHIRRepeater(CaseRepeater):
         Returns an HTTP response-like object. If the payload has nothing
         to send, returns True.
         """
-        requests = self.connection_settings.get_requests(repeat_record.payload_id)
+        requests = self.connection_settings.get_requests(repeat_record.payload_id, pooled=True)
         infos, resource_types = self.get_infos_resource_types(
             payload,
             self.fhir_version,
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import re
 from typing import Any, Callable, Optional
@@ -167,7 +168,13 @@ class ConnectionSettings(models.Model):
         self,
         payload_id: Optional[str] = None,
         logger: Optional[Callable] = None,
+        pooled: bool = False,
     ):
+        """
+        Returns a Requests instance for this connection. If ``pooled``
+        is True, requests share a keep-alive session with other requests
+        for this connection in the same process.
+        """
         from corehq.motech.requests import Requests
 
         auth_manager = self.get_auth_manager()
@@ -179,8 +186,35 @@ class ConnectionSettings(models.Model):
             notify_addresses=self.notify_addresses,
             payload_id=payload_id,
             logger=logger,
+            session_pool_key=self.get_session_pool_key() if pooled else None,
         )
 
+    def get_session_pool_key(self):
+        """
+        Identifies the pooled session for this connection. The key
+        changes when settings that the session depends on change, so
+        that sessions with outdated settings are not reused. Returns None
+        for unsaved connections.
+        """
+        if self.pk is None:
+            return None
+        session_settings = [
+            self.domain,
+            self.url,
+            self.auth_type,
+            self.api_auth_settings,
+            self.username,
+            self.password,
+            self.client_id,
+            self.client_secret,
+            self.skip_cert_verify,
+            self.token_url,
+            self.refresh_url,
+            self.pass_credentials_in_header,
+        ]
+        digest = hashlib.sha256(json.dumps(session_settings).encode('utf-8')).hexdigest()
+        return (self.pk, digest)
+
     def get_auth_manager(self):
         # Auth types that don't require a username:
         if self.auth_type is None:
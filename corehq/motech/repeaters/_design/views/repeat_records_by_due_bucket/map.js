@@ -0,0 +1,14 @@
+function (doc) {
+    if (doc.doc_type === 'RepeatRecord') {
+        if (!doc.succeeded && doc.next_check && !doc.cancelled) {
+            // Partition records into 16 buckets (DUE_RECORD_BUCKETS) by
+            // the last hex digit of their id
+            var last = doc._id.charAt(doc._id.length - 1);
+            var bucket = parseInt(last, 16);
+            if (isNaN(bucket)) {
+                bucket = doc._id.charCodeAt(doc._id.length - 1) % 16;
+            }
+            emit([bucket, doc.next_check], null);
+        }
+    }
+}
@@ -6,8 +6,19 @@ from django.conf import settings
 MAX_RETRY_WAIT = timedelta(days=7)
 MIN_RETRY_WAIT = timedelta(minutes=60)
 CHECK_REPEATERS_INTERVAL = timedelta(minutes=5)
-CHECK_REPEATERS_PARTITION_COUNT = settings.CHECK_REPEATERS_PARTITION_COUNT
+# Due repeat records are split into this many buckets by the last hex
+# digit of their id (see the repeaters/repeat_records_by_due_bucket view).
+# Partition n checks the buckets b where b % CHECK_REPEATERS_PARTITION_COUNT
+# == n, so more partitions than buckets would leave partitions idle.
+DUE_RECORD_BUCKETS = 16
+CHECK_REPEATERS_PARTITION_COUNT = min(settings.CHECK_REPEATERS_PARTITION_COUNT, DUE_RECORD_BUCKETS)
+REPEAT_RECORD_SENDER_THREADS = settings.REPEAT_RECORD_SENDER_THREADS
 CHECK_REPEATERS_KEY = 'check-repeaters-key'
+# Number of due repeat records to fetch and queue at a time
+DUE_RECORDS_BATCH_SIZE = 1000
+# Number of due repeat records to queue in each task when they are sent
+# concurrently (see REPEAT_RECORD_SENDER_THREADS)
+RECORDS_PER_SENDER_TASK = 200
 # Number of attempts to an online endpoint before cancelling payload
 MAX_ATTEMPTS = 3
 # Number of exponential backoff attempts to an offline endpoint
@@ -15,6 +26,8 @@ MAX_BACKOFF_ATTEMPTS = 6
 # Limit the number of records to forward at a time so that one repeater
 # can't hold up the rest.
 RECORDS_AT_A_TIME = 1000
+# Maximum number of repeat records a repeater can send in one request
+MAX_BATCH_SIZE = 100
 
 RECORD_PENDING_STATE = 'PENDING'
 RECORD_SUCCESS_STATE = 'SUCCESS'
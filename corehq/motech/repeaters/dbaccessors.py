@@ -1,7 +1,7 @@
 import datetime
 
 from dimagi.utils.couch.database import iter_docs
-from dimagi.utils.parsing import json_format_datetime
+from dimagi.utils.parsing import json_format_datetime, string_to_utc_datetime
 
 from corehq.sql_db.util import estimate_row_count
 from corehq.util.couch_helpers import paginate_view
@@ -247,6 +247,46 @@ def iterate_repeat_record_ids(due_before, chunk_size=10000):
         yield doc['id']
 
 
+def iterate_due_repeat_record_ids(bucket, due_before, chunk_size=1000):
+    """
+    Yields the ids of the repeat records in the given bucket that are due
+    before ``due_before``, longest overdue first.
+    """
+    from .models import RepeatRecord
+    for row in paginate_view(
+            RepeatRecord.get_db(),
+            'repeaters/repeat_records_by_due_bucket',
+            chunk_size,
+            reduce=False,
+            include_docs=False,
+            **_get_due_bucket_range(bucket, due_before)):
+        yield row['id']
+
+
+def get_due_repeat_record_stats(bucket, due_before):
+    """
+    Returns the number of repeat records in the given bucket that are due
+    before ``due_before``, and when the longest overdue one was due (or
+    None if there are none).
+    """
+    from .models import RepeatRecord
+    db = RepeatRecord.get_db()
+    view_kwargs = _get_due_bucket_range(bucket, due_before)
+    result = db.view('repeaters/repeat_records_by_due_bucket', reduce=True, **view_kwargs).one()
+    count = result['value'] if result else 0
+    if not count:
+        return 0, None
+    first = db.view('repeaters/repeat_records_by_due_bucket', reduce=False, limit=1, **view_kwargs).one()
+    return count, string_to_utc_datetime(first['key'][1]) if first else None
+
+
+def _get_due_bucket_range(bucket, due_before):
+    return {
+        'startkey': [bucket],
+        'endkey': [bucket, json_format_datetime(due_before), {}],
+    }
+
+
 def get_domains_that_have_repeat_records():
     from .models import RepeatRecord
     return [
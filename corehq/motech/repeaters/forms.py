@@ -8,12 +8,14 @@ from crispy_forms import layout as crispy
 from crispy_forms.helper import FormHelper
 from memoized import memoized
 
+from corehq import toggles
 from corehq.apps.es.users import UserES
 from corehq.apps.hqwebapp import crispy as hqcrispy
 from corehq.apps.reports.analytics.esaccessors import get_case_types_for_domain
 from corehq.apps.users.util import raw_username
 from corehq.motech.const import REQUEST_METHODS, REQUEST_POST
 from corehq.motech.models import ConnectionSettings
+from corehq.motech.repeaters.const import MAX_BATCH_SIZE
 from corehq.motech.repeaters.repeater_generators import RegisterGenerator
 from corehq.motech.views import ConnectionSettingsListView
 
@@ -69,6 +71,37 @@ class GenericRepeaterForm(forms.Form):
                 label='Payload Format',
                 choices=self.formats,
             )
+        if self.batch_formats:
+            self.fields['batch_size'] = forms.IntegerField(
+                label=_('Records per request'),
+                initial=1,
+                min_value=1,
+                max_value=MAX_BATCH_SIZE,
+                required=True,
+                help_text=_(
+                    'Send up to this many records in each request, as a JSON '
+                    'array. Only JSON payload formats can send more than one '
+                    'record per request, and the remote API must accept arrays.'
+                ),
+            )
+
+    @property
+    @memoized
+    def batch_formats(self):
+        """
+        Returns the payload formats that can send batches of records
+        """
+        if (
+            not toggles.BATCH_REPEATER_DELIVERY.enabled(self.domain)
+            or not self.repeater_class.supports_batches()
+        ):
+            return []
+        return [
+            format_name for format_name, __ in self.formats
+            if RegisterGenerator.generator_class_by_repeater_format(
+                self.repeater_class, format_name
+            ).supports_batches
+        ]
 
     def _initialize_crispy_layout(self):
         self.helper = FormHelper(self)
@@ -98,12 +131,17 @@ class GenericRepeaterForm(forms.Form):
         form_fields = ["connection_settings_id", "name", "request_method"]
         if self.formats and len(self.formats) > 1:
             form_fields.append('format')
+        if self.batch_formats:
+            form_fields.append('batch_size')
         return form_fields
 
     def clean(self):
         cleaned_data = super(GenericRepeaterForm, self).clean()
         if 'format' not in cleaned_data:
             cleaned_data['format'] = self.formats[0][0]
+        batch_size = cleaned_data.get('batch_size') or 1
+        if batch_size > 1 and cleaned_data['format'] not in self.batch_formats:
+            raise ValidationError(_('This payload format can only send one record per request'))
 
         return cleaned_data
 
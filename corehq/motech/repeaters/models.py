@@ -69,7 +69,7 @@ import traceback
 import uuid
 import warnings
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import Any, List, Optional
 from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 
 from django.db import models
@@ -78,6 +78,7 @@ from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
+from attr import evolve
 from couchdbkit.exceptions import ResourceConflict, ResourceNotFound
 from jsonfield import JSONField
 from memoized import memoized
@@ -109,7 +110,7 @@ from corehq.form_processor.models import (
     XFormInstance,
 )
 from corehq.motech.const import MAX_REQUEST_LOG_LENGTH, REQUEST_METHODS, REQUEST_POST
-from corehq.motech.models import ConnectionSettings
+from corehq.motech.models import ConnectionSettings, RequestLog
 from corehq.motech.repeaters.apps import REPEATER_CLASS_MAP
 from corehq.motech.repeaters.optionvalue import OptionValue
 from corehq.motech.requests import simple_request
@@ -275,6 +276,10 @@ class Repeater(RepeaterSuperProxy):
     class Meta:
         db_table = 'repeaters_repeater'
 
+    # Number of repeat records to send in each request, if the repeater
+    # and its payload generator support batches
+    batch_size = OptionValue(default=1)
+
     payload_generator_classes = ()
 
     friendly_name = _("Data")
@@ -473,6 +478,43 @@ class Repeater(RepeaterSuperProxy):
             notify_addresses=self.connection_settings.notify_addresses,
             payload_id=repeat_record.payload_id,
             method=self.request_method,
+            session_pool_key=self.connection_settings.get_session_pool_key(),
+        )
+
+    @classmethod
+    def supports_batches(cls):
+        """
+        Repeaters with their own ``send_request()`` (e.g. to send DHIS2
+        events or OpenMRS workflows) can't send batches of payloads
+        """
+        return cls.send_request is Repeater.send_request
+
+    @property
+    def sends_batches(self):
+        return (
+            self.batch_size > 1
+            and self.supports_batches()
+            and self.generator.supports_batches
+            and toggles.BATCH_REPEATER_DELIVERY.enabled(self.domain)
+        )
+
+    def send_batch_request(self, repeat_records, payloads):
+        """
+        Sends the payloads of ``repeat_records`` in one request. Used
+        instead of ``send_request()`` when ``sends_batches`` is True.
+        All of ``repeat_records`` must have the same URL.
+        """
+        return simple_request(
+            self.domain,
+            self.get_url(repeat_records[0]),
+            self.generator.get_batch_payload(payloads),
+            headers=self.get_batch_headers(repeat_records),
+            auth_manager=self.connection_settings.get_auth_manager(),
+            verify=not self.connection_settings.skip_cert_verify,
+            notify_addresses=self.connection_settings.notify_addresses,
+            method=self.request_method,
+            logger=get_batch_request_logger(repeat_records),
+            session_pool_key=self.connection_settings.get_session_pool_key(),
         )
 
     def handle_response(self, result, repeat_record):
@@ -493,6 +535,21 @@ class Repeater(RepeaterSuperProxy):
         # to be overridden
         return self.generator.get_headers()
 
+    def get_batch_headers(self, repeat_records):
+        """
+        Returns the headers of a batch request. If a header's value
+        differs between repeat records (e.g. "received-on"), the values
+        are sent as a comma-separated list in the order of the payloads.
+        """
+        headers = {}
+        for index, repeat_record in enumerate(repeat_records):
+            for name, value in self.get_headers(repeat_record).items():
+                headers.setdefault(name, [''] * len(repeat_records))[index] = value
+        return {
+            name: values[0] if len(set(values)) == 1 else ', '.join(str(value) for value in values)
+            for name, values in headers.items()
+        }
+
     @property
     @memoized
     def generator(self):
@@ -1124,6 +1181,22 @@ class RepeatRecord(Document):
             retry_process_repeat_record,
         )
 
+        if not self.claim_for_forwarding():
+            return
+
+        # separated for improved datadog reporting
+        task = retry_process_repeat_record if is_retry else process_repeat_record
+
+        if fire_synchronously:
+            task(self._id, self.domain)
+        else:
+            task.delay(self._id, self.domain)
+
+    def claim_for_forwarding(self):
+        """
+        Returns True if the repeat record is due and this process has
+        claimed it for forwarding, otherwise False.
+        """
         def is_ready():
             return self.next_check < datetime.utcnow()
 
@@ -1131,7 +1204,7 @@ class RepeatRecord(Document):
             return self.succeeded or self.cancelled or self.next_check is None
 
         if already_processed() or not is_ready():
-            return
+            return False
 
         # Set the next check to happen an arbitrarily long time from now.
         # This way if there's a delay in calling `process_repeat_record` (which
@@ -1145,15 +1218,8 @@ class RepeatRecord(Document):
             # Another process beat us to the punch. This takes advantage
             # of Couch DB's optimistic locking, which prevents a process
             # with stale data from overwriting the work of another.
-            return
-
-        # separated for improved datadog reporting
-        task = retry_process_repeat_record if is_retry else process_repeat_record
-
-        if fire_synchronously:
-            task(self._id, self.domain)
-        else:
-            task.delay(self._id, self.domain)
+            return False
+        return True
 
     def requeue(self):
         self.cancelled = False
@@ -1368,29 +1434,6 @@ def send_request(
     Returns True on success or cancelled, which means the caller should
     not retry. False means a retry should be attempted later.
     """
-
-    def is_success(resp):
-        return (
-            is_response(resp)
-            and 200 <= resp.status_code < 300
-            # `response` is `True` if the payload did not need to be
-            # sent. (This can happen, for example, with DHIS2 if the
-            # form that triggered the forwarder doesn't contain data
-            # for a DHIS2 Event.)
-            or resp is True
-        )
-
-    def allow_retries(response):
-        # respect the `retry` field of RepeaterResponse
-        return getattr(response, 'retry', True)
-
-    def later_might_be_better(resp):
-        return is_response(resp) and resp.status_code in (
-            502,  # Bad Gateway
-            503,  # Service Unavailable
-            504,  # Gateway Timeout
-        )
-
     try:
         response = repeater.send_request(repeat_record, payload)
     except (Timeout, ConnectionError) as err:
@@ -1400,26 +1443,118 @@ def send_request(
     except Exception as err:
         repeat_record.add_client_failure_attempt(str(err))
     else:
-        if is_success(response):
-            if is_response(response):
-                # Log success in Datadog if the payload was sent.
-                log_repeater_success_in_datadog(
-                    repeater.domain,
-                    response.status_code,
-                    repeater_type=repeater.__class__.__name__
-                )
-            repeat_record.add_success_attempt(response)
+        if _later_might_be_better(response):
+            repeat_record.add_server_failure_attempt(format_response(response))
         else:
-            message = format_response(response)
-            if later_might_be_better(response):
-                repeat_record.add_server_failure_attempt(message)
-            else:
-                retry = allow_retries(response)
-                repeat_record.add_client_failure_attempt(message, retry)
+            _add_response_attempt(repeater, repeat_record, response)
     return repeat_record.state in (RECORD_SUCCESS_STATE,
                                    RECORD_CANCELLED_STATE)  # Don't retry
 
 
+def send_batch_request(
+    repeater: Repeater,
+    repeat_records: List[SQLRepeatRecord],
+    payloads: List[Any],
+) -> bool:
+    """
+    Calls ``repeater.send_batch_request()`` and handles the response
+    for each repeat record like ``send_request()``.
+
+    Returns True if none of the repeat records should be retried.
+    """
+    server_failure_messages = {}
+    try:
+        response = repeater.send_batch_request(repeat_records, payloads)
+    except (Timeout, ConnectionError) as err:
+        log_repeater_timeout_in_datadog(repeater.domain)
+        message = str(RequestConnectionError(err))
+        server_failure_messages = {record.pk: message for record in repeat_records}
+    except Exception as err:
+        for repeat_record in repeat_records:
+            repeat_record.add_client_failure_attempt(str(err))
+    else:
+        responses = repeater.generator.get_batch_responses(response, len(repeat_records))
+        for repeat_record, record_response in zip(repeat_records, responses):
+            if _later_might_be_better(record_response):
+                server_failure_messages[repeat_record.pk] = format_response(record_response)
+            else:
+                _add_response_attempt(repeater, repeat_record, record_response)
+
+    if server_failure_messages:
+        # Back off once for the batch, not once for each repeat record
+        repeater.set_next_attempt()
+        for repeat_record in repeat_records:
+            if repeat_record.pk in server_failure_messages:
+                repeat_record._add_failure_attempt(
+                    server_failure_messages[repeat_record.pk],
+                    MAX_BACKOFF_ATTEMPTS,
+                )
+    return all(
+        repeat_record.state in (RECORD_SUCCESS_STATE, RECORD_CANCELLED_STATE)
+        for repeat_record in repeat_records
+    )
+
+
+def get_batch_request_logger(repeat_records):
+    """
+    Returns a request logger that logs a batch request for each of
+    ``repeat_records``, so that the request is listed with the
+    payloads it delivered. The first repeat record's log entry stores
+    the request; the others refer to it.
+    """
+    def log_batch_request(log_level, log_entry):
+        batch_log = RequestLog.log(log_level, evolve(
+            log_entry,
+            payload_id=repeat_records[0].payload_id,
+        ))
+        for repeat_record in repeat_records[1:]:
+            RequestLog.log(log_level, evolve(
+                log_entry,
+                payload_id=repeat_record.payload_id,
+                data=f'Sent in a batch of {len(repeat_records)} payloads. '
+                     f'See request log {batch_log.pk}.',
+                response_body='',
+            ))
+    return log_batch_request
+
+
+def _add_response_attempt(repeater, repeat_record, response):
+    if _is_success(response):
+        if is_response(response):
+            # Log success in Datadog if the payload was sent.
+            log_repeater_success_in_datadog(
+                repeater.domain,
+                response.status_code,
+                repeater_type=repeater.__class__.__name__
+            )
+        repeat_record.add_success_attempt(response)
+    else:
+        message = format_response(response)
+        # respect the `retry` field of RepeaterResponse
+        retry = getattr(response, 'retry', True)
+        repeat_record.add_client_failure_attempt(message, retry)
+
+
+def _is_success(response):
+    return (
+        is_response(response)
+        and 200 <= response.status_code < 300
+        # `response` is `True` if the payload did not need to be
+        # sent. (This can happen, for example, with DHIS2 if the
+        # form that triggered the forwarder doesn't contain data
+        # for a DHIS2 Event.)
+        or response is True
+    )
+
+
+def _later_might_be_better(response):
+    return is_response(response) and response.status_code in (
+        502,  # Bad Gateway
+        503,  # Service Unavailable
+        504,  # Gateway Timeout
+    )
+
+
 def is_queued(record):
     return record.state in (RECORD_PENDING_STATE, RECORD_FAILURE_STATE)
 
@@ -1,6 +1,7 @@
 import json
 import warnings
 from collections import namedtuple
+from http import HTTPStatus
 from datetime import datetime
 from uuid import uuid4
 
@@ -21,6 +22,7 @@ from corehq.const import OPENROSA_VERSION_3
 from corehq.form_processor.exceptions import CaseNotFound
 from corehq.form_processor.models import CommCareCase
 from corehq.middleware import OPENROSA_VERSION_HEADER
+from corehq.motech.repeater_helpers import RepeaterResponse
 from corehq.motech.repeaters.exceptions import ReferralError, DataRegistryCaseUpdateError
 from dimagi.utils.parsing import json_format_datetime
 
@@ -44,6 +46,10 @@ class BasePayloadGenerator(object):
     # if you ever change format_name, add the old format_name here for backwards compatability
     deprecated_format_names = ()
 
+    # True if several payloads can be sent in one request. See
+    # get_batch_payload() and get_batch_responses()
+    supports_batches = False
+
     def __init__(self, repeater):
         self.repeater = repeater
 
@@ -61,6 +67,61 @@ class BasePayloadGenerator(object):
     def get_headers(self):
         return {'Content-Type': self.content_type}
 
+    def get_batch_payload(self, payloads):
+        """
+        Returns the payload of a request that sends all of ``payloads``
+        """
+        raise NotImplementedError()
+
+    def get_batch_responses(self, response, count):
+        """
+        Returns the response for each of the ``count`` payloads sent by
+        a batch request
+        """
+        raise NotImplementedError()
+
+
+class JsonArrayBatchMixin:
+    """
+    Sends batches of JSON payloads as a JSON array.
+
+    If the remote API responds with a JSON array of one object per
+    payload, the "status" of each object is taken as the HTTP status code
+    of its payload. Otherwise the response to the request is the
+    response for every payload.
+    """
+    supports_batches = True
+
+    def get_batch_payload(self, payloads):
+        return '[{}]'.format(','.join(payloads))
+
+    def get_batch_responses(self, response, count):
+        if not 200 <= response.status_code < 300:
+            return [response] * count
+        try:
+            items = response.json()
+        except ValueError:
+            return [response] * count
+        if (
+            not isinstance(items, list)
+            or len(items) != count
+            or not all(isinstance(item, dict) for item in items)
+        ):
+            return [response] * count
+        return [_get_batch_item_response(item, response.status_code) for item in items]
+
+
+def _get_batch_item_response(item, default_status_code):
+    try:
+        status_code = int(item.get('status', default_status_code))
+    except (TypeError, ValueError):
+        status_code = default_status_code
+    try:
+        reason = HTTPStatus(status_code).phrase
+    except ValueError:
+        reason = ''
+    return RepeaterResponse(status_code, reason, json.dumps(item))
+
 
 FormatInfo = namedtuple('FormatInfo', 'name label generator_class')
 
@@ -212,7 +273,7 @@ class CaseRepeaterXMLPayloadGenerator(BasePayloadGenerator):
         return payload_doc.to_xml(self.repeater.version or V2, include_case_on_closed=True)
 
 
-class CaseRepeaterJsonPayloadGenerator(BasePayloadGenerator):
+class CaseRepeaterJsonPayloadGenerator(JsonArrayBatchMixin, BasePayloadGenerator):
     format_name = 'case_json'
     format_label = _('JSON')
 
@@ -689,7 +750,7 @@ class ShortFormRepeaterJsonPayloadGenerator(BasePayloadGenerator):
         return 'application/json'
 
 
-class FormRepeaterJsonPayloadGenerator(BasePayloadGenerator):
+class FormRepeaterJsonPayloadGenerator(JsonArrayBatchMixin, BasePayloadGenerator):
 
     format_name = 'form_json'
     format_label = _('JSON')
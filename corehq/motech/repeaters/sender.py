@@ -0,0 +1,67 @@
+"""
+Sends repeat records concurrently.
+
+A ``process_repeat_record`` task occupies a celery worker for as long as
+its request takes, and most of that time is spent waiting for the remote
+API. ``send_repeat_records()`` sends the repeat records of many repeaters
+from one task, using a pool of threads.
+
+The repeat records of each repeater are sent by one thread, one at a
+time, in the order in which they were registered. So a remote API never
+gets more than one request at a time from a task, and it gets payloads in
+order.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.db import connections
+
+from dimagi.utils.logging import notify_exception
+
+
+def send_repeat_records(repeat_records, process_repeat_record, max_threads):
+    """
+    Calls ``process_repeat_record(repeat_record)`` for each of
+    ``repeat_records``, for up to ``max_threads`` repeaters at a time
+    """
+    by_repeater = defaultdict(list)
+    for repeat_record in repeat_records:
+        by_repeater[repeat_record.repeater_id].append(repeat_record)
+    groups = [
+        sorted(records, key=lambda record: record.registered_on or datetime.min)
+        for records in by_repeater.values()
+    ]
+    if max_threads <= 1 or len(groups) <= 1:
+        for records in groups:
+            _send_repeater_records(records, process_repeat_record)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(max_threads, len(groups))) as executor:
+        futures = [
+            executor.submit(_send_repeater_records_in_thread, records, process_repeat_record)
+            for records in groups
+        ]
+        for future in futures:
+            future.result()
+
+
+def _send_repeater_records_in_thread(repeat_records, process_repeat_record):
+    try:
+        _send_repeater_records(repeat_records, process_repeat_record)
+    finally:
+        # Django opens a database connection for each thread
+        connections.close_all()
+
+
+def _send_repeater_records(repeat_records, process_repeat_record):
+    for repeat_record in repeat_records:
+        try:
+            process_repeat_record(repeat_record)
+        except Exception:
+            # Don't hold up the rest. The repeat record will be retried
+            # when its next_check is due.
+            notify_exception(None, "Error sending repeat record", details={
+                'domain': repeat_record.domain,
+                'repeat_record_id': repeat_record.record_id,
+            })
@@ -14,6 +14,7 @@ from corehq.motech.models import RequestLog
 from corehq.util.metrics import (
     make_buckets_from_timedeltas,
     metrics_counter,
+    metrics_gauge,
     metrics_gauge_task,
     metrics_histogram_timer,
 )
@@ -24,14 +25,19 @@ from .const import (
     CHECK_REPEATERS_INTERVAL,
     CHECK_REPEATERS_KEY,
     CHECK_REPEATERS_PARTITION_COUNT,
+    DUE_RECORD_BUCKETS,
+    DUE_RECORDS_BATCH_SIZE,
     MAX_RETRY_WAIT,
     RECORD_FAILURE_STATE,
     RECORD_PENDING_STATE,
     RECORDS_AT_A_TIME,
+    RECORDS_PER_SENDER_TASK,
+    REPEAT_RECORD_SENDER_THREADS,
 )
 from .dbaccessors import (
+    get_due_repeat_record_stats,
     get_overdue_repeat_record_count,
-    iterate_repeat_record_ids,
+    iterate_due_repeat_record_ids,
     iterate_repeat_records_for_ids,
 )
 from .models import (
@@ -39,8 +45,10 @@ from .models import (
     Repeater,
     domain_can_forward,
     get_payload,
+    send_batch_request,
     send_request,
 )
+from .sender import send_repeat_records
 
 _check_repeaters_buckets = make_buckets_from_timedeltas(
     timedelta(seconds=10),
@@ -87,16 +95,36 @@ def check_repeaters():
         check_repeaters_in_partition.delay(current_partition)
 
 
-def _iterate_record_ids_for_partition(start, partition, total_partitions):
-    for record_id in iterate_repeat_record_ids(start, chunk_size=10000):
-        if hash(record_id) % total_partitions == partition:
-            yield record_id
+def get_partition_buckets(partition, total_partitions):
+    """
+    Returns the buckets of due repeat records checked by the partition
+    """
+    return [bucket for bucket in range(DUE_RECORD_BUCKETS) if bucket % total_partitions == partition]
 
 
 def _iterate_repeat_records_for_partition(start, partition, total_partitions):
-    # chunk the fetching of documents from couch
-    for chunked_ids in chunked(_iterate_record_ids_for_partition(start, partition, total_partitions), 1000):
-        yield from iterate_repeat_records_for_ids(chunked_ids)
+    # Only the partition's own buckets are read, and only their records
+    # that are due. Queueing a record moves its next_check forward, out of
+    # the range that is being read.
+    for bucket in get_partition_buckets(partition, total_partitions):
+        record_ids = iterate_due_repeat_record_ids(bucket, start, chunk_size=DUE_RECORDS_BATCH_SIZE)
+        # chunk the fetching of documents from couch
+        for chunked_ids in chunked(record_ids, DUE_RECORDS_BATCH_SIZE):
+            yield from iterate_repeat_records_for_ids(chunked_ids)
+
+
+def _record_due_repeat_record_metrics(start, partition, total_partitions):
+    due_count = 0
+    longest_due = None
+    for bucket in get_partition_buckets(partition, total_partitions):
+        count, due_since = get_due_repeat_record_stats(bucket, start)
+        due_count += count
+        if due_since is not None and (longest_due is None or due_since < longest_due):
+            longest_due = due_since
+    lag = (start - longest_due).total_seconds() if longest_due else 0
+    tags = {'partition': partition}
+    metrics_gauge('commcare.repeaters.check.due_records', due_count, tags=tags, multiprocess_mode=MPM_MAX)
+    metrics_gauge('commcare.repeaters.check.lag_seconds', lag, tags=tags, multiprocess_mode=MPM_MAX)
 
 
 @task(queue=settings.CELERY_PERIODIC_QUEUE)
@@ -121,10 +149,12 @@ def check_repeaters_in_partition(partition):
         return
 
     try:
+        _record_due_repeat_record_metrics(start, partition, CHECK_REPEATERS_PARTITION_COUNT)
         with metrics_histogram_timer(
             "commcare.repeaters.check.processing",
             timing_buckets=_check_repeaters_buckets,
         ):
+            claimed_record_ids = []
             for record in _iterate_repeat_records_for_partition(start, partition, CHECK_REPEATERS_PARTITION_COUNT):
                 if not _soft_assert(
                     datetime.utcnow() < twentythree_hours_later,
@@ -133,13 +163,22 @@ def check_repeaters_in_partition(partition):
                     break
 
                 metrics_counter("commcare.repeaters.check.attempt_forward")
-                record.attempt_forward_now(is_retry=True)
+                if REPEAT_RECORD_SENDER_THREADS > 1:
+                    if record.claim_for_forwarding():
+                        claimed_record_ids.append(record._id)
+                    if len(claimed_record_ids) >= RECORDS_PER_SENDER_TASK:
+                        process_repeat_records_concurrently.delay(claimed_record_ids)
+                        claimed_record_ids = []
+                else:
+                    record.attempt_forward_now(is_retry=True)
             else:
                 iterating_time = datetime.utcnow() - start
                 _soft_assert(
                     iterating_time < timedelta(hours=6),
                     f"It took {iterating_time} to iterate repeat records."
                 )
+            if claimed_record_ids:
+                process_repeat_records_concurrently.delay(claimed_record_ids)
     finally:
         check_repeater_lock.release()
 
@@ -164,6 +203,17 @@ def retry_process_repeat_record(repeat_record_id, domain):
     _process_repeat_record(repeat_record)
 
 
+@task(queue=settings.CELERY_REPEAT_RECORD_QUEUE)
+def process_repeat_records_concurrently(repeat_record_ids):
+    """
+    Sends repeat records that have been claimed for forwarding, for up to
+    REPEAT_RECORD_SENDER_THREADS repeaters at the same time
+    """
+    repeat_records = list(iterate_repeat_records_for_ids(repeat_record_ids))
+    metrics_counter("commcare.repeaters.concurrent_sender.records", len(repeat_records))
+    send_repeat_records(repeat_records, _process_repeat_record, max_threads=REPEAT_RECORD_SENDER_THREADS)
+
+
 def _process_repeat_record(repeat_record):
 
     # A RepeatRecord should ideally never get into this state, as the
@@ -226,7 +276,11 @@ def process_repeater(repeater_id: int):
         [f'process-repeater-{repeater.repeater_id}'],
         fail_hard=False, block=False, timeout=5 * 60 * 60,
     ):
-        for repeat_record in repeater.repeat_records_ready[:RECORDS_AT_A_TIME]:
+        repeat_records = repeater.repeat_records_ready[:RECORDS_AT_A_TIME]
+        if repeater.sends_batches:
+            _send_repeat_records_in_batches(repeater, repeat_records)
+            return
+        for repeat_record in repeat_records:
             try:
                 payload = get_payload(repeater, repeat_record)
             except Exception:
@@ -237,3 +291,31 @@ def process_repeater(repeater_id: int):
                                             repeat_record, payload)
             if should_retry:
                 break
+
+
+def _send_repeat_records_in_batches(repeater, repeat_records):
+    """
+    Sends up to ``repeater.batch_size`` repeat records in each request.
+    Repeat records are only sent together if they have the same URL.
+    """
+    batch_records = []
+    batch_payloads = []
+    batch_url = None
+    for repeat_record in repeat_records:
+        try:
+            payload = get_payload(repeater, repeat_record)
+        except Exception:
+            # The repeat record is cancelled if there is an error
+            # getting the payload. We can safely move to the next one.
+            continue
+        url = repeater.get_url(repeat_record)
+        if batch_records and (url != batch_url or len(batch_records) >= repeater.batch_size):
+            if not send_batch_request(repeater, batch_records, batch_payloads):
+                return
+            batch_records = []
+            batch_payloads = []
+        batch_records.append(repeat_record)
+        batch_payloads.append(payload)
+        batch_url = url
+    if batch_records:
+        send_batch_request(repeater, batch_records, batch_payloads)
@@ -3,10 +3,11 @@ from datetime import datetime, timedelta
 
 from django.test import TestCase
 
-from corehq.motech.repeaters.const import RECORD_PENDING_STATE
+from corehq.motech.repeaters.const import DUE_RECORD_BUCKETS, RECORD_PENDING_STATE
 from corehq.motech.repeaters.dbaccessors import (
     get_cancelled_repeat_record_count,
     get_domains_that_have_repeat_records,
+    get_due_repeat_record_stats,
     get_failure_repeat_record_count,
     get_overdue_repeat_record_count,
     get_paged_repeat_records,
@@ -15,6 +16,7 @@ from corehq.motech.repeaters.dbaccessors import (
     get_repeat_records_by_payload_id,
     get_success_repeat_record_count,
     iter_repeat_records_by_domain,
+    iterate_due_repeat_record_ids,
     iterate_repeat_record_ids,
 )
 from corehq.motech.repeaters.models import RepeatRecord
@@ -158,6 +160,21 @@ class TestRepeatRecordDBAccessors(TestCase):
         records = list(iterate_repeat_record_ids(datetime.utcnow(), chunk_size=2))
         self.assertEqual(len(records), 4)  # Should grab all but the succeeded one
 
+    def test_iterate_due_repeat_record_ids(self):
+        record_ids = [
+            record_id
+            for bucket in range(DUE_RECORD_BUCKETS)
+            for record_id in iterate_due_repeat_record_ids(bucket, datetime.utcnow(), chunk_size=2)
+        ]
+        self.assertEqual(len(record_ids), 4)  # Should grab all but the succeeded one
+
+    def test_get_due_repeat_record_stats(self):
+        now = datetime.utcnow()
+        stats = [get_due_repeat_record_stats(bucket, now) for bucket in range(DUE_RECORD_BUCKETS)]
+        self.assertEqual(sum(count for count, due_since in stats), 4)
+        longest_due = min(due_since for count, due_since in stats if due_since is not None)
+        self.assertEqual(longest_due, self.records[4].next_check)  # overdue
+
     def test_get_overdue_repeat_record_count(self):
         overdue_count = get_overdue_repeat_record_count()
         self.assertEqual(overdue_count, 1)
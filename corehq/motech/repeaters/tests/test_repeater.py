@@ -276,6 +276,7 @@ class RepeaterTest(BaseRepeaterTest):
                     notify_addresses=[],
                     payload_id=repeat_record.payload_id,
                     method="POST",
+                    session_pool_key=repeat_record.repeater.connection_settings.get_session_pool_key(),
                 )
 
         # The following is pretty fickle and depends on which of
@@ -873,6 +874,7 @@ class TestRepeaterFormat(BaseRepeaterTest):
                 payload_id='ABC123CASEID',
                 verify=self.repeater.verify,
                 method="POST",
+                session_pool_key=self.connx.get_session_pool_key(),
             )
 
     def test_get_format_by_deprecated_name(self):
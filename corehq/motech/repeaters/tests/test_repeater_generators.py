@@ -0,0 +1,58 @@
+import json
+from unittest.mock import Mock
+
+from django.test import SimpleTestCase
+
+from corehq.motech.repeaters.repeater_generators import (
+    CaseRepeaterJsonPayloadGenerator,
+    CaseRepeaterXMLPayloadGenerator,
+)
+
+
+class TestJsonArrayBatches(SimpleTestCase):
+
+    def setUp(self):
+        self.generator = CaseRepeaterJsonPayloadGenerator(repeater=None)
+
+    def test_supports_batches(self):
+        self.assertTrue(self.generator.supports_batches)
+        self.assertFalse(CaseRepeaterXMLPayloadGenerator(repeater=None).supports_batches)
+
+    def test_batch_payload(self):
+        payloads = [json.dumps({'case_id': 'abc'}), json.dumps({'case_id': 'def'})]
+        self.assertEqual(
+            json.loads(self.generator.get_batch_payload(payloads)),
+            [{'case_id': 'abc'}, {'case_id': 'def'}],
+        )
+
+    def test_item_responses(self):
+        response = _get_response(200, [{'status': 201}, {'status': 400, 'error': 'Missing name'}, {}])
+        responses = self.generator.get_batch_responses(response, 3)
+        self.assertEqual([r.status_code for r in responses], [201, 400, 200])
+        self.assertEqual(responses[1].reason, 'Bad Request')
+        self.assertEqual(json.loads(responses[1].text), {'status': 400, 'error': 'Missing name'})
+
+    def test_invalid_item_status(self):
+        response = _get_response(200, [{'status': 'done'}])
+        responses = self.generator.get_batch_responses(response, 1)
+        self.assertEqual(responses[0].status_code, 200)
+
+    def test_response_without_items(self):
+        response = _get_response(200, {'created': 2})
+        self.assertEqual(self.generator.get_batch_responses(response, 2), [response, response])
+
+    def test_wrong_number_of_items(self):
+        response = _get_response(200, [{'status': 201}])
+        self.assertEqual(self.generator.get_batch_responses(response, 2), [response, response])
+
+    def test_non_json_response(self):
+        response = Mock(status_code=200, json=Mock(side_effect=ValueError))
+        self.assertEqual(self.generator.get_batch_responses(response, 2), [response, response])
+
+    def test_error_response(self):
+        response = _get_response(500, [{'status': 201}, {'status': 201}])
+        self.assertEqual(self.generator.get_batch_responses(response, 2), [response, response])
+
+
+def _get_response(status_code, content):
+    return Mock(status_code=status_code, json=Mock(return_value=content))
@@ -0,0 +1,90 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+import attr
+
+from corehq.motech.repeaters.sender import send_repeat_records
+
+
+@attr.s(auto_attribs=True)
+class FakeRepeatRecord:
+    record_id: str
+    repeater_id: str
+    registered_on: datetime
+    domain: str = 'test-domain'
+
+
+class SendRepeatRecordsTests(SimpleTestCase):
+
+    def setUp(self):
+        start = datetime(2020, 1, 1)
+        self.repeat_records = [
+            FakeRepeatRecord(f'{repeater_id}{i}', repeater_id, start + timedelta(minutes=i))
+            for i in range(5)
+            for repeater_id in ('a', 'b', 'c')
+        ]
+        self.repeat_records.reverse()
+
+    def test_records_are_sent_in_order_for_each_repeater(self):
+        sent = []
+        send_repeat_records(self.repeat_records, lambda record: sent.append(record.record_id), max_threads=3)
+
+        self.assertEqual(len(sent), 15)
+        for repeater_id in ('a', 'b', 'c'):
+            self.assertEqual(
+                [record_id for record_id in sent if record_id.startswith(repeater_id)],
+                [f'{repeater_id}{i}' for i in range(5)],
+            )
+
+    def test_repeaters_are_sent_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def process_repeat_record(record):
+            # Fails with BrokenBarrierError unless three repeaters are
+            # being sent at the same time
+            if record.record_id.endswith('0'):
+                barrier.wait()
+
+        with patch('corehq.motech.repeaters.sender.notify_exception') as notify_mock:
+            send_repeat_records(self.repeat_records, process_repeat_record, max_threads=3)
+        notify_mock.assert_not_called()
+
+    def test_records_of_one_repeater_are_sent_one_at_a_time(self):
+        active = {}
+        overlaps = []
+        lock = threading.Lock()
+
+        def process_repeat_record(record):
+            with lock:
+                if active.get(record.repeater_id):
+                    overlaps.append(record.record_id)
+                active[record.repeater_id] = True
+            time.sleep(0.001)
+            with lock:
+                active[record.repeater_id] = False
+
+        send_repeat_records(self.repeat_records, process_repeat_record, max_threads=3)
+        self.assertEqual(overlaps, [])
+
+    def test_error_does_not_stop_other_records(self):
+        sent = []
+
+        def process_repeat_record(record):
+            if record.record_id == 'a1':
+                raise ValueError
+            sent.append(record.record_id)
+
+        with patch('corehq.motech.repeaters.sender.notify_exception') as notify_mock:
+            send_repeat_records(self.repeat_records, process_repeat_record, max_threads=3)
+        self.assertEqual(len(sent), 14)
+        self.assertIn('a2', sent)
+        self.assertEqual(notify_mock.call_count, 1)
+
+    def test_one_thread(self):
+        sent = []
+        send_repeat_records(self.repeat_records, lambda record: sent.append(record.record_id), max_threads=1)
+        self.assertEqual(sent, [f'{repeater_id}{i}' for repeater_id in ('c', 'b', 'a') for i in range(5)])
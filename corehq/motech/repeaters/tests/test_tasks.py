@@ -1,11 +1,14 @@
+import json
 from contextlib import contextmanager
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch
 import uuid
 
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.utils import timezone
 
+from dimagi.utils.parsing import json_format_datetime
+
 from corehq.apps.domain.shortcuts import create_domain
 from corehq.apps.receiverwrapper.util import submit_form_locally
 from corehq.form_processor.models import XFormInstance
@@ -13,21 +16,36 @@ from corehq.form_processor.utils.xform import (
     FormSubmissionBuilder,
     TestFormMetadata,
 )
+from corehq.motech.dhis2.repeaters import Dhis2Repeater
 from corehq.motech.models import ConnectionSettings, RequestLog
+from corehq.util.test_utils import flag_enabled
 
 from ..const import (
+    MIN_RETRY_WAIT,
     RECORD_CANCELLED_STATE,
     RECORD_FAILURE_STATE,
     RECORD_PENDING_STATE,
+    RECORD_SUCCESS_STATE,
 )
 from ..models import FormRepeater
-from ..tasks import process_repeater, delete_old_request_logs
+from ..tasks import get_partition_buckets, process_repeater, delete_old_request_logs
 
 DOMAIN = 'gaidhlig'
 PAYLOAD_IDS = ['aon', 'dha', 'trì', 'ceithir', 'coig', 'sia', 'seachd', 'ochd',
                'naoi', 'deich']
 
 
+class TestGetPartitionBuckets(SimpleTestCase):
+
+    def test_buckets_are_split_between_partitions(self):
+        partitions = [get_partition_buckets(partition, 3) for partition in range(3)]
+        self.assertEqual(partitions[0], [0, 3, 6, 9, 12, 15])
+        self.assertEqual(sorted(sum(partitions, [])), list(range(16)))
+
+    def test_one_partition(self):
+        self.assertEqual(get_partition_buckets(0, 1), list(range(16)))
+
+
 class TestDeleteOldRequestLogs(TestCase):
 
     def tearDown(self):
@@ -142,6 +160,156 @@ class TestProcessRepeater(TestCase):
                                       + [RECORD_PENDING_STATE] * 9))
 
 
+
+@flag_enabled('BATCH_REPEATER_DELIVERY')
+class TestProcessRepeaterInBatches(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.domain = create_domain(DOMAIN)
+        cls.connection_settings = ConnectionSettings.objects.create(
+            domain=DOMAIN,
+            name='Test API',
+            url="http://localhost/api/"
+        )
+
+    def setUp(self):
+        self.repeater = FormRepeater(
+            domain=DOMAIN,
+            repeater_id=uuid.uuid4().hex,
+            format='form_json',
+            connection_settings=self.connection_settings,
+        )
+        self.repeater.include_app_id_param = False
+        self.repeater.batch_size = 4
+        self.repeater.save()
+        just_now = timezone.now() - timedelta(seconds=10)
+        for payload_id in PAYLOAD_IDS:
+            self.repeater.repeat_records.create(
+                domain=self.repeater.domain,
+                payload_id=payload_id,
+                registered_at=just_now,
+            )
+            just_now += timedelta(seconds=1)
+
+    def tearDown(self):
+        self.repeater.delete()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.connection_settings.delete()
+        cls.domain.delete()
+        super().tearDownClass()
+
+    def process_repeater(self, respond):
+        with patch('corehq.motech.repeaters.models.simple_request') as post_mock, \
+                patch('corehq.motech.repeaters.models.log_repeater_success_in_datadog'), \
+                patch('corehq.motech.repeaters.tasks.metrics_counter'), \
+                form_context(PAYLOAD_IDS):
+            post_mock.side_effect = respond
+            process_repeater(self.repeater.id)
+        return post_mock
+
+    def get_states(self):
+        return [r.state for r in self.repeater.repeat_records.all()]
+
+    def test_records_are_sent_in_batches(self):
+        def respond(domain, url, data, **kwargs):
+            return Mock(status_code=200, reason='OK', text='', json=Mock(side_effect=ValueError))
+
+        post_mock = self.process_repeater(respond)
+
+        self.assertEqual(post_mock.call_count, 3)
+        batch_sizes = [len(json.loads(call.args[2])) for call in post_mock.call_args_list]
+        self.assertEqual(batch_sizes, [4, 4, 2])
+        self.assertEqual(self.get_states(), [RECORD_SUCCESS_STATE] * 10)
+
+    def test_item_failure_stops_processing(self):
+        def respond(domain, url, data, **kwargs):
+            items = [{'status': 400 if i == 1 else 201} for i, __ in enumerate(json.loads(data))]
+            return Mock(status_code=200, reason='OK', text='', json=Mock(return_value=items))
+
+        post_mock = self.process_repeater(respond)
+
+        self.assertEqual(post_mock.call_count, 1)
+        self.assertEqual(
+            self.get_states(),
+            [RECORD_SUCCESS_STATE, RECORD_FAILURE_STATE, RECORD_SUCCESS_STATE, RECORD_SUCCESS_STATE]
+            + [RECORD_PENDING_STATE] * 6
+        )
+
+    def test_server_failure_backs_off_once(self):
+        def respond(domain, url, data, **kwargs):
+            return Mock(status_code=503, reason='Service Unavailable', text='')
+
+        self.process_repeater(respond)
+
+        self.assertEqual(self.get_states(), [RECORD_FAILURE_STATE] * 4 + [RECORD_PENDING_STATE] * 6)
+        self.repeater.refresh_from_db()
+        self.assertIsNotNone(self.repeater.next_attempt_at)
+        self.assertGreaterEqual(
+            self.repeater.next_attempt_at - self.repeater.last_attempt_at,
+            MIN_RETRY_WAIT,
+        )
+
+    def test_batch_request_headers(self):
+        def respond(domain, url, data, **kwargs):
+            return Mock(status_code=200, reason='OK', text='', json=Mock(side_effect=ValueError))
+
+        with patch('corehq.motech.repeaters.models.simple_request') as post_mock, \
+                patch('corehq.motech.repeaters.models.log_repeater_success_in_datadog'), \
+                patch('corehq.motech.repeaters.tasks.metrics_counter'), \
+                form_context(PAYLOAD_IDS):
+            post_mock.side_effect = respond
+            process_repeater(self.repeater.id)
+            forms = XFormInstance.objects.get_forms(PAYLOAD_IDS[:4], DOMAIN, ordered=True)
+
+        headers = post_mock.call_args_list[0].kwargs['headers']
+        self.assertEqual(headers['Content-Type'], 'application/json')
+        self.assertEqual(
+            headers['received-on'],
+            ', '.join(json_format_datetime(form.received_on) for form in forms),
+        )
+
+    def test_batch_requests_are_logged_for_each_record(self):
+        response = Mock(status_code=200, reason='OK', headers={}, content=b'', text='',
+                        json=Mock(side_effect=ValueError))
+        with patch('corehq.motech.requests.Requests.send_request_unlogged', return_value=response), \
+                patch('corehq.motech.repeaters.models.log_repeater_success_in_datadog'), \
+                patch('corehq.motech.repeaters.tasks.metrics_counter'), \
+                form_context(PAYLOAD_IDS):
+            self.addCleanup(lambda: RequestLog.objects.filter(domain=DOMAIN).delete())
+            process_repeater(self.repeater.id)
+
+        logs = {log.payload_id: log for log in RequestLog.objects.filter(domain=DOMAIN)}
+        self.assertEqual(set(logs), set(PAYLOAD_IDS))
+        first_batch_log = logs[PAYLOAD_IDS[0]]
+        self.assertEqual(len(json.loads(first_batch_log.request_body)), 4)
+        for payload_id in PAYLOAD_IDS[1:4]:
+            self.assertEqual(
+                logs[payload_id].request_body,
+                f'Sent in a batch of 4 payloads. See request log {first_batch_log.pk}.',
+            )
+        self.assertEqual(len(json.loads(logs[PAYLOAD_IDS[8]].request_body)), 2)
+
+
+class TestSendsBatches(SimpleTestCase):
+
+    @flag_enabled('BATCH_REPEATER_DELIVERY')
+    def test_form_repeater_sends_batches(self):
+        repeater = FormRepeater(domain=DOMAIN, format='form_json')
+        repeater.batch_size = 4
+        self.assertTrue(repeater.sends_batches)
+
+    @flag_enabled('BATCH_REPEATER_DELIVERY')
+    def test_dhis2_repeater_does_not_send_batches(self):
+        repeater = Dhis2Repeater(domain=DOMAIN)
+        repeater.batch_size = 4
+        self.assertFalse(Dhis2Repeater.supports_batches())
+        self.assertFalse(repeater.sends_batches)
+
+
 @contextmanager
 def form_context(form_ids):
     for form_id in form_ids:
@@ -143,6 +143,8 @@ class BaseRepeaterView(BaseAdminProjectSettingsView):
         repeater.connection_settings_id = int(cleaned_data['connection_settings_id'])
         repeater.request_method = cleaned_data['request_method']
         repeater.format = cleaned_data['format']
+        if 'batch_size' in cleaned_data:
+            repeater.batch_size = cleaned_data['batch_size']
         name = cleaned_data.get('name')
         if not name:
             conn_settings = ConnectionSettings.objects.get(pk=repeater.connection_settings_id)
@@ -1,6 +1,6 @@
 import logging
 from functools import wraps
-from typing import Callable, Optional
+from typing import Callable, Hashable, Optional
 
 from django.conf import settings
 from django.utils.translation import gettext as _
@@ -19,6 +19,7 @@ from corehq.motech.const import (
     REQUEST_TIMEOUT,
 )
 from corehq.motech.models import RequestLog, RequestLogEntry
+from corehq.motech.session_pool import session_pool
 from corehq.motech.utils import (
     get_endpoint_url,
     pformat_json,
@@ -85,7 +86,9 @@ class Requests(object):
     default.
 
     To maintain a session of authenticated non-API requests, use
-    Requests as a context manager.
+    Requests as a context manager. To share a keep-alive session with
+    other requests for the same connection, pass a
+    ``session_pool_key``.
     """
 
     def __init__(
@@ -98,6 +101,7 @@ class Requests(object):
         notify_addresses: Optional[list] = None,
         payload_id: Optional[str] = None,
         logger: Optional[Callable] = None,
+        session_pool_key: Optional[Hashable] = None,
     ):
         """
         Initialise instance
@@ -113,6 +117,9 @@ class Requests(object):
             associated with this request
         :param logger: function called after a request has been sent:
                         `logger(log_level, log_entry: RequestLogEntry)`
+        :param session_pool_key: Identifies the pooled session to send
+            requests with when Requests is not used as a context
+            manager. If None, a new session is used for each request.
         """
         self.domain_name = domain_name
         self.base_url = base_url
@@ -121,6 +128,7 @@ class Requests(object):
         self.notify_addresses = notify_addresses if notify_addresses else []
         self.payload_id = payload_id
         self.logger = logger or RequestLog.log
+        self.session_pool_key = session_pool_key
         self.send_request = log_request(self, self.send_request_unlogged, self.logger)
         self._session = None
 
@@ -139,6 +147,9 @@ class Requests(object):
         kwargs.setdefault('timeout', REQUEST_TIMEOUT)
         if self._session:
             response = self._session.request(method, url, *args, **kwargs)
+        elif self.session_pool_key is not None:
+            with session_pool.session(self.session_pool_key, self.domain_name, self.auth_manager) as session:
+                response = session.request(method, url, *args, **kwargs)
         else:
             # Mimics the behaviour of requests.api.request()
             with self:
@@ -244,7 +255,8 @@ def parse_request_exception(err):
 
 
 def simple_request(domain, url, data, *, headers, auth_manager, verify,
-                   method="POST", notify_addresses=None, payload_id=None):
+                   method="POST", notify_addresses=None, payload_id=None,
+                   logger=None, session_pool_key=None):
     if isinstance(data, str):
         # Encode as UTF-8, otherwise requests will send data containing
         # non-ASCII characters as 'data:application/octet-stream;base64,...'
@@ -261,6 +273,8 @@ def simple_request(domain, url, data, *, headers, auth_manager, verify,
         auth_manager=auth_manager,
         notify_addresses=notify_addresses,
         payload_id=payload_id,
+        logger=logger,
+        session_pool_key=session_pool_key,
     )
 
     request_methods = {
@@ -0,0 +1,208 @@
+"""
+A process-level pool of keep-alive HTTP sessions for remote API
+connections.
+
+``Requests`` opens a new session for every request that is not sent
+inside a ``with requests:`` block, so each payload a repeater forwards
+pays for a new TCP connection and TLS handshake, and OAuth 2.0
+connections also build a new ``OAuth2Session``. Requests that are given
+a session pool key share a session with other requests for the same
+connection in the same worker process instead. The session keeps its
+connections alive and its OAuth 2.0 token in memory, and it limits the
+number of connections that are open to each host at the same time.
+
+Sessions are replaced when they get old, and after a request raises an
+exception, so that broken connections and stale tokens are not reused.
+"""
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Hashable
+
+import attr
+from requests import Session
+
+from corehq.motech.auth import AuthManager
+from corehq.util.metrics import metrics_counter
+from corehq.util.public_only_requests.public_only_requests import (
+    PublicOnlyHttpAdapter,
+)
+
+# Number of connections whose sessions are kept by each process
+MAX_POOLED_SESSIONS = 50
+# Number of connections each session opens to a host. Requests wait
+# for a free connection when all of them are in use.
+MAX_CONNECTIONS_PER_HOST = 4
+# Seconds after which sessions are replaced
+SESSION_MAX_AGE = 60 * 60
+# Seconds after which unused sessions are replaced. Servers usually
+# close idle keep-alive connections well before this.
+SESSION_MAX_IDLE = 5 * 60
+
+
+@attr.s(auto_attribs=True, kw_only=True)
+class PooledSession:
+    session: Session
+    created_at: float
+    last_used: float
+    active: int = 0
+    requests: int = 0
+
+
+class SessionPool:
+
+    def __init__(
+        self,
+        max_sessions=MAX_POOLED_SESSIONS,
+        max_connections_per_host=MAX_CONNECTIONS_PER_HOST,
+        max_age=SESSION_MAX_AGE,
+        max_idle=SESSION_MAX_IDLE,
+    ):
+        self.max_sessions = max_sessions
+        self.max_connections_per_host = max_connections_per_host
+        self.max_age = max_age
+        self.max_idle = max_idle
+        self._sessions = OrderedDict()  # key: PooledSession
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._counts = Counter()
+
+    @contextmanager
+    def session(self, key: Hashable, domain_name: str, auth_manager: AuthManager):
+        """
+        Yields the pooled session for ``key``, creating it with
+        ``auth_manager`` if necessary.
+
+        ``key`` must change whenever a setting that affects the session,
+        like the credentials of the connection, changes.
+        """
+        pooled = self._check_out(key, domain_name, auth_manager)
+        try:
+            yield pooled.session
+        except Exception:
+            self._remove(key, pooled, 'discarded')
+            raise
+        finally:
+            self._check_in(key, pooled)
+
+    def get_stats(self):
+        """
+        Returns the number of pooled sessions, the number of requests
+        currently using them, and counts of sessions "created",
+        "reused", "expired", "evicted" and "discarded" by this process
+        """
+        with self._lock:
+            self._reset_after_fork()
+            stats = {
+                'created': 0,
+                'reused': 0,
+                'expired': 0,
+                'evicted': 0,
+                'discarded': 0,
+                **self._counts,
+            }
+            stats['sessions'] = len(self._sessions)
+            stats['active'] = sum(pooled.active for pooled in self._sessions.values())
+            return stats
+
+    def clear(self):
+        with self._lock:
+            for pooled in self._sessions.values():
+                if not pooled.active:
+                    pooled.session.close()
+            self._sessions.clear()
+            self._counts.clear()
+
+    def _check_out(self, key, domain_name, auth_manager):
+        with self._lock:
+            self._reset_after_fork()
+            pooled = self._sessions.get(key)
+            if pooled is not None and self._is_expired(pooled):
+                self._pop(key, 'expired')
+                pooled = None
+            if pooled is not None:
+                self._sessions.move_to_end(key)
+                self._use(pooled, 'reused')
+                return pooled
+
+        # Creating a session can fetch an OAuth 2.0 token. Don't make
+        # requests for other connections wait for it.
+        session = self._create_session(domain_name, auth_manager)
+        with self._lock:
+            pooled = self._sessions.get(key)
+            if pooled is not None:
+                # Another thread created a session for this key first
+                session.close()
+                self._sessions.move_to_end(key)
+                self._use(pooled, 'reused')
+                return pooled
+            now = time.monotonic()
+            pooled = PooledSession(session=session, created_at=now, last_used=now)
+            self._sessions[key] = pooled
+            self._use(pooled, 'created')
+            while len(self._sessions) > self.max_sessions:
+                self._pop(next(iter(self._sessions)), 'evicted')
+            return pooled
+
+    def _check_in(self, key, pooled):
+        with self._lock:
+            pooled.active -= 1
+            pooled.last_used = time.monotonic()
+            if not pooled.active and self._sessions.get(key) is not pooled:
+                pooled.session.close()
+
+    def _remove(self, key, pooled, event):
+        with self._lock:
+            if self._sessions.get(key) is pooled:
+                self._pop(key, event)
+
+    def _pop(self, key, event):
+        pooled = self._sessions.pop(key)
+        if not pooled.active:
+            pooled.session.close()
+        self._count(event)
+
+    def _use(self, pooled, event):
+        pooled.active += 1
+        pooled.requests += 1
+        self._count(event)
+
+    def _count(self, event):
+        self._counts[event] += 1
+        metrics_counter('commcare.motech.session_pool.sessions', tags={'event': event})
+
+    def _is_expired(self, pooled):
+        now = time.monotonic()
+        return (
+            now - pooled.created_at > self.max_age
+            or not pooled.active and now - pooled.last_used > self.max_idle
+        )
+
+    def _create_session(self, domain_name, auth_manager):
+        session = auth_manager.get_session(domain_name)
+        for prefix, adapter in list(session.adapters.items()):
+            if isinstance(adapter, PublicOnlyHttpAdapter):
+                session.mount(prefix, PublicOnlyHttpAdapter(
+                    domain_name=adapter.domain_name,
+                    src=adapter.src,
+                    pool_maxsize=self.max_connections_per_host,
+                    pool_block=True,
+                ))
+        return session
+
+    def _reset_after_fork(self):
+        # A forked worker process must not share the sockets of its
+        # parent's sessions. They are dropped without being closed.
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._sessions = OrderedDict()
+            self._counts = Counter()
+
+
+session_pool = SessionPool()
+
+
+def get_session_pool_stats():
+    return session_pool.get_stats()
@@ -192,6 +192,18 @@ class ConnectionSettingsPropertiesTests(SimpleTestCase):
         cs.client_secret = 'secret'
         self.assertEqual(cs.plaintext_client_secret, 'secret')
 
+    def test_session_pool_key_unsaved(self):
+        cs = ConnectionSettings(url=TEST_API_URL)
+        self.assertIsNone(cs.get_session_pool_key())
+
+    def test_session_pool_key_changes_with_credentials(self):
+        cs = ConnectionSettings(id=1, url=TEST_API_URL, name='API')
+        key = cs.get_session_pool_key()
+        cs.name = 'Renamed API'
+        self.assertEqual(cs.get_session_pool_key(), key)
+        cs.plaintext_password = 'secret'
+        self.assertNotEqual(cs.get_session_pool_key(), key)
+
 
 class NotifyAddressesTests(SimpleTestCase):
 
@@ -0,0 +1,107 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+import requests
+
+from corehq.motech.auth import AuthManager
+from corehq.motech.requests import Requests
+from corehq.motech.session_pool import SessionPool
+
+DOMAIN = 'test-domain'
+
+
+class SessionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = SessionPool(max_sessions=2, max_connections_per_host=3)
+        self.addCleanup(self.pool.clear)
+        self.auth_manager = AuthManager()
+
+    def get_session(self, key):
+        with self.pool.session(key, DOMAIN, self.auth_manager) as session:
+            return session
+
+    def test_session_is_reused(self):
+        session = self.get_session('a')
+        self.assertIs(self.get_session('a'), session)
+        self.assertIsNot(self.get_session('b'), session)
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['created'], 2)
+        self.assertEqual(stats['reused'], 1)
+        self.assertEqual(stats['sessions'], 2)
+        self.assertEqual(stats['active'], 0)
+
+    def test_connections_per_host_are_limited(self):
+        session = self.get_session('a')
+        adapter = session.get_adapter('https://example.com/')
+        self.assertEqual(adapter._pool_maxsize, 3)
+        self.assertTrue(adapter._pool_block)
+        self.assertEqual(adapter.domain_name, DOMAIN)
+
+    def test_active_sessions_are_counted(self):
+        with self.pool.session('a', DOMAIN, self.auth_manager):
+            self.assertEqual(self.pool.get_stats()['active'], 1)
+        self.assertEqual(self.pool.get_stats()['active'], 0)
+
+    def test_session_is_discarded_after_exception(self):
+        with self.assertRaises(ValueError):
+            with self.pool.session('a', DOMAIN, self.auth_manager) as session:
+                raise ValueError
+        self.assertIsNot(self.get_session('a'), session)
+        self.assertEqual(self.pool.get_stats()['discarded'], 1)
+
+    def test_least_recently_used_session_is_evicted(self):
+        session_a = self.get_session('a')
+        self.get_session('b')
+        self.get_session('a')
+        self.get_session('c')
+        self.assertIs(self.get_session('a'), session_a)
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['evicted'], 1)
+        self.assertEqual(stats['sessions'], 2)
+
+    def test_old_session_is_replaced(self):
+        session = self.get_session('a')
+        self.pool.max_age = -1
+        self.assertIsNot(self.get_session('a'), session)
+        self.assertEqual(self.pool.get_stats()['expired'], 1)
+
+    def test_idle_session_is_replaced(self):
+        session = self.get_session('a')
+        self.pool.max_idle = -1
+        self.assertIsNot(self.get_session('a'), session)
+        self.assertEqual(self.pool.get_stats()['expired'], 1)
+
+
+class PooledRequestsTests(SimpleTestCase):
+
+    def setUp(self):
+        pool_patcher = patch('corehq.motech.requests.session_pool', SessionPool())
+        self.pool = pool_patcher.start()
+        self.addCleanup(pool_patcher.stop)
+
+    def get_requests(self, session_pool_key):
+        return Requests(
+            DOMAIN,
+            'https://example.com/api/',
+            auth_manager=AuthManager(),
+            logger=lambda *args, **kwargs: None,
+            session_pool_key=session_pool_key,
+        )
+
+    def test_pooled_requests_share_session(self):
+        with patch.object(AuthManager, 'get_session', wraps=AuthManager().get_session) as get_session, \
+                patch.object(requests.Session, 'request'):
+            self.get_requests(('conn', 1)).get('one')
+            self.get_requests(('conn', 1)).get('two')
+        self.assertEqual(get_session.call_count, 1)
+        self.assertEqual(self.pool.get_stats()['reused'], 1)
+
+    def test_unpooled_requests_use_new_sessions(self):
+        with patch.object(AuthManager, 'get_session', wraps=AuthManager().get_session) as get_session, \
+                patch.object(requests.Session, 'request'):
+            self.get_requests(None).get('one')
+            self.get_requests(None).get('two')
+        self.assertEqual(get_session.call_count, 2)
+        self.assertEqual(self.pool.get_stats()['sessions'], 0)
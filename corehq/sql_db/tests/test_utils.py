@@ -1,6 +1,12 @@
+import threading
+from unittest.mock import patch
+
 from django.test import SimpleTestCase
 
-from corehq.sql_db.util import create_unique_index_name
+from corehq.sql_db.util import (
+    create_unique_index_name,
+    paginate_query_across_partitioned_databases_in_parallel,
+)
 
 
 class TestCreateUniqueIndexName(SimpleTestCase):
@@ -42,3 +48,49 @@ class TestCreateUniqueIndexName(SimpleTestCase):
     def test_raises_error_if_fields_is_not_a_list(self):
         with self.assertRaises(AssertionError):
             create_unique_index_name('app', 'table', 'field_one')
+
+
+@patch('corehq.sql_db.util.get_db_aliases_for_partitioned_query', lambda: ['p1', 'p2', 'p3'])
+class TestPaginateQueryInParallel(SimpleTestCase):
+
+    def setUp(self):
+        self.threads = set()
+        self.rows_by_db = {
+            'p1': [('p1', i) for i in range(7)],
+            'p2': [],
+            'p3': [('p3', i) for i in range(12)],
+        }
+
+    def _paginate_query(self, db_name, model_class, q_expression, annotate=None, query_size=5000,
+                        values=None, load_source=None):
+        self.threads.add(threading.get_ident())
+        if db_name == 'error':
+            raise ValueError(db_name)
+        yield from self.rows_by_db[db_name]
+
+    def _paginate(self, **kwargs):
+        with patch('corehq.sql_db.util.paginate_query', self._paginate_query):
+            return list(paginate_query_across_partitioned_databases_in_parallel(
+                None, None, query_size=2, prefetch_pages=1, **kwargs))
+
+    def test_ordered(self):
+        rows = self._paginate()
+        self.assertEqual(rows, self.rows_by_db['p1'] + self.rows_by_db['p3'])
+        self.assertNotIn(threading.get_ident(), self.threads)
+
+    def test_interleaved(self):
+        rows = self._paginate(interleave=True)
+        self.assertEqual(sorted(rows), self.rows_by_db['p1'] + self.rows_by_db['p3'])
+        self.assertEqual([row for row in rows if row[0] == 'p3'], self.rows_by_db['p3'])
+
+    def test_errors_are_raised(self):
+        with patch('corehq.sql_db.util.get_db_aliases_for_partitioned_query', lambda: ['p1', 'error']), \
+                self.assertRaises(ValueError):
+            self._paginate()
+
+    def test_stop_early(self):
+        with patch('corehq.sql_db.util.paginate_query', self._paginate_query):
+            rows = paginate_query_across_partitioned_databases_in_parallel(
+                None, None, query_size=2, prefetch_pages=1)
+            self.assertEqual(next(rows), ('p1', 0))
+            rows.close()
@@ -1,8 +1,11 @@
 import hashlib
+import queue
 import random
 import re
+import threading
 import uuid
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from looseversion import LooseVersion
 from functools import wraps
 
@@ -14,6 +17,7 @@ from django.db.utils import InterfaceError as DjangoInterfaceError
 from corehq.sql_db.config import plproxy_config, plproxy_standby_config
 from corehq.util.metrics.load_counters import load_counter_for_model
 from corehq.util.quickcache import quickcache
+from dimagi.utils.chunked import chunked
 from memoized import memoized
 from psycopg2._psycopg import InterfaceError as Psycopg2InterfaceError
 
@@ -68,6 +72,75 @@ def paginate_query_across_partitioned_databases(model_class, q_expression, annot
             yield row
 
 
+def paginate_query_across_partitioned_databases_in_parallel(model_class, q_expression, annotate=None,
+                                                            query_size=5000, values=None, load_source=None,
+                                                            interleave=False, prefetch_pages=2):
+    """
+    Like ``paginate_query_across_partitioned_databases``, but all partitioned
+    databases are queried at the same time, each by its own thread.
+
+    :param interleave: If true, results are produced as soon as any database
+    returns them. Otherwise all results of one database are produced before
+    those of the next, in the same order as ``paginate_query_across_partitioned_databases``.
+
+    :param prefetch_pages: The number of pages of ``query_size`` results that
+    are fetched from each database before they are consumed.
+
+    :return: A generator with the results
+    """
+    db_names = get_db_aliases_for_partitioned_query()
+    stop = threading.Event()
+    if interleave:
+        queues = [queue.Queue(maxsize=prefetch_pages * len(db_names))] * len(db_names)
+    else:
+        queues = [queue.Queue(maxsize=prefetch_pages) for db_name in db_names]
+
+    def fetch_pages(db_name, pages):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            rows = paginate_query(db_name, model_class, q_expression, annotate, query_size, values, load_source)
+            for page in chunked(rows, query_size, list):
+                if not put(page):
+                    return
+            put(None)
+        except Exception as e:
+            put(e)
+        finally:
+            connections.close_all()
+
+    def iter_pages(pages, producer_count):
+        while producer_count:
+            page = pages.get()
+            if page is None:
+                producer_count -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield page
+
+    with ThreadPoolExecutor(max_workers=len(db_names)) as executor:
+        try:
+            for db_name, pages in zip(db_names, queues):
+                executor.submit(fetch_pages, db_name, pages)
+            if interleave:
+                page_iterators = [iter_pages(queues[0], len(db_names))]
+            else:
+                page_iterators = [iter_pages(pages, 1) for pages in queues]
+            for pages in page_iterators:
+                for page in pages:
+                    yield from page
+        finally:
+            stop.set()
+
+
 def paginate_query(db_name, model_class, q_expression, annotate=None, query_size=5000, values=None,
                    load_source=None):
     """
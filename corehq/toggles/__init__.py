@@ -1620,6 +1620,33 @@ PAGINATED_EXPORTS = StaticToggle(
     [NAMESPACE_DOMAIN]
 )
 
+PARQUET_EXPORTS = StaticToggle(
+    'parquet_exports',
+    'Allows exports to be downloaded as zipped Parquet files',
+    TAG_SOLUTIONS_LIMITED,
+    [NAMESPACE_DOMAIN],
+    description="Parquet files have typed columns and are much smaller and faster to load into "
+                "analysis tools than CSV files.",
+)
+
+INCREMENTAL_SAVED_EXPORTS = StaticToggle(
+    'incremental_saved_exports',
+    'Rebuild daily saved form and case exports incrementally',
+    TAG_SOLUTIONS_LIMITED,
+    [NAMESPACE_DOMAIN],
+    description="Keeps the rows of daily saved exports between rebuilds, and only extracts rows from "
+                "forms and cases that changed since the last rebuild.",
+)
+
+BATCH_REPEATER_DELIVERY = StaticToggle(
+    'batch_repeater_delivery',
+    'Allow data forwarders to send several records in one request',
+    TAG_SOLUTIONS_LIMITED,
+    [NAMESPACE_DOMAIN],
+    description="Adds a \"Records per request\" option to form and case forwarders that use a JSON "
+                "payload format. Records are sent as a JSON array, so the remote API must accept arrays.",
+)
+
 CLEAR_MOBILE_WORKER_DATA = StaticToggle(
     'clear_mobile_worker_data',
     "Allows a web user to clear mobile workers' data",
@@ -1955,6 +1982,42 @@ LIVEQUERY_READ_FROM_STANDBYS = DynamicallyPredictablyRandomToggle(
     """
 )
 
+LIVEQUERY_CASE_GRAPH_SNAPSHOT = DynamicallyPredictablyRandomToggle(
+    'livequery_case_graph_snapshot',
+    'Reuse the case graph from the previous livequery restore of a user',
+    TAG_INTERNAL,
+    [NAMESPACE_USER],
+    description="""
+    Save the case indices read during a livequery restore and only
+    re-read the parts of the case graph that have been modified on the
+    user's next restore.
+    """
+)
+
+PARALLEL_RESTORE_PROVIDERS = StaticToggle(
+    'parallel_restore_providers',
+    'Generate the parts of a restore payload concurrently',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description="""
+    Run the restore data providers (fixtures, cases, etc.) in separate
+    threads and join their output in the usual order. Reduces restore
+    time for users with large fixtures and case loads.
+    """
+)
+
+COMPACT_SYNCLOG_FORMAT = StaticToggle(
+    'compact_synclog_format',
+    'Store sync log case state in a compact binary format',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description="""
+    Store the case ids and index trees of sync logs as a compact binary
+    encoding instead of JSON. Sync logs saved in either format can be read
+    regardless of this flag.
+    """
+)
+
 ACCOUNTING_TESTING_TOOLS = StaticToggle(
     'accounting_testing_tools',
     'Enable Accounting Testing Tools',
@@ -2194,6 +2257,18 @@ CASE_UPDATES_UCR_FILTERS = StaticToggle(
     namespaces=[NAMESPACE_DOMAIN],
 )
 
+UCR_EVALUATION_PLANS = StaticToggle(
+    'ucr_evaluation_plans',
+    'Evaluate UCR data sources using precompiled evaluation plans',
+    TAG_INTERNAL,
+    namespaces=[NAMESPACE_DOMAIN],
+    description="""
+    Compile data source filters and indicators into flat evaluation plans
+    that share repeated sub-expressions, instead of evaluating the spec
+    objects recursively for each document. The output is the same.
+    """
+)
+
 TURN_IO_BACKEND = StaticToggle(
     'turn_io_backend',
     'Enable Turn.io SMS backend',
@@ -22,10 +22,10 @@ def make_session_public_only(session, domain_name, src):
 
 
 class PublicOnlyHttpAdapter(HTTPAdapter):
-    def __init__(self, domain_name, src):
+    def __init__(self, domain_name, src, **kwargs):
         self.domain_name = domain_name
         self.src = src
-        super().__init__()
+        super().__init__(**kwargs)
 
     def get_connection(self, url, proxies=None):
         from corehq.motech.requests import validate_user_input_url_for_repeaters
@@ -170,6 +170,18 @@ class TimingContext(object):
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.stop(self.peek().name)
 
+    def add_context(self, context):
+        """Add the timers of another context under the current timer
+
+        Useful for merging timings of work done in another thread, which
+        must have its own ``TimingContext`` since timing contexts are not
+        thread-safe.
+        """
+        timer = context.root
+        self.peek().append(timer)
+        for sub in timer.to_list(exclude_root=True):
+            sub.root = self.root
+
     def to_dict(self):
         """Get timing data as a recursive dictionary of the format:
         {
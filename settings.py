@@ -808,6 +808,17 @@ RUN_CASE_SEARCH_PILLOW = True
 RUN_UNKNOWN_USER_PILLOW = True
 RUN_DEDUPLICATION_PILLOW = True
 
+# Cache alias shared by the pillows running on a host, so that a document
+# changed once is read from the database once rather than by every pillow.
+# Should be a size-bounded cache local to the host, e.g. memcached on localhost.
+PILLOW_DOCUMENT_CACHE = None
+PILLOW_DOCUMENT_CACHE_TIMEOUT = 5 * 60
+
+# Batch pillows whose chunk size adapts to how long chunks take to process.
+# Maps pillow names to keyword arguments of pillowtop.chunk_size.AdaptiveChunkSize,
+# e.g. {'xform-pillow': {'max_size': 5000, 'target_seconds': 10}}
+PILLOW_ADAPTIVE_CHUNK_SIZES = {}
+
 # Repeaters in the order in which they should appear in "Data Forwarding"
 REPEATER_CLASSES = [
     'corehq.motech.repeaters.models.FormRepeater',
@@ -837,9 +848,16 @@ LOCAL_REPEATER_CLASSES = []
 # This will not prevent users from creating
 REPEATERS_WHITELIST = None
 
-# how many tasks to split the check_repeaters process into
+# how many tasks to split the check_repeaters process into (at most 16, the
+# number of buckets that due repeat records are split into)
 CHECK_REPEATERS_PARTITION_COUNT = 1
 
+# How many repeaters each repeat_record_queue worker sends repeat records
+# to at the same time. If greater than 1, check_repeaters queues due
+# repeat records in groups, which are sent concurrently, instead of one
+# task per repeat record.
+REPEAT_RECORD_SENDER_THREADS = 1
+
 # If ENABLE_PRELOGIN_SITE is set to true, redirect to Dimagi.com urls
 ENABLE_PRELOGIN_SITE = False
 
@@ -1078,6 +1096,8 @@ DAYS_TO_KEEP_DEVICE_LOGS = 60
 NO_DEVICE_LOG_ENVS = list(ICDS_ENVS) + ['production']
 
 MAX_RULE_UPDATES_IN_ONE_RUN = 10000
+# number of cases that automatic case update rules are run on at a time
+AUTO_UPDATE_RULE_CASE_CHUNK_SIZE = 100
 RULE_UPDATE_HOUR = 0
 
 DEFAULT_ODATA_FEED_LIMIT = 25